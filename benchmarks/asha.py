@@ -0,0 +1,101 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the suggestion latency of the ASHA optimizer.
+
+Simulates an ASHA run with W executors, where a trial takes `budget` times
+a random duration, and times the `get_suggestion` calls of the first N
+trials. The max resource is chosen such that the experiment doesn't stop
+before N trials.
+
+Usage:
+
+    python benchmarks/asha.py [--trials 50000] [--workers 32] [--reduction-factor 2]
+"""
+
+import argparse
+import heapq
+import math
+import random
+import time
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.optimizer import Asha
+from maggy.trial import Trial
+
+
+def run(n_trials, n_workers, reduction_factor):
+    random.seed(0)
+    max_rung = int(math.ceil(math.log(n_trials, reduction_factor)))
+    asha = Asha(
+        reduction_factor=reduction_factor,
+        resource_min=1,
+        resource_max=reduction_factor ** max_rung,
+    )
+    asha.searchspace = Searchspace(x=("DOUBLE", [0, 10]))
+    asha.num_trials = reduction_factor ** (max_rung + 1)
+    asha.initialize()
+
+    durations = []
+    running = []
+    now = 0.0
+
+    def suggest(finished_trial=None):
+        start = time.perf_counter()
+        trial = asha.get_suggestion(finished_trial)
+        durations.append(time.perf_counter() - start)
+        if trial is not None:
+            duration = trial.params["budget"] * random.expovariate(1.0)
+            heapq.heappush(running, (now + duration, len(durations), trial))
+
+    for _ in range(n_workers):
+        suggest()
+    while running and len(durations) < n_trials:
+        now, _, trial = heapq.heappop(running)
+        trial.final_metric = trial.params["x"]
+        trial.status = Trial.FINALIZED
+        suggest(trial)
+    return np.array(durations), max(asha.rungs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--trials", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--reduction-factor", type=int, default=2)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    durations, top_rung = run(args.trials, args.workers, args.reduction_factor)
+    total = time.perf_counter() - start
+    print(
+        "{} trials, top rung {}: total {:.2f}s, get_suggestion mean {:.3f}ms, "
+        "last 1000 mean {:.3f}ms, p99 {:.3f}ms".format(
+            len(durations),
+            top_rung,
+            total,
+            1e3 * durations.mean(),
+            1e3 * durations[-1000:].mean(),
+            1e3 * np.percentile(durations, 99),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Executor utilization of the synchronous and asynchronous Hyperband pruners.
+
+Simulates an experiment of random search with a pruner on W executors of a
+heterogeneous cluster: a trial takes `budget * speed` time units, where the
+speed of each executor is drawn from a lognormal distribution with sigma S.
+Executors that get "IDLE" wait until the next trial finishes, like in the
+experiment driver. Reports the share of executor time spent running trials,
+the makespan, the total compute and the best metric on the max budget.
+
+With --resume, promoted trials continue from the checkpoint of their parent
+trial and only train for the difference of the budgets.
+
+Usage:
+
+    python benchmarks/async_hyperband.py [--iterations 20] [--workers 16] [--sigma 0.5] [--resume]
+"""
+
+import argparse
+import heapq
+import random
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer import RandomSearch
+from maggy.trial import Trial
+
+
+def objective(params):
+    # the ranking on small budgets is a noisy estimate of the one on the max budget
+    return (params["x"] - 3) ** 2 + np.random.normal(scale=5.0 / params["budget"])
+
+
+def simulate(pruner, n_iterations, n_workers, sigma, max_budget, eta, resume, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    optimizer = RandomSearch(
+        pruner=pruner,
+        pruner_kwargs={
+            "min_budget": 1,
+            "max_budget": max_budget,
+            "eta": eta,
+            "n_iterations": n_iterations,
+        },
+    )
+    optimizer.searchspace = Searchspace(x=("DOUBLE", [0, 10]))
+    optimizer.num_trials = optimizer.pruner.num_trials()
+    optimizer.direction = "min"
+    optimizer.final_store = FinalStore()
+    optimizer.trial_store = TrialStore()
+    optimizer.initialize()
+
+    speeds = np.random.lognormal(sigma=sigma, size=n_workers)
+    running = []
+    idle = []
+    busy_time = 0.0
+    now = 0.0
+
+    def assign(worker, finished_trial=None):
+        nonlocal busy_time
+        suggestion = optimizer.get_suggestion(finished_trial)
+        if isinstance(suggestion, Trial):
+            budget = suggestion.params["budget"]
+            if resume:
+                budget -= suggestion.info_dict.get("parent_budget", 0)
+            duration = budget * speeds[worker]
+            busy_time += duration
+            heapq.heappush(running, (now + duration, worker, suggestion))
+            return True
+        idle.append(worker)
+        return False
+
+    for worker in range(n_workers):
+        assign(worker)
+    while running:
+        now, worker, trial = heapq.heappop(running)
+        trial.final_metric = objective(trial.params)
+        trial.status = Trial.FINALIZED
+        optimizer.final_store.append(trial)
+        if assign(worker, trial):
+            # a finished trial can make runs ready for the waiting executors
+            waiting, idle[:] = idle[:], []
+            for waiting_worker in waiting:
+                assign(waiting_worker)
+
+    best = min(
+        (params["x"] - 3) ** 2
+        for params in (trial.params for trial in optimizer.final_store)
+        if params["budget"] == max_budget
+    )
+    return busy_time / (n_workers * now), now, busy_time, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--max-budget", type=int, default=27)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--resume", action="store_true")
+    args = parser.parse_args()
+
+    print("pruner            utilization  makespan   compute  best true loss")
+    for pruner in ["hyperband", "async_hyperband"]:
+        results = np.array(
+            [
+                simulate(
+                    pruner,
+                    args.iterations,
+                    args.workers,
+                    args.sigma,
+                    args.max_budget,
+                    args.eta,
+                    args.resume,
+                    seed,
+                )
+                for seed in range(args.seeds)
+            ]
+        )
+        utilization, makespan, compute, best = results.mean(axis=0)
+        print(
+            "{:<16}  {:>10.1%}  {:>8.1f}  {:>8.1f}  {:>14.4f}".format(
+                pruner, utilization, makespan, compute, best
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Load test of the experiment driver's worker thread.
+
+Runs the worker of a driver with the median early stopping rule and feeds it
+the messages of N simulated executors directly, without the rpc server. Every
+executor sends a batched heartbeat (METRIC) each heartbeat interval and a FINAL
+message after ``--steps`` heartbeats, then waits for its next trial.
+
+Reports the CPU time used by the worker thread while idle and under load, as
+well as the time from queueing FINAL to the assignment of the next trial. The
+HDFS writes of the driver are replaced by no-ops.
+
+Usage:
+
+    python benchmarks/driver_worker.py [--executors 100 500 1000]
+        [--seconds 10] [--hb-interval 1] [--steps 20]
+"""
+
+import argparse
+import collections
+import random
+import threading
+import time
+
+import numpy as np
+
+from maggy.core.experiment_driver import base
+from maggy.core.stats import MetricStatistics
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.core.experiment_driver.message_queue import MessageQueue
+from maggy.earlystop import MedianStoppingRule
+from maggy.trial import Trial
+
+
+class _NoHdfs(object):
+    @staticmethod
+    def dump(data, path):
+        pass
+
+
+class _Reservations(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def assign_trial(self, partition_id, trial_id):
+        self.driver.on_assign(partition_id, trial_id)
+
+
+class _Server(object):
+    def __init__(self, driver):
+        self.reservations = _Reservations(driver)
+
+    def set_hb_interval(self, partition_id, hb_interval):
+        pass
+
+    def stop(self):
+        pass
+
+
+class BenchDriver(base.Driver):
+    """Driver with the state the worker thread needs, skips the setup of the
+    rpc server and the log files."""
+
+    def __init__(self, num_executors, hb_interval):
+        self._final_store = FinalStore()
+        self._trial_store = TrialStore()
+        self.num_executors = num_executors
+        self._message_q = MessageQueue()
+        self.experiment_done = False
+        self.worker_done = False
+        self.hb_interval = hb_interval
+        self._hb_intervals = {}
+        self._idle_partitions = collections.deque()
+        self._idle_fallback = False
+        self.server = _Server(self)
+        self.executor_logs = ""
+        self.log_lock = threading.RLock()
+        self.log_dir = ""
+        self.direction = "max"
+        self.metric_stats = MetricStatistics(self.direction)
+        self.earlystop_check = MedianStoppingRule.earlystop_check
+        self.es_interval = 1
+        self.es_min = 10
+        self.result = {}
+        self.exception = None
+        self._num_trials = 0
+        # partition id -> time FINAL was queued
+        self.final_times = {}
+        self.latencies = []
+        # partition id -> trial id assigned since the last round
+        self.running = {}
+        self.running_lock = threading.Lock()
+
+    def controller_get_next(self, trial=None):
+        self._num_trials += 1
+        return Trial({"trial": self._num_trials})
+
+    def on_assign(self, partition_id, trial_id):
+        final_time = self.final_times.pop(partition_id, None)
+        if final_time is not None:
+            self.latencies.append(time.time() - final_time)
+        with self.running_lock:
+            self.running[partition_id] = trial_id
+
+    def prep_results(self):
+        pass
+
+    def config_to_dict(self):
+        return {}
+
+    def log_string(self):
+        return ""
+
+    def _log(self, log_msg):
+        pass
+
+
+def _worker_cpu_time(thread):
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+
+def run(num_executors, seconds, hb_interval, steps):
+    base.hopshdfs = _NoHdfs
+    driver = BenchDriver(num_executors, hb_interval)
+    threads = set(threading.enumerate())
+    driver._start_worker()
+    (worker,) = set(threading.enumerate()) - threads
+
+    # idle worker without any messages
+    cpu_start = _worker_cpu_time(worker)
+    time.sleep(1.0)
+    idle_cpu = _worker_cpu_time(worker) - cpu_start
+
+    for partition_id in range(num_executors):
+        driver.add_message({"type": "REG", "partition_id": partition_id})
+
+    trial_ids = {}
+    # executors start at different points of their first trial
+    num_steps = {
+        partition_id: random.randrange(steps) for partition_id in range(num_executors)
+    }
+    cpu_start = _worker_cpu_time(worker)
+    start = time.time()
+    next_round = start
+    while time.time() - start < seconds:
+        with driver.running_lock:
+            running, driver.running = driver.running, {}
+        for partition_id, trial_id in running.items():
+            if partition_id in trial_ids or partition_id in driver.final_times:
+                continue
+            trial_ids[partition_id] = trial_id
+            num_steps.setdefault(partition_id, 0)
+        for partition_id in list(trial_ids):
+            step = num_steps[partition_id]
+            driver.add_message(
+                {
+                    "type": "METRIC",
+                    "partition_id": partition_id,
+                    "trial_id": trial_ids[partition_id],
+                    "logs": None,
+                    "data": [(step, random.random())],
+                }
+            )
+            num_steps[partition_id] += 1
+            if num_steps[partition_id] >= steps:
+                del num_steps[partition_id]
+                driver.final_times[partition_id] = time.time()
+                driver.add_message(
+                    {
+                        "type": "FINAL",
+                        "partition_id": partition_id,
+                        "trial_id": trial_ids.pop(partition_id),
+                        "logs": None,
+                        "data": random.random(),
+                    }
+                )
+        next_round += hb_interval
+        time.sleep(max(0, next_round - time.time()))
+    elapsed = time.time() - start
+    load_cpu = _worker_cpu_time(worker) - cpu_start
+
+    driver.worker_done = True
+    driver._message_q.close()
+    latencies = np.array(driver.latencies) * 1000
+    return (
+        idle_cpu,
+        load_cpu / elapsed,
+        len(driver._final_store) / elapsed,
+        np.percentile(latencies, 50),
+        np.percentile(latencies, 99),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--executors", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--hb-interval", type=float, default=1.0)
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        "{:>9} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "executors", "idle cpu", "load cpu", "trials/s", "p50 [ms]", "p99 [ms]"
+        )
+    )
+    for num_executors in args.executors:
+        print(
+            "{:>9} {:>9.0%} {:>9.0%} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                num_executors,
+                *run(num_executors, args.seconds, args.hb_interval, args.steps)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
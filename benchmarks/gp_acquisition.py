@@ -0,0 +1,104 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the acquisition optimization of the GP optimizer.
+
+Fits the GP surrogate to N finished trials of a synthetic function and
+times `GP.sampling_routine` with L-BFGS for an increasing number of
+restarts, for async strategies `impute` (EI) and `asy_ts`.
+
+Usage:
+
+    python benchmarks/gp_acquisition.py [--trials 100] [--n-jobs 4]
+"""
+
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer.bayes.gp import GP
+from maggy.trial import Trial
+
+
+def objective(params):
+    return -sum((value - 0.3) ** 2 for key, value in params.items() if key != "c") + (
+        0.1 if params["c"] == "a" else 0.0
+    )
+
+
+def fitted_optimizer(searchspace, n_trials, **kwargs):
+    optimizer = GP(num_warmup_trials=1, **kwargs)
+    optimizer.searchspace = searchspace
+    optimizer.num_trials = n_trials + 1
+    optimizer.direction = "max"
+    optimizer.final_store = FinalStore()
+    optimizer.trial_store = TrialStore()
+    optimizer.initialize()
+    for params in searchspace.get_random_parameter_values(n_trials):
+        trial = Trial(params)
+        trial.final_metric = objective(params)
+        trial.status = Trial.FINALIZED
+        optimizer.final_store.append(trial)
+    optimizer.update_model()
+    return optimizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--restarts", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    searchspace = Searchspace(
+        x1=("DOUBLE", [0, 1]),
+        x2=("DOUBLE", [0, 1]),
+        x3=("DOUBLE", [0, 1]),
+        x4=("DOUBLE", [0, 1]),
+        c=("CATEGORICAL", ["a", "b", "c"]),
+    )
+
+    print("{:<8} {:>9} {:>14}".format("strategy", "restarts", "suggestion [s]"))
+    for async_strategy in ["impute", "asy_ts"]:
+        for restarts in args.restarts:
+            np.random.seed(0)
+            optimizer = fitted_optimizer(
+                searchspace,
+                args.trials,
+                async_strategy=async_strategy,
+                acq_optimizer="lbfgs",
+                acq_optimizer_kwargs={
+                    "n_restarts_optimizer": restarts,
+                    "n_jobs": args.n_jobs,
+                },
+            )
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                optimizer.sampling_routine()
+            duration = (time.perf_counter() - start) / args.repeat
+            optimizer.finalize_experiment([])
+            print("{:<8} {:>9} {:>14.3f}".format(async_strategy, restarts, duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the exact and the sparse surrogate of the GP.
+
+Fits both surrogates to N noisy observations of the Branin function on the
+unit square, the way `GP.update_model` does, and reports the fit time, the
+RMSE of the predicted mean and the regret of the candidate with the best
+predicted mean. The exact GP is skipped above `--max-exact` observations.
+
+Usage:
+
+    python benchmarks/gp_surrogate.py [--observations 1000 2000 5000 20000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.base import clone
+
+from maggy import Searchspace
+from maggy.optimizer.bayes.gp import GP
+from maggy.optimizer.bayes.sparse_gp import SparseGaussianProcess
+
+
+def branin(X):
+    x1 = 15 * X[:, 0] - 5
+    x2 = 15 * X[:, 1]
+    return (
+        (x2 - 5.1 / (4 * np.pi**2) * x1**2 + 5 / np.pi * x1 - 6) ** 2
+        + 10 * (1 - 1 / (8 * np.pi)) * np.cos(x1)
+        + 10
+    )
+
+
+def _time(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def fit_exact(base_model, X, y):
+    return clone(base_model).fit(X, y)
+
+
+def fit_sparse(base_model, X, y, n_inducing, max_fit_samples, rng):
+    idx = rng.permutation(len(X))[:max_fit_samples]
+    regressor = clone(base_model).fit(X[idx], y[idx])
+    return SparseGaussianProcess.from_regressor(
+        regressor, inducing_points=X[idx[:n_inducing]]
+    ).fit(X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--observations", type=int, nargs="+", default=[1000, 2000, 5000, 20000]
+    )
+    parser.add_argument("--max-exact", type=int, default=2000)
+    parser.add_argument("--inducing", type=int, default=300)
+    parser.add_argument("--max-fit-samples", type=int, default=1000)
+    parser.add_argument("--candidates", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    optimizer = GP()
+    optimizer.searchspace = Searchspace(x1=("DOUBLE", [0, 1]), x2=("DOUBLE", [0, 1]))
+    optimizer.init_model()
+
+    X_test = rng.rand(args.candidates, 2)
+    y_test = branin(X_test)
+
+    print(
+        "{:>12} {:<6} {:>10} {:>8} {:>8}".format(
+            "observations", "model", "fit [s]", "rmse", "regret"
+        )
+    )
+    for n in args.observations:
+        X = rng.rand(n, 2)
+        y = branin(X) + rng.randn(n)
+        models = []
+        if n <= args.max_exact:
+            models.append(("exact",) + _time(fit_exact, optimizer.base_model, X, y))
+        models.append(
+            ("sparse",)
+            + _time(
+                fit_sparse,
+                optimizer.base_model,
+                X,
+                y,
+                args.inducing,
+                args.max_fit_samples,
+                rng,
+            )
+        )
+        for name, fit_time, model in models:
+            mean = model.predict(X_test)
+            rmse = np.sqrt(np.mean((mean - y_test) ** 2))
+            regret = y_test[np.argmin(mean)] - y_test.min()
+            print(
+                "{:>12} {:<6} {:>10.2f} {:>8.3f} {:>8.3f}".format(
+                    n, name, fit_time, rmse, regret
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
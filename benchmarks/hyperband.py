@@ -0,0 +1,105 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the scheduling of the Hyperband pruner.
+
+Runs random search with Hyperband over many SH iterations (brackets) like
+the experiment driver does, with W workers whose trials finish in the order
+they were started, and times the `get_suggestion` calls, which run the
+pruning routine.
+
+Usage:
+
+    python benchmarks/hyperband.py [--iterations 300] [--workers 32]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer import RandomSearch
+from maggy.trial import Trial
+
+
+def run(n_iterations, n_workers, max_budget, eta):
+    optimizer = RandomSearch(
+        pruner="hyperband",
+        pruner_kwargs={
+            "min_budget": 1,
+            "max_budget": max_budget,
+            "eta": eta,
+            "n_iterations": n_iterations,
+        },
+    )
+    optimizer.searchspace = Searchspace(x=("DOUBLE", [0, 10]))
+    optimizer.num_trials = optimizer.pruner.num_trials()
+    optimizer.direction = "min"
+    optimizer.final_store = FinalStore()
+    optimizer.trial_store = TrialStore()
+    optimizer.initialize()
+
+    running = []
+    durations = []
+    finished_trial = None
+    while True:
+        start = time.perf_counter()
+        suggestion = optimizer.get_suggestion(finished_trial)
+        durations.append(time.perf_counter() - start)
+        finished_trial = None
+        if isinstance(suggestion, Trial):
+            running.append(suggestion)
+            if len(running) < n_workers:
+                continue
+        elif suggestion is None and not running:
+            break
+        finished_trial = running.pop(0)
+        finished_trial.final_metric = finished_trial.params["x"]
+        finished_trial.status = Trial.FINALIZED
+        optimizer.final_store.append(finished_trial)
+    return len(optimizer.final_store), np.array(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--max-budget", type=int, default=81)
+    parser.add_argument("--eta", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_trials, durations = run(args.iterations, args.workers, args.max_budget, args.eta)
+    total = time.perf_counter() - start
+    print(
+        "{} trials, {} iterations, {} workers: total {:.2f}s, "
+        "get_suggestion mean {:.3f}ms, p99 {:.3f}ms, max {:.3f}ms".format(
+            n_trials,
+            args.iterations,
+            args.workers,
+            total,
+            1e3 * durations.mean(),
+            1e3 * np.percentile(durations, 99),
+            1e3 * durations.max(),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
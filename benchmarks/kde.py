@@ -0,0 +1,95 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the TPE kernel density estimator against statsmodels.
+
+Fits `KernelDensity` and `statsmodels.nonparametric.KDEMultivariate` to N
+observations with four continuous and two categorical variables, like the
+densities of TPE, and reports the fit time per bandwidth method and the
+pdf throughput. Requires statsmodels, which maggy itself does not need.
+
+Usage:
+
+    python benchmarks/kde.py [--observations 50 200 1000] [--points 10000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import statsmodels.api as sm
+
+from maggy.optimizer.bayes.kde import KernelDensity
+
+
+def _time(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _data(n, rng):
+    return np.column_stack([rng.rand(n, 4), rng.randint(0, 4, n), rng.randint(0, 3, n)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--observations", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument(
+        "--cv-max-observations",
+        type=int,
+        default=200,
+        help="skip the cross validation bandwidths of statsmodels above",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    var_type = "ccccuu"
+    X = _data(args.points, rng)
+
+    print(
+        "{:>12} {:<17} {:>16} {:>13} {:>18} {:>15}".format(
+            "observations",
+            "bw",
+            "statsmodels [s]",
+            "maggy [s]",
+            "statsmodels [pdf/s]",
+            "maggy [pdf/s]",
+        )
+    )
+    for n in args.observations:
+        data = _data(n, rng)
+        for bw in KernelDensity.BW_METHODS:
+            if bw != "normal_reference" and n > args.cv_max_observations:
+                continue
+            sm_fit, sm_kde = _time(
+                sm.nonparametric.KDEMultivariate, data=data, var_type=var_type, bw=bw
+            )
+            fit, kde = _time(KernelDensity, data, var_type, bw=bw)
+            sm_pdf, expected = _time(sm_kde.pdf, X)
+            pdf, actual = _time(kde.pdf, X)
+            assert np.allclose(actual, expected)
+            print(
+                "{:>12} {:<17} {:>16.4f} {:>13.4f} {:>18.0f} {:>15.0f}".format(
+                    n, bw, sm_fit, fit, len(X) / sm_pdf, len(X) / pdf
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
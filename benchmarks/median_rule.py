@@ -0,0 +1,88 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the median early stopping rule.
+
+Runs C checks of the median rule, as done on METRIC messages, against a
+final store of N finalized trials with metric histories of up to S steps. A
+new trial is finalized every F checks. Reports the time per check,
+including the time to add the finalized trials.
+
+Usage:
+
+    python benchmarks/median_rule.py [--finalized 2000] [--steps 100] [--checks 2000] [--finalize-every 10]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from maggy.core.trialstore import FinalStore
+from maggy.earlystop import MedianStoppingRule
+from maggy.trial import Trial
+
+
+def random_trial(i, n_steps):
+    trial = Trial({"i": i})
+    n = random.randint(1, n_steps)
+    trial.metric_history = list(np.cumsum(np.random.rand(n)) / np.arange(1, n + 1))
+    return trial
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--finalized", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--finalize-every", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    np.random.seed(0)
+    store = FinalStore(random_trial(i, args.steps) for i in range(args.finalized))
+    to_check = [random_trial(-i, args.steps) for i in range(1, args.checks + 1)]
+    new_trials = [
+        random_trial(args.finalized + i, args.steps)
+        for i in range(args.checks // args.finalize_every)
+    ]
+
+    durations = []
+    n_stopped = 0
+    for i, trial in enumerate(to_check):
+        if i % args.finalize_every == 0 and new_trials:
+            store.append(new_trials.pop())
+        start = time.perf_counter()
+        n_stopped += MedianStoppingRule.earlystop_check(trial, store, "max") is not None
+        durations.append(time.perf_counter() - start)
+    durations = np.array(durations)
+    print(
+        "{} checks, {} finalized trials: mean {:.3f}ms, first {:.1f}ms, "
+        "p99 {:.3f}ms, stopped {}".format(
+            len(durations),
+            len(store),
+            1e3 * durations.mean(),
+            1e3 * durations[0],
+            1e3 * np.percentile(durations, 99),
+            n_stopped,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Micro-benchmark of the rpc wire codecs.
+
+Measures how many messages per second each codec can encode and decode for
+the messages that make up most of the driver traffic, as well as the server
+side cost of a full exchange, i.e. decoding a request and encoding its
+response.
+
+Usage:
+
+    python benchmarks/rpc_codec.py [--seconds 1.0]
+"""
+
+import argparse
+import time
+
+from maggy.core import codec
+
+SECRET = "abcdef0123456789"
+
+MESSAGES = {
+    "METRIC": {
+        "partition_id": 12,
+        "type": "METRIC",
+        "secret": SECRET,
+        "trial_id": "3d1cc9fdb1d4d001",
+        "logs": None,
+        "data": {"value": 0.8712, "step": 17},
+    },
+    "GET": {"partition_id": 12, "type": "GET", "secret": SECRET, "data": None},
+    "FINAL": {
+        "partition_id": 12,
+        "type": "FINAL",
+        "secret": SECRET,
+        "trial_id": "3d1cc9fdb1d4d001",
+        "logs": "12: Finished Trial\n",
+        "data": 0.9031,
+    },
+    "OK": {"type": "OK"},
+    "TRIAL (idle)": {"type": "TRIAL", "trial_id": None, "data": None},
+}
+
+EXCHANGES = [("METRIC", "OK"), ("GET", "TRIAL (idle)"), ("FINAL", "OK")]
+
+
+def _rate(fn, arg, seconds):
+    n = 0
+    batch = 1000
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            fn(arg)
+        n += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(
+        "{:<14} {:<8} {:>6} {:>14} {:>14}".format(
+            "message", "codec", "bytes", "encode msg/s", "decode msg/s"
+        )
+    )
+    for msg_name, msg in MESSAGES.items():
+        for codec_name in codec.PREFERENCE:
+            wire_codec = codec.get(codec_name)
+            data = wire_codec.encode(msg)
+            assert codec.decode(data) == msg
+            encode_rate = _rate(wire_codec.encode, msg, args.seconds)
+            decode_rate = _rate(codec.decode, data, args.seconds)
+            print(
+                "{:<14} {:<8} {:>6} {:>14,.0f} {:>14,.0f}".format(
+                    msg_name, codec_name, len(data), encode_rate, decode_rate
+                )
+            )
+
+    print()
+    print("{:<22} {:<8} {:>14}".format("server exchange", "codec", "exchanges/s"))
+    for request_name, response_name in EXCHANGES:
+        for codec_name in codec.PREFERENCE:
+            wire_codec = codec.get(codec_name)
+            request = wire_codec.encode(MESSAGES[request_name])
+            response = MESSAGES[response_name]
+
+            def _exchange(data):
+                codec.decode(data)
+                wire_codec.encode(response)
+
+            print(
+                "{:<22} {:<8} {:>14,.0f}".format(
+                    request_name + " -> " + response_name,
+                    codec_name,
+                    _rate(_exchange, request, args.seconds),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
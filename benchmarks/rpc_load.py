@@ -0,0 +1,312 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Local load test of the experiment driver's rpc server backends.
+
+Starts a server against a fake experiment driver on localhost and simulates N
+executors, each holding its own connection. Every executor registers and then
+runs one of the scenarios:
+
+    - heartbeat: sends heartbeats (METRIC) and trial requests (GET) as fast as
+      the server answers them. Reports the request throughput and the latency
+      percentiles per backend.
+    - assign: finalizes a trial (FINAL) and waits for the next one, which the
+      fake driver assigns right away. Reports the time from sending FINAL to
+      receiving the next trial for long-polling GET requests and for the
+      previous one second polling. The fake driver needs ``--assign-delay``
+      seconds to come up with the next trial. All simulated executors share one event loop in this process, so
+with many clients the numbers are bounded by the client side as well.
+
+The select backend can not watch file descriptors above FD_SETSIZE (1024 on
+Linux), it is therefore skipped for more than ~1000 clients.
+
+Usage:
+
+    python benchmarks/rpc_load.py [--scenario heartbeat] [--seconds 5]
+        [--clients 100 1000 4000] [--backends select asyncio] [--codec struct]
+        [--assign-delay 0.05]
+"""
+
+import argparse
+import asyncio
+import queue
+import resource
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from maggy.core import codec, rpc
+
+SECRET = "abcdef0123456789"
+# the select backend fails for file descriptors >= FD_SETSIZE
+SELECT_MAX_CLIENTS = 1000
+
+BACKENDS = {"select": rpc.Server, "asyncio": rpc.AsyncServer}
+
+_FRAME_HEADER = struct.Struct(">I")
+
+
+class _FakeTrial(object):
+    params = {"x": 1}
+
+    def __init__(self):
+        self.info_dict = {}
+
+    def get_early_stop(self):
+        return False
+
+
+class FakeDriver(object):
+    """Implements the parts of the experiment driver used by the server. Like
+    the real driver, it assigns the next trial to an executor on its worker
+    thread once the FINAL message of the previous one arrives.
+    """
+
+    def __init__(self, num_trials, server, assign_delay=0):
+        self._secret = SECRET
+        self.experiment_done = False
+        self.num_trials = num_trials
+        self.num_messages = 0
+        self.server = server
+        self.assign_delay = assign_delay
+        self._trial = _FakeTrial()
+        self._message_q = queue.Queue()
+        worker = threading.Thread(target=self._worker)
+        worker.daemon = True
+        worker.start()
+
+    def _worker(self):
+        while True:
+            msg = self._message_q.get()
+            if msg is None:
+                return
+            wait = msg["received"] + self.assign_delay - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self.server.reservations.assign_trial(msg["partition_id"], "trial")
+
+    def stop(self):
+        self._message_q.put(None)
+
+    def add_message(self, msg):
+        self.num_messages += 1
+        if msg["type"] == "FINAL":
+            self._message_q.put(dict(msg, received=time.time()))
+
+    def get_trial(self, trial_id):
+        return self._trial
+
+    def _get_logs(self):
+        result = {"num_trials": 0, "early_stopped": 0, "best_val": None}
+        return result, ""
+
+    def _log(self, log_msg):
+        pass
+
+
+async def _request(reader, writer, wire_codec, msg):
+    data = wire_codec.encode(msg)
+    writer.write(_FRAME_HEADER.pack(len(data)) + data)
+    header = await reader.readexactly(_FRAME_HEADER.size)
+    return codec.decode(await reader.readexactly(_FRAME_HEADER.unpack(header)[0]))
+
+
+async def _register(partition_id, reader, writer, codec_name):
+    reg = {
+        "partition_id": partition_id,
+        "type": "REG",
+        "secret": SECRET,
+        "codecs": [codec_name],
+        "data": {
+            "partition_id": partition_id,
+            "host_port": writer.get_extra_info("sockname"),
+            "task_attempt": 0,
+            "trial_id": None,
+        },
+    }
+    resp = await _request(reader, writer, codec.DEFAULT, reg)
+    return codec.get(resp.get("codec", codec.DEFAULT.name))
+
+
+async def _heartbeat_client(partition_id, server_addr, codec_name, deadline):
+    latencies = []
+    reader, writer = await asyncio.open_connection(*server_addr)
+    wire_codec = await _register(partition_id, reader, writer, codec_name)
+
+    metric = {
+        "partition_id": partition_id,
+        "type": "METRIC",
+        "secret": SECRET,
+        "trial_id": None,
+        "logs": None,
+        "data": {"value": None, "step": -1},
+    }
+    get = {"partition_id": partition_id, "type": "GET", "secret": SECRET, "data": None}
+    i = 0
+    while time.perf_counter() < deadline:
+        msg = metric if i % 2 == 0 else get
+        start = time.perf_counter()
+        await _request(reader, writer, wire_codec, msg)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    writer.close()
+    return latencies
+
+
+async def _assign_client(
+    partition_id, server_addr, codec_name, deadline, poll_interval
+):
+    latencies = []
+    reader, writer = await asyncio.open_connection(*server_addr)
+    wire_codec = await _register(partition_id, reader, writer, codec_name)
+
+    final = {
+        "partition_id": partition_id,
+        "type": "FINAL",
+        "secret": SECRET,
+        "trial_id": "trial",
+        "logs": None,
+        "data": 0.5,
+    }
+    # long-polling requests carry their timeout, polling ones None
+    get = {
+        "partition_id": partition_id,
+        "type": "GET",
+        "secret": SECRET,
+        "data": None if poll_interval else rpc.LONG_POLL_TIMEOUT,
+    }
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await _request(reader, writer, wire_codec, final)
+        while (await _request(reader, writer, wire_codec, get))["trial_id"] is None:
+            # the client used to sleep one second between GET requests
+            await asyncio.sleep(poll_interval)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    return latencies
+
+
+async def _run_clients(
+    scenario, num_clients, server_addr, codec_name, seconds, poll_interval
+):
+    # connections are established before the measurement starts
+    deadline = time.perf_counter() + seconds + 1.0 + num_clients / 1000.0
+    start = time.perf_counter()
+    if scenario == "heartbeat":
+        clients = [
+            _heartbeat_client(i, server_addr, codec_name, deadline)
+            for i in range(num_clients)
+        ]
+    else:
+        clients = [
+            _assign_client(i, server_addr, codec_name, deadline, poll_interval)
+            for i in range(num_clients)
+        ]
+    results = await asyncio.gather(*clients)
+    return [x for latencies in results for x in latencies], time.perf_counter() - start
+
+
+def _free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(
+    scenario, backend, num_clients, seconds, codec_name, poll_interval=0, assign_delay=0
+):
+    # presetting the address skips the registration with Hopsworks
+    rpc.server_host_port = ("127.0.0.1", _free_port())
+    server = BACKENDS[backend](num_clients)
+    driver = FakeDriver(num_clients, server, assign_delay)
+    server_addr = server.start(driver)
+    try:
+        loop = asyncio.new_event_loop()
+        latencies, elapsed = loop.run_until_complete(
+            _run_clients(
+                scenario, num_clients, server_addr, codec_name, seconds, poll_interval
+            )
+        )
+        loop.close()
+    finally:
+        server.stop()
+        driver.stop()
+    latencies = np.array(latencies) * 1000
+    return (
+        len(latencies) / elapsed,
+        np.percentile(latencies, 50),
+        np.percentile(latencies, 99),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scenario", default="heartbeat", choices=["heartbeat", "assign"]
+    )
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 1000, 4000])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--backends", nargs="+", default=list(BACKENDS.keys()), choices=BACKENDS
+    )
+    parser.add_argument("--assign-delay", type=float, default=0.05)
+    parser.add_argument("--codec", default="struct", choices=list(codec.CODECS))
+    args = parser.parse_args()
+
+    # every client needs a socket on both ends of the connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = 2 * max(args.clients) + 64
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    if args.scenario == "assign":
+        modes = [("long-poll", 0), ("poll 1s", 1.0)]
+        header = ("backend", "clients", "GET mode", "trials/s", "p50 [ms]", "p99 [ms]")
+    else:
+        modes = [("", 0)]
+        header = ("backend", "clients", "", "requests/s", "p50 [ms]", "p99 [ms]")
+    row = "{:<8} {:>8} {:<10} {:>12,.0f} {:>10.2f} {:>10.2f}"
+    print("{:<8} {:>8} {:<10} {:>12} {:>10} {:>10}".format(*header))
+    for num_clients in args.clients:
+        for backend in args.backends:
+            if backend == "select" and num_clients > SELECT_MAX_CLIENTS:
+                print(
+                    "{:<8} {:>8} {:>12}".format(
+                        backend, num_clients, "skipped (FD_SETSIZE)"
+                    )
+                )
+                continue
+            for mode, poll_interval in modes:
+                rate, p50, p99 = run(
+                    args.scenario,
+                    backend,
+                    num_clients,
+                    args.seconds,
+                    args.codec,
+                    poll_interval,
+                    args.assign_delay,
+                )
+                print(row.format(backend, num_clients, mode, rate, p50, p99))
+
+
+if __name__ == "__main__":
+    main()
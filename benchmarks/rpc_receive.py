@@ -0,0 +1,122 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the framed rpc receive path.
+
+Sends length-prefixed frames with payloads from 1 KB up to 50 MB over a local
+socket pair and measures the time `MessageSocket.receive` needs to read and
+decode them. For comparison, the previous implementation, which read 2 KB
+chunks and concatenated them, is measured as well (it is skipped for payloads
+above ``--legacy-max`` since it is quadratic in the frame size).
+
+Usage:
+
+    python benchmarks/rpc_receive.py [--repeat 5] [--legacy-max 8MB]
+"""
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from maggy.core import codec, rpc
+
+SIZES = [
+    ("1KB", 1024),
+    ("64KB", 64 * 1024),
+    ("1MB", 1024 * 1024),
+    ("8MB", 8 * 1024 * 1024),
+    ("50MB", 50 * 1024 * 1024),
+]
+
+
+def _legacy_receive(sock):
+    """The receive path before frames were read with recv_into."""
+    data = b""
+    recv_done = False
+    recv_len = -1
+    while not recv_done:
+        buf = sock.recv(1024 * 2)
+        if buf is None or len(buf) == 0:
+            raise Exception("socket closed")
+        if recv_len == -1:
+            recv_len = struct.unpack(">I", buf[:4])[0]
+            data += buf[4:]
+            recv_len -= len(data)
+        else:
+            data += buf
+            recv_len -= len(buf)
+        recv_done = recv_len == 0
+    return codec.decode(data)
+
+
+def _time_receive(receive, frame, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        reader, writer = socket.socketpair()
+        sender = threading.Thread(target=writer.sendall, args=(frame,))
+        start = time.perf_counter()
+        sender.start()
+        receive(reader)
+        elapsed = time.perf_counter() - start
+        sender.join()
+        reader.close()
+        writer.close()
+        best = min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--legacy-max",
+        default="8MB",
+        choices=[name for name, _ in SIZES],
+        help="largest payload to measure with the legacy receive path",
+    )
+    args = parser.parse_args()
+    legacy_max = dict(SIZES)[args.legacy_max]
+
+    receiver = rpc.MessageSocket()
+    print(
+        "{:<8} {:>14} {:>14} {:>10}".format(
+            "payload", "recv_into [ms]", "legacy [ms]", "MB/s"
+        )
+    )
+    for name, size in SIZES:
+        # a LOG response is the typical large message
+        data = codec.DEFAULT.encode({"type": "OK", "ex_logs": "x" * size})
+        frame = struct.pack(">I", len(data)) + data
+
+        elapsed = _time_receive(receiver.receive, frame, args.repeat)
+        if size <= legacy_max:
+            legacy = "{:>14.2f}".format(
+                _time_receive(_legacy_receive, frame, args.repeat) * 1000
+            )
+        else:
+            legacy = "{:>14}".format("-")
+        print(
+            "{:<8} {:>14.2f} {} {:>10,.0f}".format(
+                name, elapsed * 1000, legacy, len(frame) / elapsed / 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Micro-benchmark of the searchspace transforms.
+
+Compares transforming N configs of a mixed searchspace row by row, as
+`np.apply_along_axis` with `Searchspace.transform` and
+`Searchspace.inverse_transform`, to the column-wise `transform_array` and
+`inverse_transform_array`.
+
+Usage:
+
+    python benchmarks/searchspace_transform.py [--configs 100000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from maggy import Searchspace
+
+
+def _time(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--configs", type=int, default=100000)
+    args = parser.parse_args()
+
+    sp = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        dropout=("DOUBLE", [0.0, 0.5]),
+        units=("INTEGER", [16, 512]),
+        layers=("INTEGER", [1, 8]),
+        activation=("CATEGORICAL", ["relu", "tanh", "sigmoid", "elu"]),
+        optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+    )
+    # string array, like the hparams of the optimizers' `get_hparams_array`
+    configs = np.array(sp.get_random_parameter_array(args.configs, rng=0).tolist())
+
+    row_time, row_transformed = _time(
+        np.apply_along_axis, sp.transform, 1, configs, normalize_categorical=True
+    )
+    array_time, transformed = _time(
+        sp.transform_array, configs, normalize_categorical=True
+    )
+    assert np.allclose(row_transformed.astype(float), transformed)
+
+    row_inverse_time, _ = _time(
+        np.apply_along_axis,
+        sp.inverse_transform,
+        1,
+        transformed,
+        normalize_categorical=True,
+    )
+    array_inverse_time, _ = _time(
+        sp.inverse_transform_array, transformed, normalize_categorical=True
+    )
+
+    print("{:<18} {:>12} {:>12} {:>9}".format("", "row [s]", "array [s]", "speedup"))
+    for name, row, array in [
+        ("transform", row_time, array_time),
+        ("inverse_transform", row_inverse_time, array_inverse_time),
+    ]:
+        print(
+            "{:<18} {:>12.3f} {:>12.3f} {:>8.0f}x".format(name, row, array, row / array)
+        )
+
+
+if __name__ == "__main__":
+    main()
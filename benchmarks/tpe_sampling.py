@@ -0,0 +1,93 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark of the candidate sampling of the TPE optimizer.
+
+Fits the TPE densities to N finished trials of a synthetic function on a
+mixed searchspace and times `TPE.sampling_routine` for an increasing
+number of candidates `n_samples`.
+
+Usage:
+
+    python benchmarks/tpe_sampling.py [--trials 200] [--samples 24 240 2400]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer.bayes.tpe import TPE
+from maggy.trial import Trial
+
+
+def objective(params):
+    return (
+        (params["lr"] - 0.01) ** 2
+        + (params["units"] - 128) ** 2 / 1e5
+        + (0.0 if params["activation"] == "relu" else 0.1)
+    )
+
+
+def fitted_optimizer(searchspace, n_trials, n_samples):
+    optimizer = TPE(num_warmup_trials=1, n_samples=n_samples)
+    optimizer.searchspace = searchspace
+    optimizer.num_trials = n_trials + 1
+    optimizer.direction = "min"
+    optimizer.final_store = FinalStore()
+    optimizer.trial_store = TrialStore()
+    optimizer.initialize()
+    for params in searchspace.get_random_parameter_values(n_trials):
+        trial = Trial(params)
+        trial.final_metric = objective(params)
+        trial.status = Trial.FINALIZED
+        optimizer.final_store.append(trial)
+    optimizer.update_model()
+    return optimizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--samples", type=int, nargs="+", default=[24, 240, 2400])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    searchspace = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        dropout=("DOUBLE", [0.0, 0.5]),
+        units=("INTEGER", [16, 512]),
+        layers=("INTEGER", [1, 8]),
+        activation=("CATEGORICAL", ["relu", "tanh", "sigmoid", "elu"]),
+        optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+    )
+
+    print("{:>9} {:>14}".format("n_samples", "suggestion [s]"))
+    for n_samples in args.samples:
+        np.random.seed(0)
+        optimizer = fitted_optimizer(searchspace, args.trials, n_samples)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            optimizer.sampling_routine()
+        duration = (time.perf_counter() - start) / args.repeat
+        print("{:>9} {:>14.4f}".format(n_samples, duration))
+
+
+if __name__ == "__main__":
+    main()
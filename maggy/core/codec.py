@@ -0,0 +1,361 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Wire codecs for the messages exchanged between the experiment driver and the
+trial executors.
+
+Every frame payload is self-describing through its first byte:
+
+    - ``0x80``: a (cloud)pickled message. This is the PROTO opcode every
+      pickle of protocol 2 or higher starts with, hence it is also the legacy
+      wire format and the format used by clients which don't negotiate a codec
+      (e.g. the sparkmagic LOG requests).
+    - ``SCHEMA_VERSION``: a struct frame. The second byte is the code of the
+      schema describing the remaining fields.
+
+This allows the server to decode any frame without keeping state, while the
+codec for responses is negotiated per executor at registration.
+"""
+
+import struct
+
+import numpy as np
+from pyspark import cloudpickle
+
+SCHEMA_VERSION = 1
+PICKLE_MARKER = 0x80
+
+_HEADER = struct.Struct(">BB")
+_LONG = struct.Struct(">q")
+_DOUBLE = struct.Struct(">d")
+_LEN = struct.Struct(">I")
+_NONE_LEN = 0xFFFFFFFF
+_NONE_LEN_BYTES = _LEN.pack(_NONE_LEN)
+
+# tags of numeric values, the value itself is always packed into 8 bytes
+_NUM_NONE = 0
+_NUM_INT = 1
+_NUM_FLOAT = 2
+_NUM_EMPTY = bytes(8)
+
+
+_TYPE_KEY = frozenset(["type"])
+
+
+class UnsupportedMessage(Exception):
+    """Raised when a message can't be represented by a struct schema."""
+
+
+def _pack_num(value):
+    if value is None:
+        return _NUM_NONE, _NUM_EMPTY
+    elif isinstance(value, (bool, np.bool_)):
+        # bools would silently turn into ints
+        raise UnsupportedMessage
+    elif isinstance(value, (int, np.integer)):
+        return _NUM_INT, _LONG.pack(int(value))
+    elif isinstance(value, (float, np.floating)):
+        return _NUM_FLOAT, _DOUBLE.pack(float(value))
+    raise UnsupportedMessage
+
+
+def _unpack_num(tag, raw):
+    if tag == _NUM_FLOAT:
+        return _DOUBLE.unpack(raw)[0]
+    elif tag == _NUM_INT:
+        return _LONG.unpack(raw)[0]
+    elif tag == _NUM_NONE:
+        return None
+    raise ValueError("Unknown numeric tag in struct frame: {}".format(tag))
+
+
+# struct formats of the fixed width field kinds, strings are length-prefixed
+_FIXED_FORMATS = {
+    "int": "i",
+    "long": "q",
+    "num": "B8s",
+    "bool": "?",
+    "none": "",
+    "metric": "B8sB8s",
+}
+# variable width field kinds, packed after the fixed width fields
+_VARIABLE_KINDS = ("str", "pairs")
+# a (step, value) pair of a batched heartbeat
+_PAIR = struct.Struct(">B8sB8s")
+
+
+class _Schema(object):
+    """Layout of one message type. All fixed width fields are packed with a
+    single precompiled struct, followed by the length-prefixed utf-8 strings
+    and lists of (step, value) pairs.
+    """
+
+    def __init__(self, code, msg_type, fields):
+        self.code = code
+        self.msg_type = msg_type
+        self.field_names = frozenset(name for name, _ in fields)
+        self.fixed = []
+        self.variable = []
+        fmt = ">BB"
+        for name, kind in fields:
+            if kind in _VARIABLE_KINDS:
+                self.variable.append((name, kind))
+            else:
+                self.fixed.append((name, kind))
+                fmt += _FIXED_FORMATS[kind]
+        self.struct = struct.Struct(fmt)
+
+    def encode(self, msg):
+        values = [SCHEMA_VERSION, self.code]
+        for name, kind in self.fixed:
+            value = msg[name]
+            if kind == "num":
+                values.extend(_pack_num(value))
+            elif kind == "int" or kind == "long":
+                if not isinstance(value, (int, np.integer)) or isinstance(value, bool):
+                    raise UnsupportedMessage
+                values.append(value)
+            elif kind == "metric":
+                # heartbeat payload: {"value": metric, "step": step}
+                if not isinstance(value, dict) or value.keys() != {"value", "step"}:
+                    raise UnsupportedMessage
+                values.extend(_pack_num(value["value"]))
+                values.extend(_pack_num(value["step"]))
+            elif kind == "bool":
+                if not isinstance(value, (bool, np.bool_)):
+                    raise UnsupportedMessage
+                values.append(bool(value))
+            elif value is not None:
+                # kind "none"
+                raise UnsupportedMessage
+        out = [self.struct.pack(*values)]
+        for name, kind in self.variable:
+            value = msg[name]
+            if value is None:
+                out.append(_NONE_LEN_BYTES)
+            elif kind == "pairs":
+                if not isinstance(value, (list, tuple)):
+                    raise UnsupportedMessage
+                out.append(_LEN.pack(len(value)))
+                for step, metric in value:
+                    out.append(_PAIR.pack(*_pack_num(step), *_pack_num(metric)))
+            elif isinstance(value, str):
+                data = value.encode("utf-8")
+                out.append(_LEN.pack(len(data)))
+                out.append(data)
+            else:
+                raise UnsupportedMessage
+        return b"".join(out)
+
+    def decode(self, buf):
+        msg = {"type": self.msg_type}
+        values = self.struct.unpack_from(buf, 0)
+        i = 2
+        for name, kind in self.fixed:
+            if kind == "num":
+                msg[name] = _unpack_num(values[i], values[i + 1])
+                i += 2
+            elif kind == "metric":
+                msg[name] = {
+                    "value": _unpack_num(values[i], values[i + 1]),
+                    "step": _unpack_num(values[i + 2], values[i + 3]),
+                }
+                i += 4
+            elif kind == "none":
+                msg[name] = None
+            else:
+                msg[name] = values[i]
+                i += 1
+        offset = self.struct.size
+        for name, kind in self.variable:
+            length = _LEN.unpack_from(buf, offset)[0]
+            offset += 4
+            if length == _NONE_LEN:
+                msg[name] = None
+            elif kind == "pairs":
+                pairs = []
+                for _ in range(length):
+                    values = _PAIR.unpack_from(buf, offset)
+                    pairs.append(
+                        (
+                            _unpack_num(values[0], values[1]),
+                            _unpack_num(values[2], values[3]),
+                        )
+                    )
+                    offset += _PAIR.size
+                msg[name] = pairs
+            else:
+                msg[name] = str(buf[offset : offset + length], "utf-8")
+                offset += length
+        return msg
+
+
+# (code, message type, ((field name, field kind), ...))
+# Requests and responses may share a message type, the schema is chosen by the
+# set of keys in the message. Codes must never be reused, add new schemas and
+# bump SCHEMA_VERSION when changing existing ones.
+_SCHEMAS = (
+    (1, "QUERY", (("partition_id", "int"), ("secret", "str"), ("data", "none"))),
+    (2, "GET", (("partition_id", "int"), ("secret", "str"), ("data", "none"))),
+    (
+        3,
+        "METRIC",
+        (
+            ("partition_id", "int"),
+            ("secret", "str"),
+            ("trial_id", "str"),
+            ("logs", "str"),
+            ("data", "metric"),
+        ),
+    ),
+    (
+        4,
+        "FINAL",
+        (
+            ("partition_id", "int"),
+            ("secret", "str"),
+            ("trial_id", "str"),
+            ("logs", "str"),
+            ("data", "num"),
+        ),
+    ),
+    # long-polling GET, data is the timeout in seconds
+    (5, "GET", (("partition_id", "int"), ("secret", "str"), ("data", "num"))),
+    # batched heartbeat, data is a list of (step, value) pairs
+    (
+        6,
+        "METRIC",
+        (
+            ("partition_id", "int"),
+            ("secret", "str"),
+            ("trial_id", "str"),
+            ("logs", "str"),
+            ("data", "pairs"),
+        ),
+    ),
+    (16, "OK", ()),
+    (17, "STOP", ()),
+    (18, "GSTOP", ()),
+    (19, "ERR", ()),
+    (20, "QUERY", (("data", "bool"),)),
+    (21, "TRIAL", (("trial_id", "str"), ("data", "none"))),
+    # heartbeat responses telling the executor its new heartbeat interval
+    (22, "OK", (("hb_interval", "num"),)),
+    (23, "STOP", (("hb_interval", "num"),)),
+)
+
+# requests retried by the client carry a request id, every request schema has
+# a variant with the id appended, its code is offset by _RID_CODE_OFFSET
+_RID_CODE_OFFSET = 32
+_REQUEST_CODES = range(1, 16)
+
+
+class PickleCodec(object):
+    """Serializes every message with cloudpickle."""
+
+    name = "pickle"
+
+    def encode(self, msg):
+        return cloudpickle.dumps(msg)
+
+    def decode(self, data):
+        return decode(data)
+
+
+class StructCodec(object):
+    """Encodes the frequent, fixed-layout messages (heartbeats, GET/FINAL and
+    their responses) as struct frames and falls back to cloudpickle for
+    everything else, e.g. registrations or trials with arbitrary parameters.
+    """
+
+    name = "struct"
+
+    def __init__(self):
+        self._by_type = {}
+        self._by_code = {}
+        for code, msg_type, fields in _SCHEMAS:
+            schemas = [_Schema(code, msg_type, fields)]
+            if code in _REQUEST_CODES:
+                schemas.append(
+                    _Schema(
+                        code + _RID_CODE_OFFSET,
+                        msg_type,
+                        fields + (("rid", "long"),),
+                    )
+                )
+            for schema in schemas:
+                self._by_type.setdefault(msg_type, []).append(schema)
+                self._by_code[schema.code] = schema
+
+    def encode(self, msg):
+        keys = msg.keys() - _TYPE_KEY
+        for schema in self._by_type.get(msg.get("type"), ()):
+            if keys != schema.field_names:
+                continue
+            try:
+                return schema.encode(msg)
+            except (UnsupportedMessage, struct.error, ValueError, TypeError):
+                continue
+        return cloudpickle.dumps(msg)
+
+    def decode(self, data):
+        if data[0] != SCHEMA_VERSION:
+            return decode(data)
+        try:
+            schema = self._by_code[data[1]]
+        except KeyError:
+            raise ValueError("Unknown schema code in struct frame: {}".format(data[1]))
+        return schema.decode(data)
+
+
+CODECS = {PickleCodec.name: PickleCodec(), StructCodec.name: StructCodec()}
+
+# codecs in order of preference, offered by the client at registration
+PREFERENCE = [StructCodec.name, PickleCodec.name]
+
+DEFAULT = CODECS[PickleCodec.name]
+
+
+def get(name):
+    """Returns the codec instance registered under ``name``."""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(
+            "Unknown codec {}, expected one of {}".format(name, list(CODECS.keys()))
+        )
+
+
+def negotiate(offered):
+    """Returns the name of the first codec in ``offered`` supported by this
+    side of the connection, defaults to pickle.
+    """
+    for name in offered or []:
+        if name in CODECS:
+            return name
+    return PickleCodec.name
+
+
+def decode(data):
+    """Decodes a frame payload regardless of the codec it was encoded with."""
+    if len(data) == 0:
+        raise ValueError("Empty frame payload")
+    if data[0] == PICKLE_MARKER:
+        return cloudpickle.loads(data)
+    elif data[0] == SCHEMA_VERSION:
+        return CODECS[StructCodec.name].decode(data)
+    raise ValueError("Unknown wire format marker: {}".format(data[0]))
@@ -35,9 +35,18 @@ class Driver(base.Driver):
         num_executors,
         hb_interval,
         log_dir,
+        rpc_backend="select",
+        rpc_multiplex=False,
     ):
         super().__init__(
-            name, description, direction, num_executors, hb_interval, log_dir
+            name,
+            description,
+            direction,
+            num_executors,
+            hb_interval,
+            log_dir,
+            rpc_backend,
+            rpc_multiplex,
         )
         # set up an ablation study experiment
         self.earlystop_check = NoStoppingRule.earlystop_check
@@ -18,7 +18,7 @@
 The experiment driver implements the functionality for scheduling trials on
 maggy.
 """
-import queue
+import collections
 import threading
 import json
 import os
@@ -34,6 +34,9 @@ from hops.experiment_impl.util import experiment_utils
 
 from maggy import util
 from maggy.core import rpc
+from maggy.core.stats import MetricStatistics
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.core.experiment_driver.message_queue import MessageQueue
 from maggy.trial import Trial
 from maggy.earlystop import NoStoppingRule
 
@@ -43,22 +46,51 @@ driver_secret = None
 class Driver(ABC):
 
     SECRET_BYTES = 8
+    # max factor by which heartbeat intervals are increased under load
+    MAX_HB_BACKOFF = 8
+    # seconds after which idle executors ask the controller for a trial again,
+    # if no finished trial woke them up before
+    IDLE_FALLBACK = 1
 
     def __init__(
-        self, name, description, direction, num_executors, hb_interval, log_dir
+        self,
+        name,
+        description,
+        direction,
+        num_executors,
+        hb_interval,
+        log_dir,
+        rpc_backend="select",
+        rpc_multiplex=False,
     ):
         global driver_secret
 
         # COMMON EXPERIMENT SETUP
         # Functionality inits
-        self._final_store = []
-        self._trial_store = {}
+        self._final_store = FinalStore()
+        self._trial_store = TrialStore()
         self.num_executors = num_executors
-        self._message_q = queue.Queue()
+        self._message_q = MessageQueue()
         self.experiment_done = False
         self.worker_done = False
         self.hb_interval = hb_interval
-        self.server = rpc.Server(self.num_executors)
+        # heartbeat interval of each executor, if it differs from hb_interval
+        self._hb_intervals = {}
+        # executors waiting for the controller to have a trial ready, in the
+        # order they became idle
+        self._idle_partitions = collections.deque()
+        self._idle_fallback = False
+        if rpc_backend == "select":
+            self.server = rpc.Server(self.num_executors, rpc_multiplex)
+        elif rpc_backend == "asyncio":
+            self.server = rpc.AsyncServer(self.num_executors, rpc_multiplex)
+        else:
+            raise Exception(
+                "The experiment's rpc backend should be a string (either 'select' "
+                "or 'asyncio') but it is {0} (of type '{1}').".format(
+                    str(rpc_backend), type(rpc_backend).__name__
+                )
+            )
 
         if not driver_secret:
             driver_secret = self._generate_secret(self.SECRET_BYTES)
@@ -67,6 +99,9 @@ class Driver(ABC):
         self.executor_logs = ""
         self.maggy_log = ""
         self.log_lock = threading.RLock()
+        # held while the stores change, the optimizer reads them from the
+        # prefetching thread
+        self.store_lock = threading.RLock()
         self.log_file = log_dir + "/maggy.log"
         self.log_dir = log_dir
         self.exception = None
@@ -80,6 +115,8 @@ class Driver(ABC):
                     str(direction), type(direction).__name__
                 )
             )
+        # summary of the final metrics, without keeping all of them
+        self.metric_stats = MetricStatistics(self.direction)
 
         # Open File desc for HDFS to log
         if not hopshdfs.exists(self.log_file):
@@ -113,6 +150,7 @@ class Driver(ABC):
         self.duration_str = experiment_utils._time_diff(self.job_start, self.job_end)
 
         results = self.prep_results()
+        self.result["metric_stats"] = self.metric_stats.to_dict()
 
         print(results)
         self._log(results)
@@ -142,171 +180,29 @@ class Driver(ABC):
         pass
 
     def _start_worker(self):
+        handlers = {
+            "METRIC": self._handle_metric,
+            "BLACK": self._handle_black,
+            "FINAL": self._handle_final,
+            "IDLE": self._handle_idle,
+            "REG": self._handle_reg,
+        }
+
         def _target_function(self):
 
             try:
                 while not self.worker_done:
-                    trial = None
-                    # get a message
-                    try:
-                        msg = self._message_q.get_nowait()
-                    except queue.Empty:
-                        msg = {"type": None}
-
-                    # depending on message do the work
-                    # 1. METRIC
-                    if msg["type"] == "METRIC":
-                        # append executor logs if in the message
-                        logs = msg.get("logs", None)
-                        if logs is not None:
-                            with self.log_lock:
-                                self.executor_logs = self.executor_logs + logs
-
-                        step = None
-                        if msg["trial_id"] is not None and msg["data"] is not None:
-                            step = self.get_trial(msg["trial_id"]).append_metric(
-                                msg["data"]
-                            )
-
-                        # maybe these if statements should be in a function
-                        # also this could be made a separate message
-                        # i.e. step nr is added to the queue as message which will
-                        # then later be checked for early stopping, just to not
-                        # block for too long for other messages
-                        if self.earlystop_check != NoStoppingRule.earlystop_check:
-                            if len(self._final_store) > self.es_min:
-                                if step is not None and step != 0:
-                                    if step % self.es_interval == 0:
-                                        try:
-                                            to_stop = self.earlystop_check(
-                                                self.get_trial(msg["trial_id"]),
-                                                self._final_store,
-                                                self.direction,
-                                            )
-                                        except Exception as e:
-                                            self._log(e)
-                                            to_stop = None
-                                        if to_stop is not None:
-                                            self._log(
-                                                "Trials to stop: {}".format(to_stop)
-                                            )
-                                            self.get_trial(to_stop).set_early_stop()
-
-                    # 2. BLACKLIST the trial
-                    elif msg["type"] == "BLACK":
-                        trial = self.get_trial(msg["trial_id"])
-                        with trial.lock:
-                            trial.status = Trial.SCHEDULED
-                            self.server.reservations.assign_trial(
-                                msg["partition_id"], msg["trial_id"]
-                            )
-
-                    # 3. FINAL
-                    elif msg["type"] == "FINAL":
-                        # set status
-                        # get trial only once
-                        trial = self.get_trial(msg["trial_id"])
-
-                        logs = msg.get("logs", None)
-                        if logs is not None:
-                            with self.log_lock:
-                                self.executor_logs = self.executor_logs + logs
-
-                        # finalize the trial object
-                        with trial.lock:
-                            trial.status = Trial.FINALIZED
-                            trial.final_metric = msg["data"]
-                            trial.duration = experiment_utils._seconds_to_milliseconds(
-                                time.time() - trial.start
-                            )
-
-                        # move trial to the finalized ones
-                        self._final_store.append(trial)
-                        self._trial_store.pop(trial.trial_id)
-
-                        # update result dictionary
-                        self._update_result(trial)
-                        # keep for later in case tqdm doesn't work
-                        self.maggy_log = self._update_maggy_log()
-                        self._log(self.maggy_log)
-
-                        hopshdfs.dump(
-                            trial.to_json(),
-                            self.log_dir + "/" + trial.trial_id + "/trial.json",
-                        )
-
-                        # assign new trial
-                        trial = self.controller_get_next(trial)
-                        if trial is None:
-                            self.server.reservations.assign_trial(
-                                msg["partition_id"], None
-                            )
-                            self.experiment_done = True
-                        elif trial == "IDLE":
-                            self.add_message(
-                                {
-                                    "type": "IDLE",
-                                    "partition_id": msg["partition_id"],
-                                    "idle_start": time.time(),
-                                }
-                            )
-                            self.server.reservations.assign_trial(
-                                msg["partition_id"], None
-                            )
-                        else:
-                            with trial.lock:
-                                trial.start = time.time()
-                                trial.status = Trial.SCHEDULED
-                                self.server.reservations.assign_trial(
-                                    msg["partition_id"], trial.trial_id
-                                )
-                                self.add_trial(trial)
-
-                    # 4. Let executor be idle
-                    elif msg["type"] == "IDLE":
-                        # execute only every 0.1 seconds but do not block thread
-                        if time.time() - msg["idle_start"] > 0.1:
-                            trial = self.controller_get_next()
-                            if trial is None:
-                                self.server.reservations.assign_trial(
-                                    msg["partition_id"], None
-                                )
-                                self.experiment_done = True
-                            elif trial == "IDLE":
-                                # reset timeout
-                                msg["idle_start"] = time.time()
-                                self.add_message(msg)
-                            else:
-                                with trial.lock:
-                                    trial.start = time.time()
-                                    trial.status = Trial.SCHEDULED
-                                    self.server.reservations.assign_trial(
-                                        msg["partition_id"], trial.trial_id
-                                    )
-                                    self.add_trial(trial)
-                        else:
-                            self.add_message(msg)
-
-                    # 4. REG
-                    elif msg["type"] == "REG":
-                        trial = self.controller_get_next()
-                        if trial is None:
-                            self.server.reservations.assign_trial(
-                                msg["partition_id"], None
-                            )
-                            self.experiment_done = True
-                        elif trial == "IDLE":
-                            # reset timeout
-                            msg["idle_start"] = time.time()
-                            self.add_message(msg)
-                        else:
-                            with trial.lock:
-                                trial.start = time.time()
-                                trial.status = Trial.SCHEDULED
-                                self.server.reservations.assign_trial(
-                                    msg["partition_id"], trial.trial_id
-                                )
-                                self.add_trial(trial)
+                    # blocks until a message arrives, control messages are
+                    # handed out before heartbeats
+                    msg = self._message_q.get()
+                    if msg is None:
+                        break
+                    # heartbeats the executor sent before the control
+                    # message, its trial is about to change so there is no
+                    # need to check them for early stopping
+                    for metric_msg in msg.pop("telemetry", []):
+                        self._handle_metric(metric_msg, earlystop=False)
+                    handlers[msg["type"]](msg)
             except Exception as exc:
                 # Exception can't be propagated to parent thread
                 # therefore log the exception and fail experiment
@@ -318,9 +214,189 @@ class Driver(ABC):
         t.daemon = True
         t.start()
 
+    def _handle_metric(self, msg, earlystop=True):
+        # append executor logs if in the message
+        logs = msg.get("logs", None)
+        if logs is not None:
+            with self.log_lock:
+                self.executor_logs = self.executor_logs + logs
+
+        step = None
+        if msg["trial_id"] is not None and msg["data"] is not None:
+            trial = self.get_trial(msg["trial_id"])
+            if isinstance(msg["data"], dict):
+                step = trial.append_metric(msg["data"])
+            else:
+                # batched heartbeat with all new (step, value) pairs, check
+                # for early stopping once with a step that is due for a check
+                for pair_step, value in msg["data"]:
+                    new_step = trial.append_metric({"value": value, "step": pair_step})
+                    if new_step is not None and not (
+                        self.es_interval and step and step % self.es_interval == 0
+                    ):
+                        step = new_step
+
+        self._adapt_hb_interval(msg["partition_id"])
+
+        if earlystop and self.earlystop_check != NoStoppingRule.earlystop_check:
+            if len(self._final_store) > self.es_min:
+                if step is not None and step != 0:
+                    if step % self.es_interval == 0:
+                        try:
+                            to_stop = self.earlystop_check(
+                                self.get_trial(msg["trial_id"]),
+                                self._final_store,
+                                self.direction,
+                            )
+                        except Exception as e:
+                            self._log(e)
+                            to_stop = None
+                        if to_stop is not None:
+                            self._log("Trials to stop: {}".format(to_stop))
+                            self.get_trial(to_stop).set_early_stop()
+
+    def _handle_black(self, msg):
+        # blacklist the trial
+        trial = self.get_trial(msg["trial_id"])
+        with trial.lock:
+            trial.status = Trial.SCHEDULED
+            self.server.reservations.assign_trial(msg["partition_id"], msg["trial_id"])
+
+    def _handle_final(self, msg):
+        # get trial only once
+        trial = self.get_trial(msg["trial_id"])
+
+        logs = msg.get("logs", None)
+        if logs is not None:
+            with self.log_lock:
+                self.executor_logs = self.executor_logs + logs
+
+        # finalize the trial object
+        with trial.lock:
+            trial.status = Trial.FINALIZED
+            trial.final_metric = msg["data"]
+            trial.duration = experiment_utils._seconds_to_milliseconds(
+                time.time() - trial.start
+            )
+
+        # move trial to the finalized ones
+        with self.store_lock:
+            self._final_store.append(trial)
+            self._trial_store.pop(trial.trial_id)
+
+        # update result dictionary
+        self._update_result(trial)
+        # keep for later in case tqdm doesn't work
+        self.maggy_log = self._update_maggy_log()
+        self._log(self.maggy_log)
+
+        hopshdfs.dump(
+            trial.to_json(),
+            self.log_dir + "/" + trial.trial_id + "/trial.json",
+        )
+
+        # assign new trial
+        if self._assign_next(msg["partition_id"], self.controller_get_next(trial)):
+            # reporting the trial to the controller can make trials ready for
+            # the executors waiting, e.g. promotions at a rung boundary
+            self._wake_idle()
+        else:
+            self._set_idle(msg["partition_id"])
+            self.server.reservations.assign_trial(msg["partition_id"], None)
+
+    def _handle_idle(self, msg):
+        # fallback timer, for trials getting ready without a trial finishing
+        self._idle_fallback = False
+        self._wake_idle()
+
+    def _handle_reg(self, msg):
+        if not self._assign_next(msg["partition_id"], self.controller_get_next()):
+            self._set_idle(msg["partition_id"])
+
+    def _set_idle(self, partition_id):
+        """Lets an executor wait until the controller has a trial ready."""
+        self._idle_partitions.append(partition_id)
+        self._start_idle_fallback()
+
+    def _wake_idle(self):
+        """Assigns trials to the idle executors, in the order they became
+        idle, until the controller has no more trials ready.
+        """
+        while self._idle_partitions:
+            if self.experiment_done:
+                self.server.reservations.assign_trial(
+                    self._idle_partitions.popleft(), None
+                )
+            elif self._assign_next(
+                self._idle_partitions[0], self.controller_get_next()
+            ):
+                self._idle_partitions.popleft()
+            else:
+                break
+        if self._idle_partitions:
+            self._start_idle_fallback()
+
+    def _start_idle_fallback(self):
+        if not self._idle_fallback:
+            self._idle_fallback = True
+            self._message_q.put({"type": "IDLE"}, delay=self.IDLE_FALLBACK)
+
+    def _assign_next(self, partition_id, trial):
+        """Assigns the controller's next trial to an executor.
+
+        :param partition_id: Id of the executor.
+        :type partition_id: int
+        :param trial: Result of `controller_get_next`.
+        :type trial: Trial, str or None
+        :return: False if the controller has no trial ready yet, True
+            otherwise.
+        :rtype: bool
+        """
+        # the assignment answers waiting GET requests right away, so the
+        # server has to see the final state
+        if trial is None:
+            self.experiment_done = True
+            self.server.reservations.assign_trial(partition_id, None)
+        elif trial == "IDLE":
+            return False
+        else:
+            with trial.lock:
+                trial.start = time.time()
+                trial.status = Trial.SCHEDULED
+                self.add_trial(trial)
+                self.server.reservations.assign_trial(partition_id, trial.trial_id)
+        return True
+
+    def set_hb_interval(self, partition_id, hb_interval):
+        """Sets the heartbeat interval in seconds of the executor with
+        ``partition_id``. Takes effect with the executor's next heartbeat.
+
+        :param partition_id: Id of the executor.
+        :type partition_id: int
+        :param hb_interval: Heartbeat interval in seconds.
+        :type hb_interval: int, float
+        """
+        if self._hb_intervals.get(partition_id, self.hb_interval) != hb_interval:
+            self._hb_intervals[partition_id] = hb_interval
+            self.server.set_hb_interval(partition_id, hb_interval)
+
+    def _adapt_hb_interval(self, partition_id):
+        """Backs off the heartbeat interval of an executor while the worker
+        can't keep up with the messages in the queue and resets it once the
+        queue is drained.
+        """
+        backlog = self._message_q.qsize()
+        hb_interval = self._hb_intervals.get(partition_id, self.hb_interval)
+        if backlog > self.num_executors:
+            hb_interval = min(2 * hb_interval, self.MAX_HB_BACKOFF * self.hb_interval)
+        elif backlog == 0:
+            hb_interval = self.hb_interval
+        self.set_hb_interval(partition_id, hb_interval)
+
     def stop(self):
         """Stop the Driver's worker thread and server."""
         self.worker_done = True
+        self._message_q.close()
         self.server.stop()
         self.fd.flush()
         self.fd.close()
@@ -388,6 +464,7 @@ class Driver(ABC):
         # pop function values and trial_type from parameters, since we don't need them
         param_string.pop("dataset_function", None)
         param_string.pop("model_function", None)
+        self.metric_stats.add(metric, trial_id)
         # First finalized trial
         if self.result.get("best_id", None) is None:
             self.result = {
@@ -398,7 +475,6 @@ class Driver(ABC):
                 "worst_val": metric,
                 "worst_config": param_string,
                 "avg": metric,
-                "metric_list": [metric],
                 "num_trials": 1,
                 "early_stopped": 0,
                 "num_epochs": num_epochs,
@@ -428,11 +504,8 @@ class Driver(ABC):
                     self.result["worst_config"] = param_string
 
         # update results and average regardless of experiment type
-        self.result["metric_list"].append(metric)
         self.result["num_trials"] += 1
-        self.result["avg"] = sum(self.result["metric_list"]) / float(
-            len(self.result["metric_list"])
-        )
+        self.result["avg"] = self.metric_stats.mean
 
         if trial.early_stop:
             self.result["early_stopped"] += 1
@@ -0,0 +1,149 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Message queue of the experiment driver's worker thread.
+"""
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+
+class MessageQueue(object):
+    """Blocking queue with a control and a telemetry lane.
+
+    Control messages (REG, FINAL, BLACK, IDLE) decide on the next trial of an
+    executor and are handed out before telemetry (METRIC), so assigning trials
+    doesn't wait for a backlog of heartbeats and early stopping checks.
+
+    The telemetry lane is sharded by executor and handed out round-robin, so
+    a chatty executor can't delay the heartbeats of the others. The telemetry
+    an executor queued before a control message, e.g. the last metrics of a
+    trial before FINAL, is handed out with the control message in its
+    "telemetry" list.
+
+    Messages can be put with a delay, e.g. for a timer, without waking up the
+    worker until they are due.
+    """
+
+    CONTROL = ("REG", "FINAL", "BLACK", "IDLE")
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # lanes hold (sequence number, message)
+        self._control = collections.deque()
+        # partition id -> lane, in round-robin order
+        self._telemetry = collections.OrderedDict()
+        self._num_telemetry = 0
+        # heap of (due time, sequence number, message)
+        self._delayed = []
+        self._seq = itertools.count()
+        self._closed = False
+
+    def put(self, msg, delay=0):
+        """Adds a message to its lane.
+
+        Args:
+            msg: The message dict.
+            delay: Seconds before the message gets handed out.
+        """
+        with self._cond:
+            if delay > 0:
+                heapq.heappush(
+                    self._delayed, (time.time() + delay, next(self._seq), msg)
+                )
+            else:
+                self._enqueue(msg)
+            self._cond.notify()
+
+    def _enqueue(self, msg):
+        if msg["type"] in self.CONTROL:
+            self._control.append((next(self._seq), msg))
+        else:
+            lane = self._telemetry.get(msg.get("partition_id"))
+            if lane is None:
+                lane = self._telemetry[msg.get("partition_id")] = collections.deque()
+            lane.append((next(self._seq), msg))
+            self._num_telemetry += 1
+
+    def get(self, timeout=None):
+        """Removes and returns the next message, blocking until one is
+        available.
+
+        Args:
+            timeout: Maximum seconds to block, blocks indefinitely if None.
+
+        Returns:
+            The message, or None if the timeout expired or the queue was
+            closed.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._enqueue(heapq.heappop(self._delayed)[2])
+                if self._control:
+                    return self._next_control()
+                if self._telemetry:
+                    return self._next_telemetry()
+                wait = None
+                if self._delayed:
+                    wait = self._delayed[0][0] - now
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._cond.wait(wait)
+            return None
+
+    def _next_control(self):
+        seq, msg = self._control.popleft()
+        lane = self._telemetry.get(msg.get("partition_id"))
+        if lane and lane[0][0] < seq:
+            telemetry = []
+            while lane and lane[0][0] < seq:
+                telemetry.append(lane.popleft()[1])
+            if not lane:
+                del self._telemetry[msg.get("partition_id")]
+            self._num_telemetry -= len(telemetry)
+            msg = dict(msg, telemetry=telemetry)
+        return msg
+
+    def _next_telemetry(self):
+        partition_id, lane = next(iter(self._telemetry.items()))
+        msg = lane.popleft()[1]
+        if lane:
+            self._telemetry.move_to_end(partition_id)
+        else:
+            del self._telemetry[partition_id]
+        self._num_telemetry -= 1
+        return msg
+
+    def qsize(self):
+        """Number of messages waiting to be handed out, not counting delayed
+        ones."""
+        with self._cond:
+            return len(self._control) + self._num_telemetry
+
+    def close(self):
+        """Wakes up blocked consumers, `get` returns None from now on."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
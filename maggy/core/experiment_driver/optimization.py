@@ -15,6 +15,7 @@
 #
 
 import json
+import time
 
 from maggy import util
 from maggy.searchspace import Searchspace
@@ -22,6 +23,8 @@ from maggy.optimizer import AbstractOptimizer, RandomSearch, Asha, SingleRun
 from maggy.earlystop import AbstractEarlyStop, MedianStoppingRule, NoStoppingRule
 from maggy.optimizer import bayes
 from maggy.core.experiment_driver import base
+from maggy.core.experiment_driver.prefetch import SuggestionPrefetcher
+from maggy.trial import Trial
 
 
 class Driver(base.Driver):
@@ -39,11 +42,21 @@ class Driver(base.Driver):
         num_executors,
         hb_interval,
         log_dir,
+        rpc_backend="select",
+        rpc_multiplex=False,
+        prefetch_suggestions=0,
     ):
         # num_trials default 1
         # direction default 'max'
         super().__init__(
-            name, description, direction, num_executors, hb_interval, log_dir
+            name,
+            description,
+            direction,
+            num_executors,
+            hb_interval,
+            log_dir,
+            rpc_backend,
+            rpc_multiplex,
         )
 
         # CONTEXT-SPECIFIC EXPERIMENT SETUP
@@ -143,8 +156,50 @@ class Driver(base.Driver):
         self.controller.direction = self.direction
         self.controller._initialize(exp_dir=self.log_dir)
 
+        self.prefetcher = None
+        if prefetch_suggestions:
+            self._init_prefetcher(prefetch_suggestions)
+
+    def _init_prefetcher(self, prefetch_suggestions):
+        if self.controller.pruner:
+            raise Exception(
+                "Prefetching suggestions is not supported for optimizers "
+                "with a pruner."
+            )
+        if isinstance(self.controller, Asha):
+            # ASHA promotes trials and stops only when it gets the finished
+            # trial, the prefetched suggestions are computed without one
+            raise Exception("Prefetching suggestions is not supported for ASHA.")
+        self.prefetcher = SuggestionPrefetcher(
+            self.controller.get_suggestion,
+            lambda: len(self._final_store),
+            prefetch_suggestions,
+            self.num_trials,
+            trial_store=self._trial_store,
+            lock=self.store_lock,
+        )
+
+    def init(self, job_start):
+        if self.prefetcher:
+            self.prefetcher.start()
+        super().init(job_start)
+
+    def stop(self):
+        if self.prefetcher:
+            self.prefetcher.stop()
+        super().stop()
+
     def controller_get_next(self, trial=None):
-        return self.controller.get_suggestion(trial)
+        start = time.time()
+        if self.prefetcher:
+            next_trial = self.prefetcher.get(trial)
+        else:
+            next_trial = self.controller.get_suggestion(trial)
+        if isinstance(next_trial, Trial):
+            # time the executor waited, without prefetching it includes
+            # the compute time
+            next_trial.info_dict["sampling_wait_time"] = time.time() - start
+        return next_trial
 
     def prep_results(self):
         _ = self.controller._finalize_experiment(self._final_store)
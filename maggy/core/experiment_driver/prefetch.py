@@ -0,0 +1,205 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Background computation of the next trials of an optimizer.
+"""
+
+import collections
+import threading
+
+from maggy.trial import Trial
+
+
+class SuggestionPrefetcher(object):
+    """Keeps a small buffer of suggestions of an optimizer ready, computed on
+    a background thread, so an executor finishing a trial gets its next one
+    without waiting for e.g. the acquisition function optimization.
+
+    Suggestions sampled from a model go stale as results arrive which the
+    model hasn't seen. They are handed out as long as they are at most
+    `max_staleness` results behind, older ones are dropped and computed
+    again. Random samples never go stale.
+
+    The optimizer is called without the last finished trial, the prefetched
+    suggestions don't belong to a specific one. Buffered suggestions are added
+    to the trial store as pending trials, so the optimizer sees them like the
+    busy trials when checking for duplicates or computing busy locations.
+    """
+
+    def __init__(
+        self,
+        get_suggestion,
+        num_results,
+        size,
+        max_suggestions,
+        max_staleness=1,
+        trial_store=None,
+        lock=None,
+    ):
+        """
+        :param get_suggestion: The optimizer's `get_suggestion` method.
+        :type get_suggestion: callable
+        :param num_results: Returns the number of finalized trials.
+        :type num_results: callable
+        :param size: Number of suggestions to keep ready.
+        :type size: int
+        :param max_suggestions: Number of suggestions to prefetch in total,
+            later ones are computed when they are needed.
+        :type max_suggestions: int
+        :param max_staleness: Number of results a model based suggestion can
+            miss and still be handed out.
+        :type max_staleness: int
+        :param trial_store: The optimizer's store of busy trials, buffered
+            suggestions are kept in it until they are handed out or dropped.
+        :type trial_store: TrialStore
+        :param lock: Lock the stores are updated with, it is held during the
+            calls to the optimizer so they see a consistent state.
+        :type lock: threading.RLock
+        """
+        self.get_suggestion = get_suggestion
+        self.num_results = num_results
+        self.size = size
+        self.max_suggestions = max_suggestions
+        self.max_staleness = max_staleness
+        self.trial_store = trial_store
+        # serializes the calls to the optimizer with each other and with the
+        # updates of the stores
+        self.lock = lock if lock is not None else threading.Lock()
+        self._cond = threading.Condition()
+        # (number of results seen, trial)
+        self._buffer = collections.deque()
+        # suggestions buffered or handed out
+        self._num_suggested = 0
+        # the producer is waiting for the optimizer
+        self._computing = False
+        self._done = False
+        self._stopped = False
+        self.exception = None
+
+    def start(self):
+        t = threading.Thread(target=self._run)
+        t.daemon = True
+        t.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            for _, trial in self._buffer:
+                self._unregister(trial)
+            self._buffer.clear()
+
+    def get(self, trial=None):
+        """Returns the next suggestion, a prefetched one if available.
+
+        :param trial: The last finished trial, passed on if the suggestion is
+            computed right away.
+        :type trial: Trial
+        :return: The optimizer's suggestion.
+        :rtype: Trial, str or None
+        """
+        with self._cond:
+            if self.exception is not None:
+                raise self.exception
+            self._drop_stale()
+            # wakes up the producer to refill the buffer
+            self._cond.notify_all()
+            # a suggestion in the making is ready sooner than a new one
+            while not self._buffer and self._computing and self.exception is None:
+                self._cond.wait()
+            if self.exception is not None:
+                raise self.exception
+            if self._buffer:
+                return self._buffer.popleft()[1]
+            if self._done:
+                return None
+            prefetch = self._num_suggested < self.max_suggestions
+            if prefetch:
+                self._num_suggested += 1
+
+        with self.lock:
+            suggestion = self.get_suggestion(trial)
+            if isinstance(suggestion, Trial):
+                self._register(suggestion)
+        if prefetch and not isinstance(suggestion, Trial):
+            with self._cond:
+                self._num_suggested -= 1
+                self._done = suggestion is None
+        return suggestion
+
+    def _drop_stale(self):
+        num_results = self.num_results()
+        fresh = collections.deque()
+        for seen, trial in self._buffer:
+            if (
+                trial.info_dict.get("sample_type") != "model"
+                or num_results - seen <= self.max_staleness
+            ):
+                fresh.append((seen, trial))
+            else:
+                self._unregister(trial)
+        self._num_suggested -= len(self._buffer) - len(fresh)
+        self._buffer = fresh
+
+    def _register(self, trial):
+        if self.trial_store is not None:
+            self.trial_store[trial.trial_id] = trial
+
+    def _unregister(self, trial):
+        if self.trial_store is not None:
+            self.trial_store.pop(trial.trial_id, None)
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._drop_stale()
+                    while not self._stopped and (
+                        self._done
+                        or len(self._buffer) >= self.size
+                        or self._num_suggested >= self.max_suggestions
+                    ):
+                        self._cond.wait()
+                        self._drop_stale()
+                    if self._stopped:
+                        return
+                    self._num_suggested += 1
+                    self._computing = True
+
+                with self.lock:
+                    num_results = self.num_results()
+                    suggestion = self.get_suggestion()
+                    if isinstance(suggestion, Trial):
+                        # visible to the optimizer's next call
+                        self._register(suggestion)
+
+                with self._cond:
+                    self._computing = False
+                    self._cond.notify_all()
+                    if isinstance(suggestion, Trial):
+                        self._buffer.append((num_results, suggestion))
+                    else:
+                        # nothing to prefetch until a trial finishes
+                        self._num_suggested -= 1
+                        self._done = suggestion is None
+                        if suggestion == "IDLE":
+                            self._cond.wait()
+        except Exception as exc:
+            # handed to the worker thread with the next suggestion
+            with self._cond:
+                self.exception = exc
+                self._cond.notify_all()
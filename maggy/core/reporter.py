@@ -35,10 +35,16 @@ class Reporter(object):
     def __init__(self, log_file, partition_id, task_attempt, print_executor):
         self.metric = None
         self.step = -1
+        # (step, metric) pairs broadcasted since the last heartbeat
+        self.history = []
         self.lock = threading.RLock()
         self.stop = False
         self.trial_id = None
         self.trial_log_file = None
+        # checkpoint of the running trial and the one it continues from
+        self.checkpoint_dir = None
+        self.resume_dir = None
+        self.resume_budget = None
         self.logs = ""
         self.log_file = log_file
         self.partition_id = partition_id
@@ -72,6 +78,28 @@ class Reporter(object):
                 self.trial_fd.close()
             self.fd.close()
 
+    def set_checkpoint(self, checkpoint_dir, resume_dir=None, resume_budget=None):
+        """Sets the checkpoint directories of the trial.
+
+        The training function can save its state, e.g. model weights, to
+        `checkpoint_dir`. When a trial is promoted to a larger budget, it gets
+        the checkpoint of the trial it was promoted from as `resume_dir`. The
+        training function can then load the state and only train for
+        `budget - resume_budget`.
+
+        :param checkpoint_dir: Directory to save the state of the trial to.
+        :type checkpoint_dir: str
+        :param resume_dir: Checkpoint directory of the parent trial, None if
+            the trial starts from scratch.
+        :type resume_dir: str
+        :param resume_budget: Budget the parent trial was trained with.
+        :type resume_budget: int
+        """
+        with self.lock:
+            self.checkpoint_dir = checkpoint_dir
+            self.resume_dir = resume_dir
+            self.resume_budget = resume_budget
+
     # report
     def broadcast(self, metric, step=None):
         """Broadcast a metric to the experiment driver with the heartbeat.
@@ -94,6 +122,11 @@ class Reporter(object):
             elif step < self.step:
                 raise exceptions.BroadcastStepValueError(metric, step, self.step)
             else:
+                if self.history and self.history[-1][0] == step:
+                    # only the latest metric of a step is kept
+                    self.history[-1] = (step, metric)
+                else:
+                    self.history.append((step, metric))
                 self.step = step
                 self.metric = metric
             if self.stop:
@@ -137,6 +170,17 @@ class Reporter(object):
             self.logs = ""
             return self.metric, self.step, log_to_send
 
+    def get_history(self):
+        """Returns the (step, metric) pairs broadcasted and the logs written
+        since the last call, to be sent to the experiment driver.
+        """
+        with self.lock:
+            history = self.history
+            self.history = []
+            log_to_send = self.logs
+            self.logs = ""
+            return history, log_to_send
+
     def reset(self):
         """
         Resets the reporter to the initial state in order to start a new
@@ -145,8 +189,12 @@ class Reporter(object):
         with self.lock:
             self.metric = None
             self.step = -1
+            self.history = []
             self.stop = False
             self.trial_id = None
+            self.checkpoint_dir = None
+            self.resume_dir = None
+            self.resume_budget = None
             self.fd.flush()
             self.trial_fd.close()
             self.trial_fd = None
@@ -14,15 +14,18 @@
 #   limitations under the License.
 #
 
+import asyncio
+import collections
+import random
 import threading
 import struct
-from pyspark import cloudpickle
 import time
 import select
 import socket
 import secrets
 import json
 
+from maggy.core import codec
 from maggy.trial import Trial
 
 from hops import constants as hopsconstants
@@ -30,7 +33,29 @@ from hops import util as hopsutil
 from hops.experiment_impl.util import experiment_utils
 
 MAX_RETRIES = 3
-BUFSIZE = 1024 * 2
+# exponential backoff in seconds between attempts to reconnect to the server
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 8
+# seconds to wait for a response before the connection is considered broken,
+# has to be longer than LONG_POLL_TIMEOUT
+REQUEST_TIMEOUT = 60
+# number of responses kept per executor to answer retried requests
+RESPONSE_CACHE_SIZE = 16
+# frames are prefixed with their payload length as a 4 byte unsigned int
+_FRAME_HEADER = struct.Struct(">I")
+# the high bit of the length marks a multiplexed frame, which is followed by
+# a 4 byte tag to match responses with their requests
+MUX_FLAG = 0x80000000
+_MUX_HEADER = struct.Struct(">II")
+# upper bound for the payload of a single frame, protects the driver from
+# allocating arbitrary amounts of memory for corrupt or foreign length headers
+MAX_FRAME_SIZE = 512 * 1024 * 1024
+# seconds a GET request waits on the server for a trial to be assigned before
+# it is answered without one and the client has to ask again
+LONG_POLL_TIMEOUT = 10
+# upper bound in seconds for the interval of keepalive heartbeats, which are
+# sent with exponential backoff while there are no new metrics or logs
+MAX_KEEPALIVE_INTERVAL = 60
 
 server_host_port = None
 
@@ -53,6 +78,8 @@ class Reservations(object):
         self.lock = threading.RLock()
         self.reservations = {}
         self.check_done = False
+        # callables notified with (partition_id, trial_id) on every assignment
+        self.assign_listeners = []
 
     def add(self, meta):
         """
@@ -113,10 +140,41 @@ class Reservations(object):
         """
         with self.lock:
             self.reservations.get(partition_id, None)["trial_id"] = trial_id
+        for listener in self.assign_listeners:
+            listener(partition_id, trial_id)
 
 
 class MessageSocket(object):
-    """Abstract class w/ length-prefixed socket send/receive functions."""
+    """Abstract class w/ length-prefixed socket send/receive functions.
+
+    Frames are decoded with whatever codec they were encoded with (see
+    `maggy.core.codec`), outgoing messages are encoded with ``codec`` unless
+    a different one is passed to `send()`.
+    """
+
+    codec = codec.DEFAULT
+    max_frame_size = MAX_FRAME_SIZE
+
+    def _recv_exact(self, sock, size):
+        """Receive exactly ``size`` bytes from ``sock`` into a preallocated
+        buffer.
+
+        Args:
+            sock:
+            size: number of bytes to receive
+
+        Returns:
+            bytearray of length ``size``
+        """
+        buf = bytearray(size)
+        view = memoryview(buf)
+        received = 0
+        while received < size:
+            nbytes = sock.recv_into(view[received:], size - received)
+            if nbytes == 0:
+                raise ConnectionError("socket closed")
+            received += nbytes
+        return buf
 
     def receive(self, sock):
         """
@@ -128,40 +186,57 @@ class MessageSocket(object):
         Returns:
 
         """
-        msg = None
-        data = b""
-        recv_done = False
-        recv_len = -1
-        while not recv_done:
-            buf = sock.recv(BUFSIZE)
-            if buf is None or len(buf) == 0:
-                raise Exception("socket closed")
-            if recv_len == -1:
-                recv_len = struct.unpack(">I", buf[:4])[0]
-                data += buf[4:]
-                recv_len -= len(data)
-            else:
-                data += buf
-                recv_len -= len(buf)
-            recv_done = recv_len == 0
+        return self._receive_frame(sock)[0]
 
-        msg = cloudpickle.loads(data)
-        return msg
+    def _receive_frame(self, sock):
+        """
+        Receive a message and its multiplexing tag on ``sock``.
+
+        Args:
+            sock:
+
+        Returns:
+            tuple of the message and the tag, None for plain frames
+        """
+        header = self._recv_exact(sock, _FRAME_HEADER.size)
+        recv_len = _FRAME_HEADER.unpack(header)[0]
+        tag = None
+        if recv_len & MUX_FLAG:
+            recv_len &= ~MUX_FLAG
+            tag = _FRAME_HEADER.unpack(self._recv_exact(sock, _FRAME_HEADER.size))[0]
+        if recv_len > self.max_frame_size:
+            raise Exception(
+                "Frame of {} bytes exceeds the maximum frame size of {} bytes".format(
+                    recv_len, self.max_frame_size
+                )
+            )
+        data = self._recv_exact(sock, recv_len)
 
-    def send(self, sock, msg):
+        msg = codec.decode(data)
+        return msg, tag
+
+    def send(self, sock, msg, wire_codec=None, tag=None):
         """
         Send ``msg`` to destination ``sock``.
 
         Args:
             sock:
             msg:
+            wire_codec: codec to encode ``msg`` with, defaults to ``self.codec``
+            tag: multiplexing tag, sends a plain frame if None
 
         Returns:
 
         """
-        data = cloudpickle.dumps(msg)
-        buf = struct.pack(">I", len(data)) + data
-        sock.sendall(buf)
+        sock.sendall(self._frame(msg, wire_codec, tag))
+
+    def _frame(self, msg, wire_codec=None, tag=None):
+        if wire_codec is None:
+            wire_codec = self.codec
+        data = wire_codec.encode(msg)
+        if tag is None:
+            return _FRAME_HEADER.pack(len(data)) + data
+        return _MUX_HEADER.pack(len(data) | MUX_FLAG, tag) + data
 
 
 class Server(MessageSocket):
@@ -170,14 +245,29 @@ class Server(MessageSocket):
     reservations = None
     done = False
 
-    def __init__(self, count):
+    def __init__(self, count, multiplex=False):
         """
 
         Args:
             count:
+            multiplex: allow executors to multiplex their heartbeats and
+                control messages over a single connection
         """
         assert count > 0
         self.reservations = Reservations(count)
+        self.multiplex = multiplex
+        # negotiated response codec per partition_id
+        self.codecs = {}
+        # long-polling GET requests waiting for a trial, per partition_id
+        self.parked = {}
+        # arrival time of the last FINAL message per partition_id
+        self.final_times = {}
+        # heartbeat intervals to be sent to the executors, per partition_id
+        self.hb_intervals = {}
+        # latest responses by request id, per partition_id
+        self.responses = {}
+        # task attempt the cached responses belong to, per partition_id
+        self.response_attempts = {}
 
     def await_reservations(self, sc, status={}, timeout=600):
         """
@@ -204,27 +294,99 @@ class Server(MessageSocket):
         print("All reservations completed")
         return self.reservations.get()
 
-    def _handle_message(self, sock, msg, exp_driver):
+    def _check_secret(self, msg, exp_driver):
+        """Raises an exception if the secret of ``msg`` does not match the
+        secret of the experiment driver, so the client socket gets closed.
         """
-        Handles a  message dictionary. Expects a 'type' and 'data' attribute in
-        the message dictionary.
+        if not secrets.compare_digest(msg["secret"], exp_driver._secret):
+            exp_driver._log("SERVER secret: {}".format(exp_driver._secret))
+            exp_driver._log("ERROR: wrong secret {}".format(msg["secret"]))
+            raise Exception
+
+    def _handle_message(self, sock, msg, exp_driver, tag=None):
+        """
+        Handles a  message dictionary and sends the response on ``sock``.
 
         Args:
             sock:
             msg:
+            tag: multiplexing tag of the request
 
         Returns:
 
+        """
+        send, wire_codec = self._respond(msg, exp_driver)
+        if send is None:
+            self._park(msg, (sock, tag))
+        else:
+            MessageSocket.send(self, sock, send, wire_codec, tag)
+
+    def _respond(self, msg, exp_driver):
+        """
+        Builds the response to ``msg``. Requests retried by a client carry the
+        same request id and are answered from a cache of recent responses, so
+        they are not processed twice. Registrations are always processed, the
+        one of a new task attempt drops the cache of the previous attempt.
+
+        Args:
+            msg:
+            exp_driver:
+
+        Returns:
+            tuple of the response message and the codec to encode it with
+        """
+        rid = msg.get("rid", None)
+        if msg["type"] == "REG":
+            task_attempt = msg["data"]["task_attempt"]
+            if self.response_attempts.get(msg["partition_id"]) != task_attempt:
+                self.responses.pop(msg["partition_id"], None)
+                self.response_attempts[msg["partition_id"]] = task_attempt
+            return self._build_response(msg, exp_driver)
+        # GET requests don't change any state and may be parked
+        if rid is None or msg["type"] == "GET":
+            return self._build_response(msg, exp_driver)
+
+        cache = self.responses.setdefault(
+            msg["partition_id"], collections.OrderedDict()
+        )
+        if rid in cache:
+            return cache[rid]
+        response = self._build_response(msg, exp_driver)
+        cache[rid] = response
+        if len(cache) > RESPONSE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return response
+
+    def _build_response(self, msg, exp_driver):
+        """
+        Handles a  message dictionary. Expects a 'type' and 'data' attribute in
+        the message dictionary.
+
+        Args:
+            msg:
+            exp_driver:
+
+        Returns:
+            tuple of the response message and the codec to encode it with
         """
         msg_type = msg["type"]
 
         # Prepare message
         send = {}
+        # respond with the codec the executor negotiated at registration
+        wire_codec = self.codecs.get(msg.get("partition_id"), codec.DEFAULT)
 
         if msg_type == "REG":
             # check if executor was registered before and retrieve lost trial
             lost_trial = self.reservations.get_assigned_trial(msg["partition_id"])
-            if lost_trial is not None:
+            reservation = self.reservations.get().get(msg["partition_id"], None)
+            if (
+                reservation is not None
+                and reservation["task_attempt"] == msg["data"]["task_attempt"]
+            ):
+                # same task attempt reconnected, resume with its trial
+                self.reservations.add(dict(msg["data"], trial_id=lost_trial))
+            elif lost_trial is not None:
                 # the trial or executor must have failed
                 exp_driver.get_trial(lost_trial).status = Trial.ERROR
                 # add a blacklist message to the worker queue
@@ -241,6 +403,15 @@ class Server(MessageSocket):
                 exp_driver.add_message(msg)
 
             send["type"] = "OK"
+            send["long_poll"] = True
+            send["batch_metrics"] = True
+            if self.multiplex and msg.get("mux", False):
+                send["mux"] = True
+            # clients without codec negotiation only understand pickle
+            wire_codec = codec.DEFAULT
+            if "codecs" in msg:
+                send["codec"] = codec.negotiate(msg["codecs"])
+                self.codecs[msg["partition_id"]] = codec.get(send["codec"])
         elif msg_type == "QUERY":
             send["type"] = "QUERY"
             send["data"] = self.reservations.done()
@@ -248,26 +419,17 @@ class Server(MessageSocket):
             # add metric msg to the exp driver queue
             exp_driver.add_message(msg)
 
-            if msg["trial_id"] is None:
-                send["type"] = "OK"
-                MessageSocket.send(self, sock, send)
-                return
-            elif msg["trial_id"] is not None:
-                if msg.get("data", None) is None:
-                    send["type"] = "OK"
-                    MessageSocket.send(self, sock, send)
-                    return
-
-            # lookup executor reservation to find assigned trial
-            trialId = msg["trial_id"]
-            # get early stopping flag, should be False for ablation
-            flag = exp_driver.get_trial(trialId).get_early_stop()
-
-            if flag:
-                send["type"] = "STOP"
-            else:
-                send["type"] = "OK"
+            send["type"] = "OK"
+            # get early stopping flag of the trial, should be False for
+            # ablation and when there is no metric yet
+            if msg["trial_id"] is not None and msg.get("data", None) is not None:
+                if exp_driver.get_trial(msg["trial_id"]).get_early_stop():
+                    send["type"] = "STOP"
+            hb_interval = self.hb_intervals.pop(msg["partition_id"], None)
+            if hb_interval is not None:
+                send["hb_interval"] = hb_interval
         elif msg_type == "FINAL":
+            self.final_times[msg["partition_id"]] = time.time()
             # reset the reservation to avoid sending the same trial again
             self.reservations.assign_trial(msg["partition_id"], None)
 
@@ -283,17 +445,30 @@ class Server(MessageSocket):
             # the assigned trial might not be finalized yet
             if exp_driver.experiment_done and trial_id is None:
                 send["type"] = "GSTOP"
+            elif trial_id is None and msg.get("data"):
+                # long-polling client, answered once a trial gets assigned
+                return None, wire_codec
             else:
                 send["type"] = "TRIAL"
-
-            send["trial_id"] = trial_id
-
-            # retrieve trial information
-            if trial_id is not None:
-                send["data"] = exp_driver.get_trial(trial_id).params
-                exp_driver.get_trial(trial_id).status = Trial.RUNNING
-            else:
-                send["data"] = None
+                send["trial_id"] = trial_id
+
+                # retrieve trial information
+                if trial_id is not None:
+                    trial = exp_driver.get_trial(trial_id)
+                    send["data"] = trial.params
+                    if "parent_trial_id" in trial.info_dict:
+                        # promoted trial continuing the training of its parent
+                        send["resume"] = {
+                            "trial_id": trial.info_dict["parent_trial_id"],
+                            "budget": trial.info_dict["parent_budget"],
+                        }
+                    trial.status = Trial.RUNNING
+                    final_time = self.final_times.pop(msg["partition_id"], None)
+                    if final_time is not None:
+                        # time the executor waited for its next trial
+                        trial.info_dict["assignment_latency"] = time.time() - final_time
+                else:
+                    send["data"] = None
         elif msg_type == "LOG":
             # get data from experiment driver
             result, log = exp_driver._get_logs()
@@ -310,7 +485,78 @@ class Server(MessageSocket):
         else:
             send["type"] = "ERR"
 
-        MessageSocket.send(self, sock, send)
+        return send, wire_codec
+
+    def _park(self, msg, handle):
+        """Keep a long-polling GET ``msg`` until a trial is assigned to its
+        partition.
+
+        Args:
+            msg: the GET message, its data is the timeout in seconds
+            handle: backend specific object to answer the request with
+
+        Returns:
+            timeout of the request in seconds
+        """
+        timeout = min(msg["data"], LONG_POLL_TIMEOUT)
+        self.parked[msg["partition_id"]] = (handle, msg, time.time() + timeout)
+        return timeout
+
+    def _answer_parked(self, partition_ids, exp_driver, reply):
+        """Answer the parked GET requests of ``partition_ids`` which can be
+        answered by now. Once the experiment is done, all parked requests are
+        answered.
+
+        Args:
+            partition_ids:
+            exp_driver:
+            reply: callable taking the handle, response and codec
+        """
+        if exp_driver.experiment_done:
+            partition_ids = list(self.parked.keys())
+        for partition_id in partition_ids:
+            if partition_id not in self.parked:
+                continue
+            handle, msg, _ = self.parked[partition_id]
+            send, wire_codec = self._build_response(msg, exp_driver)
+            if send is not None:
+                del self.parked[partition_id]
+                reply(handle, send, wire_codec)
+
+    def _expire_parked(self, exp_driver, reply):
+        """Answer parked GET requests which reached their timeout without a
+        trial.
+
+        Args:
+            exp_driver:
+            reply: callable taking the handle, response and codec
+
+        Returns:
+            seconds until the next parked request expires or None
+        """
+        now = time.time()
+        next_deadline = None
+        for partition_id, (handle, msg, deadline) in list(self.parked.items()):
+            if deadline <= now:
+                del self.parked[partition_id]
+                send, wire_codec = self._build_response(
+                    dict(msg, data=None), exp_driver
+                )
+                reply(handle, send, wire_codec)
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        if next_deadline is not None:
+            return next_deadline - now
+
+    def set_hb_interval(self, partition_id, hb_interval):
+        """Tell the executor with ``partition_id`` to send its heartbeats every
+        ``hb_interval`` seconds, with the response to its next heartbeat.
+
+        Args:
+            partition_id:
+            hb_interval:
+        """
+        self.hb_intervals[partition_id] = hb_interval
 
     def get_assigned_trial_id(self, partition_id):
         """Returns the id of the assigned trial, given a ``partition_id``.
@@ -323,12 +569,14 @@ class Server(MessageSocket):
         """
         return self.reservations.get_assigned_trial(partition_id)
 
-    def start(self, exp_driver):
+    def _bind(self, exp_driver):
         """
-        Start listener in a background thread.
+        Create and bind the server socket. The first server of the Spark
+        application is registered with Hopsworks, later experiments reuse its
+        address.
 
         Returns:
-            address of the Server as a tuple of (host, port)
+            the bound server socket
         """
         global server_host_port
 
@@ -379,42 +627,79 @@ class Server(MessageSocket):
                 exp_driver._log("Connection failed to Hopsworks. No logging.")
         else:
             server_sock.bind(server_host_port)
+        return server_sock
+
+    def start(self, exp_driver):
+        """
+        Start listener in a background thread.
+
+        Returns:
+            address of the Server as a tuple of (host, port)
+        """
+        server_sock = self._bind(exp_driver)
         server_sock.listen(10)
 
+        # assignments happen on the driver's worker thread, the listener
+        # wakes up select through a socket pair to answer parked requests
+        wake_sock, wake_send_sock = socket.socketpair()
+        woken = collections.deque()
+
+        def _on_assign(partition_id, trial_id):
+            woken.append(partition_id)
+            try:
+                wake_send_sock.send(b"\0")
+            except socket.error:
+                # wake up pending already
+                pass
+
+        wake_send_sock.setblocking(False)
+        self.reservations.assign_listeners.append(_on_assign)
+
+        def _reply(handle, send, wire_codec):
+            sock, tag = handle
+            try:
+                MessageSocket.send(self, sock, send, wire_codec, tag)
+            except Exception as e:
+                # socket gets closed when select reports it readable
+                _ = e
+
         def _listen(self, sock, driver):
             CONNECTIONS = []
             CONNECTIONS.append(sock)
+            CONNECTIONS.append(wake_sock)
 
+            timeout = 1
             while not self.done:
-                read_socks, _, _ = select.select(CONNECTIONS, [], [], 1)
+                read_socks, _, _ = select.select(CONNECTIONS, [], [], timeout)
                 for sock in read_socks:
                     if sock == server_sock:
                         client_sock, client_addr = sock.accept()
                         CONNECTIONS.append(client_sock)
                         _ = client_addr
+                    elif sock == wake_sock:
+                        wake_sock.recv(4096)
+                        partition_ids = set()
+                        while woken:
+                            partition_ids.add(woken.popleft())
+                        self._answer_parked(partition_ids, driver, _reply)
                     else:
                         try:
-                            msg = self.receive(sock)
-
-                            # raise exception if secret does not match
-                            # so client socket gets closed
-                            if not secrets.compare_digest(
-                                msg["secret"], exp_driver._secret
-                            ):
-                                exp_driver._log(
-                                    "SERVER secret: {}".format(exp_driver._secret)
-                                )
-                                exp_driver._log(
-                                    "ERROR: wrong secret {}".format(msg["secret"])
-                                )
-                                raise Exception
-
-                            self._handle_message(sock, msg, driver)
+                            msg, tag = self._receive_frame(sock)
+                            self._check_secret(msg, driver)
+                            self._handle_message(sock, msg, driver, tag)
                         except Exception as e:
                             _ = e
                             sock.close()
                             CONNECTIONS.remove(sock)
-
+                            for partition_id, parked in list(self.parked.items()):
+                                if parked[0][0] is sock:
+                                    del self.parked[partition_id]
+                next_expiry = self._expire_parked(driver, _reply)
+                timeout = 1 if next_expiry is None else min(1, next_expiry)
+
+            self.reservations.assign_listeners.remove(_on_assign)
+            wake_sock.close()
+            wake_send_sock.close()
             server_sock.close()
 
         t = threading.Thread(target=_listen, args=(self, server_sock, exp_driver))
@@ -430,22 +715,369 @@ class Server(MessageSocket):
         self.done = True
 
 
+class AsyncServer(Server):
+    """Server handling the executor connections with asyncio streams.
+
+    Speaks the same protocol as `Server`, but instead of scanning a list of
+    sockets with `select`, every connection is served by its own coroutine on
+    an event loop running in a background thread. This scales to thousands of
+    concurrent executor connections and is not limited by FD_SETSIZE.
+    """
+
+    # pending connections queued by the kernel before they are accepted
+    backlog = 1024
+
+    def __init__(self, count, multiplex=False):
+        super().__init__(count, multiplex)
+        self._loop = None
+        self._stop_event = None
+        self._tasks = set()
+
+    def start(self, exp_driver):
+        """
+        Start the event loop in a background thread.
+
+        Returns:
+            address of the Server as a tuple of (host, port)
+        """
+        server_sock = self._bind(exp_driver)
+        started = threading.Event()
+
+        def _run(self, sock, driver):
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                loop.run_until_complete(self._serve(sock, driver, started))
+            finally:
+                loop.close()
+
+        t = threading.Thread(target=_run, args=(self, server_sock, exp_driver))
+        t.daemon = True
+        t.start()
+        started.wait()
+
+        return server_host_port
+
+    async def _serve(self, server_sock, exp_driver, started):
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        tasks = self._tasks
+
+        def _on_assign(partition_id, trial_id):
+            loop.call_soon_threadsafe(
+                self._answer_parked, [partition_id], exp_driver, self._reply
+            )
+
+        self.reservations.assign_listeners.append(_on_assign)
+
+        def _client_connected(reader, writer):
+            self._create_task(self._serve_client(reader, writer, exp_driver))
+
+        server = await asyncio.start_server(
+            _client_connected, sock=server_sock, backlog=self.backlog
+        )
+        started.set()
+        # the driver might have stopped the server before the loop was ready
+        if not self.done:
+            await self._stop_event.wait()
+        server.close()
+        await server.wait_closed()
+        self.reservations.assign_listeners.remove(_on_assign)
+        for task in list(tasks):
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _create_task(self, coro):
+        # keep track of the tasks to cancel them when the server stops
+        task = asyncio.get_event_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _reply(self, future, send, wire_codec):
+        if not future.done():
+            future.set_result((send, wire_codec))
+
+    async def _serve_client(self, reader, writer, exp_driver):
+        # futures of the parked GET requests of this connection
+        futures = set()
+        try:
+            while not self.done:
+                header = await reader.readexactly(_FRAME_HEADER.size)
+                recv_len = _FRAME_HEADER.unpack(header)[0]
+                tag = None
+                if recv_len & MUX_FLAG:
+                    recv_len &= ~MUX_FLAG
+                    header = await reader.readexactly(_FRAME_HEADER.size)
+                    tag = _FRAME_HEADER.unpack(header)[0]
+                if recv_len > self.max_frame_size:
+                    raise Exception(
+                        "Frame of {} bytes exceeds the maximum frame size".format(
+                            recv_len
+                        )
+                    )
+                msg = codec.decode(await reader.readexactly(recv_len))
+                self._check_secret(msg, exp_driver)
+                send, wire_codec = self._respond(msg, exp_driver)
+                if send is None and tag is not None:
+                    # keep serving the heartbeats multiplexed on this
+                    # connection while the GET request waits
+                    self._create_task(
+                        self._answer_long_poll(msg, tag, writer, exp_driver, futures)
+                    )
+                    continue
+                elif send is None:
+                    send, wire_codec = await self._long_poll(msg, exp_driver, futures)
+                writer.write(self._frame(send, wire_codec, tag))
+                await writer.drain()
+        except Exception as e:
+            # includes clients closing their connection
+            _ = e
+        finally:
+            # assignments must not answer the requests of a closed connection
+            for partition_id, parked in list(self.parked.items()):
+                if parked[0] in futures:
+                    del self.parked[partition_id]
+                    parked[0].cancel()
+            writer.close()
+
+    async def _answer_long_poll(self, msg, tag, writer, exp_driver, futures):
+        send, wire_codec = await self._long_poll(msg, exp_driver, futures)
+        # no drain, it must not be awaited concurrently with the reading
+        # coroutine and responses are small
+        writer.write(self._frame(send, wire_codec, tag))
+
+    async def _long_poll(self, msg, exp_driver, futures):
+        future = asyncio.get_event_loop().create_future()
+        timeout = self._park(msg, future)
+        futures.add(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if self.parked.get(msg["partition_id"], (None,))[0] is future:
+                del self.parked[msg["partition_id"]]
+            return self._build_response(dict(msg, data=None), exp_driver)
+        finally:
+            futures.discard(future)
+
+    def stop(self):
+        """
+        Stop the server's event loop.
+        """
+        self.done = True
+        loop = self._loop
+        if loop is not None and self._stop_event is not None:
+            try:
+                loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                # loop already closed
+                pass
+
+
+class _Connection(MessageSocket):
+    """Connection of a client to the server, which survives network failures.
+
+    A request whose send or response fails with a socket error is sent again
+    on a new connection, with exponential backoff between the attempts to
+    reconnect. Retried requests keep their request id, so the server answers
+    them from its response cache instead of processing them twice. After a
+    reconnect, the client registers again to resume its running trial.
+
+    In multiplexed mode, several threads share the connection. Requests are
+    sent in frames tagged with an id and a reader thread hands each response
+    to the request with the same tag.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.sock = None
+        self.mux = False
+        self._lock = threading.RLock()
+        # requests waiting for their response by tag in multiplexed mode
+        self._pending = {}
+        self._tag = 0
+        self._connect()
+
+    def _connect(self):
+        delay = RECONNECT_DELAY
+        tries = 0
+        while True:
+            try:
+                self.sock = socket.create_connection(
+                    self.client.server_addr, timeout=REQUEST_TIMEOUT
+                )
+                return
+            except socket.error as e:
+                tries += 1
+                if tries > MAX_RETRIES or self.client.done:
+                    raise
+                print("Socket error: {}".format(e))
+                # jitter avoids all executors reconnecting at the same time
+                time.sleep(delay * (0.5 + random.random()))
+                delay = min(2 * delay, MAX_RECONNECT_DELAY)
+
+    def _reconnect(self):
+        self.close()
+        self._connect()
+        registration = self.client.registration
+        if registration is not None:
+            # the server keeps the running trial of the same task attempt
+            msg = self.client._message(
+                "REG", dict(registration, trial_id=self.client.trial_id)
+            )
+            self.send(self.sock, msg, codec.DEFAULT)
+            self.receive(self.sock)
+        if self.mux:
+            self._start_reader()
+
+    def enable_mux(self):
+        """Switch to multiplexed frames, the server has to agree to it at
+        registration."""
+        with self._lock:
+            self.mux = True
+            self._start_reader()
+
+    def _start_reader(self):
+        # responses can take as long as the server wants, request timeouts
+        # are handled by the requesting threads
+        self.sock.settimeout(None)
+        t = threading.Thread(target=self._read, args=(self.sock,))
+        t.daemon = True
+        t.start()
+
+    def _read(self, sock):
+        try:
+            while True:
+                msg, tag = self._receive_frame(sock)
+                with self._lock:
+                    _, slot = self._pending.pop(tag, (None, None))
+                if slot is not None:
+                    slot.append(msg)
+                    slot[0].set()
+        except Exception as e:
+            _ = e
+            with self._lock:
+                if self.sock is sock:
+                    self.close()
+                # wake up the requests waiting on this socket to retry them
+                for tag, (req_sock, slot) in list(self._pending.items()):
+                    if req_sock is sock:
+                        del self._pending[tag]
+                        slot[0].set()
+
+    def request(self, msg):
+        """Send ``msg`` and return the response, retrying on socket errors.
+
+        Args:
+            msg:
+
+        Returns:
+            the response message
+        """
+        tries = 0
+        while True:
+            try:
+                if self.mux:
+                    return self._mux_request(msg)
+                with self._lock:
+                    if self.sock is None:
+                        self._reconnect()
+                    self.send(self.sock, msg, self.client.codec)
+                    return self.receive(self.sock)
+            except socket.error as e:
+                tries += 1
+                if tries > MAX_RETRIES or self.client.done:
+                    raise
+                print("Socket error: {}".format(e))
+                if not self.mux:
+                    self.close()
+
+    def _mux_request(self, msg):
+        # slot of the request: [event, response]
+        slot = [threading.Event()]
+        with self._lock:
+            if self.sock is None:
+                self._reconnect()
+            sock = self.sock
+            self._tag = (self._tag + 1) & ~MUX_FLAG
+            tag = self._tag
+            self._pending[tag] = (sock, slot)
+            try:
+                self.send(sock, msg, self.client.codec, tag)
+            except socket.error:
+                self._pending.pop(tag, None)
+                self.close()
+                raise
+        if not slot[0].wait(REQUEST_TIMEOUT):
+            with self._lock:
+                self._pending.pop(tag, None)
+                if self.sock is sock:
+                    self.close()
+            raise socket.timeout("No response within {}s".format(REQUEST_TIMEOUT))
+        if len(slot) == 1:
+            raise ConnectionError("socket closed")
+        return slot[1]
+
+    def getsockname(self):
+        return self.sock.getsockname()
+
+    def close(self):
+        with self._lock:
+            if self.sock is not None:
+                try:
+                    # wakes up the reader thread
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+                self.sock.close()
+                self.sock = None
+
+
 class Client(MessageSocket):
     """Client to register and await node reservations.
 
     Args:
         :server_addr: a tuple of (host, port) pointing to the Server.
+        :codecs: names of the wire codecs offered to the server at
+            registration in order of preference. Until the server picked one,
+            messages are pickled.
+        :poll_timeout: seconds a GET request may wait on the server for a
+            trial, if the server supports long-polling.
+        :multiplex: offer the server to send heartbeats and control messages
+            over a single connection. A second connection for the heartbeats
+            is only opened if the server declines.
     """
 
-    def __init__(self, server_addr, partition_id, task_attempt, hb_interval, secret):
-        # socket for main thread
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect(server_addr)
-        # socket for heartbeat thread
-        self.hb_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.hb_sock.connect(server_addr)
+    def __init__(
+        self,
+        server_addr,
+        partition_id,
+        task_attempt,
+        hb_interval,
+        secret,
+        codecs=codec.PREFERENCE,
+        poll_timeout=LONG_POLL_TIMEOUT,
+        multiplex=True,
+    ):
         self.server_addr = server_addr
         self.done = False
+        self.registration = None
+        # id of the trial the executor is running, kept when reconnecting
+        self.trial_id = None
+        # parent trial id and budget if the trial continues its parent
+        self.resume = None
+        # request ids start at a random offset, so they are unique across
+        # the clients of all task attempts of a partition
+        self._rid = random.getrandbits(31) << 32
+        self._rid_lock = threading.Lock()
+        self.multiplex = multiplex
+        # connection for main thread
+        self.sock = _Connection(self)
+        # connection for heartbeat thread, shares the main connection if the
+        # server agrees to multiplexing at registration
+        self.hb_sock = None
+        if not multiplex:
+            self.hb_sock = _Connection(self)
         self.client_addr = (
             experiment_utils._get_ip_address(),
             self.sock.getsockname()[1],
@@ -454,14 +1086,29 @@ class Client(MessageSocket):
         self.task_attempt = task_attempt
         self.hb_interval = hb_interval
         self._secret = secret
+        self.codecs = codecs
+        self.poll_timeout = poll_timeout
+        self.long_poll = False
+        self.batch_metrics = False
 
     def _request(self, req_sock, msg_type, msg_data=None, trial_id=None, logs=None):
-        """Helper function to wrap msg w/ msg_type."""
+        """Helper function to wrap msg w/ msg_type and send it on connection
+        ``req_sock``."""
+        msg = self._message(msg_type, msg_data, trial_id, logs)
+        return req_sock.request(msg)
+
+    def _message(self, msg_type, msg_data=None, trial_id=None, logs=None):
+        """Builds a message with a new request id."""
         msg = {}
         msg["partition_id"] = self.partition_id
         msg["type"] = msg_type
         msg["secret"] = self._secret
 
+        if msg_type == "REG":
+            msg["codecs"] = self.codecs
+            if self.multiplex:
+                msg["mux"] = True
+
         if msg_type == "FINAL" or msg_type == "METRIC":
             msg["trial_id"] = trial_id
             if logs == "":
@@ -473,29 +1120,17 @@ class Client(MessageSocket):
         #    msg['data'] = msg_data
         msg["data"] = msg_data
 
-        done = False
-        tries = 0
-        while not done and tries < MAX_RETRIES:
-            try:
-                MessageSocket.send(self, req_sock, msg)
-                done = True
-            except socket.error as e:
-                tries += 1
-                if tries >= MAX_RETRIES:
-                    raise
-                print("Socket error: {}".format(e))
-                req_sock.close()
-                req_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                req_sock.connect(self.server_addr)
+        with self._rid_lock:
+            self._rid += 1
+            msg["rid"] = self._rid
 
-        resp = MessageSocket.receive(self, req_sock)
-
-        return resp
+        return msg
 
     def close(self):
         """Close the client's sockets."""
         self.sock.close()
-        self.hb_sock.close()
+        if self.hb_sock is not None:
+            self.hb_sock.close()
 
     def register(self, registration):
         """
@@ -508,6 +1143,18 @@ class Client(MessageSocket):
 
         """
         resp = self._request(self.sock, "REG", registration)
+        # registration is sent again after reconnecting
+        self.registration = registration
+        # servers without codec negotiation don't answer with a codec
+        self.codec = codec.get(resp.get("codec", codec.DEFAULT.name))
+        # older servers answer GET requests right away
+        self.long_poll = resp.get("long_poll", False)
+        self.batch_metrics = resp.get("batch_metrics", False)
+        if resp.get("mux", False):
+            self.sock.enable_mux()
+            self.hb_sock = self.sock
+        elif self.hb_sock is None:
+            self.hb_sock = _Connection(self)
         return resp
 
     def await_reservations(self):
@@ -535,7 +1182,43 @@ class Client(MessageSocket):
                 # sleep one second
                 time.sleep(self.hb_interval)
 
-        t = threading.Thread(target=_heartbeat, args=(self, reporter))
+        def _batched_heartbeat(self, report):
+            keepalive_interval = self.hb_interval
+            last_beat = time.time()
+
+            while not self.done:
+
+                with report.lock:
+                    history, logs = report.get_history()
+                    # skip beats without new metrics or logs, but keep the
+                    # connection alive with exponentially backed off beats
+                    if history or logs:
+                        keepalive_interval = self.hb_interval
+                    elif time.time() - last_beat < keepalive_interval:
+                        history = None
+                    else:
+                        keepalive_interval = min(
+                            2 * keepalive_interval, MAX_KEEPALIVE_INTERVAL
+                        )
+
+                    if history is not None:
+                        resp = self._request(
+                            self.hb_sock,
+                            "METRIC",
+                            history,
+                            report.get_trial_id(),
+                            logs,
+                        )
+                        _ = self._handle_message(resp, report)
+                        last_beat = time.time()
+
+                time.sleep(self.hb_interval)
+
+        if self.batch_metrics:
+            t = threading.Thread(target=_batched_heartbeat, args=(self, reporter))
+        else:
+            t = threading.Thread(target=_heartbeat, args=(self, reporter))
+
         t.daemon = True
         t.start()
 
@@ -544,12 +1227,18 @@ class Client(MessageSocket):
     def get_suggestion(self, reporter):
         """Blocking call to get new parameter combination."""
         while not self.done:
-            resp = self._request(self.sock, "GET")
+            if self.long_poll:
+                # the server answers as soon as a trial is assigned
+                resp = self._request(self.sock, "GET", self.poll_timeout)
+            else:
+                resp = self._request(self.sock, "GET")
             trial_id, parameters = self._handle_message(resp, reporter) or (None, None)
 
             if trial_id is not None:
+                self.trial_id = trial_id
                 break
-            time.sleep(1)
+            if not self.long_poll:
+                time.sleep(1)
         return trial_id, parameters
 
     def stop(self):
@@ -569,6 +1258,9 @@ class Client(MessageSocket):
 
         """
         msg_type = msg["type"]
+        # the driver can adjust the heartbeat interval with every heartbeat
+        if "hb_interval" in msg:
+            self.hb_interval = msg["hb_interval"]
         # if response is STOP command, early stop the training
         if msg_type == "STOP":
             reporter.early_stop()
@@ -576,6 +1268,7 @@ class Client(MessageSocket):
             reporter.log("Stopping experiment", False)
             self.done = True
         elif msg_type == "TRIAL":
+            self.resume = msg.get("resume")
             return msg["trial_id"], msg["data"]
         elif msg_type == "ERR":
             reporter.log("Stopping experiment", False)
@@ -586,8 +1279,17 @@ class Client(MessageSocket):
         # and resetting the reporter
         with reporter.lock:
             _, _, logs = reporter.get_data()
+            if self.batch_metrics:
+                # send the metrics broadcasted since the last heartbeat first
+                history, _ = reporter.get_history()
+                if history:
+                    resp = self._request(
+                        self.sock, "METRIC", history, reporter.get_trial_id(), None
+                    )
+                    _ = self._handle_message(resp, reporter)
             resp = self._request(
                 self.sock, "FINAL", metric, reporter.get_trial_id(), logs
             )
+            self.trial_id = None
             reporter.reset()
         return resp
@@ -0,0 +1,208 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Streaming statistics over the final metrics of an experiment's trials.
+"""
+
+import heapq
+import itertools
+import math
+
+
+class MetricStatistics(object):
+    """Summary of the final metrics of an experiment, updated in constant
+    time per trial (logarithmic in `top_k` for the best trials) and without
+    keeping the metrics.
+
+    Keeps count, running mean and variance (Welford's algorithm), min and
+    max, the `top_k` best trials with respect to `direction` and optionally
+    estimates of `quantiles` with the P-square algorithm.
+    """
+
+    def __init__(self, direction="max", top_k=10, quantiles=None):
+        """
+        :param direction: 'max' or 'min', decides which trials are the best.
+        :type direction: str
+        :param top_k: Number of best trials to keep.
+        :type top_k: int
+        :param quantiles: Quantiles to estimate, e.g. [0.25, 0.5, 0.75].
+        :type quantiles: list
+        """
+        if direction not in ["max", "min"]:
+            raise ValueError(
+                "direction should be 'max' or 'min' but it is {}".format(direction)
+            )
+        self.direction = direction
+        self.top_k = top_k
+        self.count = 0
+        self.mean = None
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        # min-heap of (score, sequence number, trial_id), the worst of the
+        # best trials is at the top
+        self._top = []
+        self._seq = itertools.count()
+        self._quantiles = [_P2Quantile(q) for q in quantiles or []]
+
+    def add(self, metric, trial_id=None):
+        """Adds the final metric of a trial.
+
+        :param metric: The final metric.
+        :type metric: int, float
+        :param trial_id: Id of the trial.
+        :type trial_id: str
+        """
+        metric = float(metric)
+        self.count += 1
+        if self.count == 1:
+            self.mean = self.min = self.max = metric
+        else:
+            self.min = min(self.min, metric)
+            self.max = max(self.max, metric)
+        delta = metric - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (metric - self.mean)
+
+        if self.top_k:
+            score = metric if self.direction == "max" else -metric
+            entry = (score, -next(self._seq), trial_id)
+            if len(self._top) < self.top_k:
+                heapq.heappush(self._top, entry)
+            elif entry > self._top[0]:
+                heapq.heapreplace(self._top, entry)
+
+        for quantile in self._quantiles:
+            quantile.add(metric)
+
+    @property
+    def variance(self):
+        """Sample variance of the metrics, None for less than two."""
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        """Sample standard deviation of the metrics, None for less than two."""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def top(self, k=None):
+        """Returns the best trials, best first.
+
+        :param k: Number of trials, at most `top_k`. Defaults to all kept.
+        :type k: int
+        :return: List of (trial_id, metric) tuples.
+        :rtype: list
+        """
+        best = sorted(self._top, reverse=True)[:k]
+        sign = 1 if self.direction == "max" else -1
+        return [(trial_id, sign * score) for score, _, trial_id in best]
+
+    def quantiles(self):
+        """Returns the estimated quantiles.
+
+        :return: Dictionary of quantile to estimate, None without metrics.
+        :rtype: dict
+        """
+        return {quantile.q: quantile.value() for quantile in self._quantiles}
+
+    def to_dict(self):
+        result = {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+            "top": self.top(),
+        }
+        if self._quantiles:
+            result["quantiles"] = self.quantiles()
+        return result
+
+
+class _P2Quantile(object):
+    """P-square estimate of a single quantile (Jain and Chlamtac, 1985),
+    keeping five markers instead of the observations."""
+
+    def __init__(self, q):
+        if not 0 < q < 1:
+            raise ValueError("quantile should be in (0, 1) but it is {}".format(q))
+        self.q = q
+        # marker heights and positions
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self._increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        heights = self._heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # find the cell of x and adjust the extreme markers
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self._positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # move the middle markers towards their desired positions
+        positions = self._positions
+        for i in range(1, 4):
+            d = self._desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (
+                d <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, d)
+                heights[i] = height
+                positions[i] += d
+
+    def _parabolic(self, i, d):
+        h, n = self._heights, self._positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i, d):
+        h, n = self._heights, self._positions
+        return h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+
+    def value(self):
+        if not self._heights:
+            return None
+        if len(self._heights) < 5:
+            # exact quantile of the few observations
+            index = int(round(self.q * (len(self._heights) - 1)))
+            return self._heights[index]
+        return self._heights[2]
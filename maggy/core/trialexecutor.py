@@ -123,6 +123,27 @@ def _prepare_func(
 
                 reporter.init_logger(trial_log_file)
                 tensorboard._register(tb_logdir)
+
+                # promoted trials can continue from the checkpoint of the
+                # trial they were promoted from, if it saved one
+                resume_dir, resume_budget = None, None
+                if client.resume is not None:
+                    parent_checkpoint_dir = (
+                        log_dir + "/" + client.resume["trial_id"] + "/checkpoint"
+                    )
+                    if hopshdfs.exists(parent_checkpoint_dir):
+                        resume_dir = parent_checkpoint_dir
+                        resume_budget = client.resume["budget"]
+                reporter.set_checkpoint(
+                    tb_logdir + "/checkpoint", resume_dir, resume_budget
+                )
+                if resume_dir is not None:
+                    reporter.log(
+                        "Resuming from trial {} with budget {}".format(
+                            client.resume["trial_id"], resume_budget
+                        ),
+                        False,
+                    )
                 if experiment_type == "ablation":
                     hopshdfs.dump(
                         json.dumps(ablation_params, default=util.json_default_numpy),
@@ -0,0 +1,314 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Indexed stores of the trials of an experiment, shared by the experiment driver
+and the optimizers.
+"""
+
+import collections
+import itertools
+import math
+import threading
+
+import numpy as np
+
+from maggy.searchspace import Searchspace
+from maggy.trial import Trial
+
+
+def _trial_attr(trial, attr):
+    if attr in ("status", "fingerprint"):
+        return getattr(trial, attr)
+    return trial.info_dict.get(attr)
+
+
+def _run_budget(trial):
+    # todo budget is a hyperparameter until it becomes an attribute of Trial
+    return trial.params.get("budget", 0)
+
+
+class TrialStore(dict):
+    """Trials which are scheduled or running, by trial id.
+
+    Behaves like a dict and additionally keeps indexes of the trials by
+    status, sample_type, model_budget, run_budget and the fingerprint of
+    their hparams, so optimizers can select e.g. the busy trials sampled from
+    a model or with the same hparams without scanning all of them. The status
+    index follows status changes of the stored trials.
+    """
+
+    INDEXES = ("status", "sample_type", "model_budget", "run_budget", "fingerprint")
+
+    def __init__(self):
+        super().__init__()
+        # status changes come from the rpc server's thread
+        self._lock = threading.RLock()
+        # attribute -> value -> {trial_id: trial}, in insertion order
+        self._index = {attr: collections.defaultdict(dict) for attr in self.INDEXES}
+
+    def _add(self, trial):
+        for attr in self.INDEXES:
+            value = (
+                _run_budget(trial) if attr == "run_budget" else _trial_attr(trial, attr)
+            )
+            self._index[attr][value][trial.trial_id] = trial
+        trial.add_status_listener(self._status_changed)
+
+    def _remove(self, trial):
+        trial.remove_status_listener(self._status_changed)
+        for values in self._index.values():
+            for trials in values.values():
+                trials.pop(trial.trial_id, None)
+
+    def _status_changed(self, trial, old_status, new_status):
+        with self._lock:
+            if dict.get(self, trial.trial_id) is trial:
+                self._index["status"][old_status].pop(trial.trial_id, None)
+                self._index["status"][new_status][trial.trial_id] = trial
+
+    def __setitem__(self, trial_id, trial):
+        with self._lock:
+            if trial_id in self:
+                self._remove(self[trial_id])
+            super().__setitem__(trial_id, trial)
+            self._add(trial)
+
+    def __delitem__(self, trial_id):
+        with self._lock:
+            trial = self[trial_id]
+            super().__delitem__(trial_id)
+            self._remove(trial)
+
+    def pop(self, trial_id, *default):
+        with self._lock:
+            if trial_id not in self:
+                return super().pop(trial_id, *default)
+            trial = super().pop(trial_id)
+            self._remove(trial)
+            return trial
+
+    def select(self, **criteria):
+        """Returns the trials matching all `criteria`, in the order they were
+        added.
+
+        Example: `store.select(sample_type="model", model_budget=0)`
+
+        :param criteria: Indexed attributes and their values.
+        :return: List of trials.
+        :rtype: list[Trial]
+        """
+        with self._lock:
+            if not criteria:
+                return list(self.values())
+            candidates = [
+                self._index[attr].get(value, {}) for attr, value in criteria.items()
+            ]
+            smallest = min(candidates, key=len)
+            return [
+                trial
+                for trial_id, trial in smallest.items()
+                if all(trial_id in trials for trials in candidates)
+            ]
+
+
+class _GrowableArray(object):
+    """Numpy array with amortized constant time appends of rows."""
+
+    def __init__(self, dtype=float):
+        self._data = None
+        self._dtype = dtype
+        self.size = 0
+
+    def append(self, row):
+        row = np.asarray(row, dtype=self._dtype)
+        if self._data is None:
+            self._data = np.empty((16,) + row.shape, dtype=self._dtype)
+        elif self.size == len(self._data):
+            grown = np.empty((2 * self.size,) + self._data.shape[1:], self._dtype)
+            grown[: self.size] = self._data
+            self._data = grown
+        self._data[self.size] = row
+        self.size += 1
+
+    def array(self, size=None):
+        """Read-only view of the first `size` rows, all rows by default."""
+        if self._data is None:
+            return np.empty(0, dtype=self._dtype)
+        view = self._data[: self.size if size is None else size]
+        view.flags.writeable = False
+        return view
+
+
+class FinalStore(list):
+    """Finalized trials in the order they finished.
+
+    Behaves like a list and additionally indexes the trials by trial id, run
+    budget and the fingerprint of their hparams. Derived per trial values, e.g. the transformed hparams, can be
+    kept as columns: numpy arrays which are extended with the trials
+    finalized since the last read instead of being rebuilt.
+    """
+
+    def __init__(self, trials=()):
+        super().__init__()
+        self._by_id = {}
+        # fingerprint -> position of the first trial with it
+        self._by_fingerprint = {}
+        # run budget -> positions of its trials
+        self._by_budget = collections.defaultdict(lambda: _GrowableArray(int))
+        self._columns = {}
+        for trial in trials:
+            self.append(trial)
+
+    def append(self, trial):
+        position = len(self)
+        super().append(trial)
+        self._by_id[trial.trial_id] = trial
+        self._by_fingerprint.setdefault(trial.fingerprint, position)
+        self._by_budget[_run_budget(trial)].append(position)
+
+    def extend(self, trials):
+        for trial in trials:
+            self.append(trial)
+
+    def get(self, trial_id, default=None):
+        """Returns the finalized trial with `trial_id`."""
+        return self._by_id.get(trial_id, default)
+
+    def find(self, fingerprint):
+        """Returns the position of the first trial with `fingerprint`, -1 if
+        there is none.
+
+        :param fingerprint: Fingerprint of the hparams, see `Trial.fingerprint`
+        :type fingerprint: str
+        :rtype: int
+        """
+        return self._by_fingerprint.get(fingerprint, -1)
+
+    def _positions(self, budget, size):
+        positions = self._by_budget[budget].array()
+        # trials appended concurrently are not part of the columns yet
+        return positions[: np.searchsorted(positions, size)]
+
+    def select(self, budget=0):
+        """Returns the trials run with `budget`, all trials if it is 0 or None.
+
+        :param budget: The run budget.
+        :type budget: int
+        :rtype: list[Trial]
+        """
+        if not budget:
+            return list(self)
+        return [self[i] for i in self._positions(budget, len(self))]
+
+    def column(self, key, fn, budget=0, dtype=float):
+        """Returns `fn(trial)` for the trials run with `budget`, as a read-only
+        array in the order of the store. `fn` is called once per trial and
+        key, the values are kept for later reads.
+
+        :param key: Name of the column, e.g. ("transform", True).
+        :type key: hashable
+        :param fn: Computes the row of a trial.
+        :type fn: callable
+        :param budget: The run budget, all trials if it is 0 or None.
+        :type budget: int
+        :param dtype: dtype of the array.
+        :return: Array of shape (n_trials,) + shape of a row.
+        :rtype: np.ndarray
+        """
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = _GrowableArray(dtype)
+        size = len(self)
+        for i in range(column.size, size):
+            column.append(fn(self[i]))
+        values = column.array(size)
+        if budget:
+            values = values[self._positions(budget, size)]
+        return values
+
+
+class ToleranceGrid(object):
+    """Finds trials with nearly the same hparams.
+
+    Two configurations are near duplicates if their discrete hparams
+    (INTEGER, CATEGORICAL) are equal and their DOUBLE hparams, max-min
+    normalized, differ by at most `tolerance` each. The trials are hashed
+    into grid cells with a side of twice the tolerance, so a lookup only
+    visits the neighbouring cells a near duplicate can be in: at most two per
+    DOUBLE hparam and usually one.
+    """
+
+    def __init__(self, searchspace, tolerance):
+        """
+        :param searchspace: The searchspace of the experiment.
+        :type searchspace: Searchspace
+        :param tolerance: Maximum normalized difference of DOUBLE hparams,
+            between 0 and 1.
+        :type tolerance: float
+        """
+        if not 0 < tolerance < 1:
+            raise ValueError(
+                "tolerance should be in (0, 1) but it is {}".format(tolerance)
+            )
+        self.tolerance = tolerance
+        self._bounds = collections.OrderedDict(
+            (hparam["name"], hparam["values"])
+            for hparam in searchspace.items()
+            if hparam["type"] == "DOUBLE"
+        )
+        self._cell = 2 * tolerance
+        # (fingerprint of discrete hparams, cell) -> [(point, trial)]
+        self._cells = collections.defaultdict(list)
+
+    def _locate(self, params):
+        discrete = Trial._generate_fingerprint(
+            {k: v for k, v in params.items() if k not in self._bounds}
+        )
+        point = [
+            Searchspace._normalize_scalar(bounds, params[name])
+            for name, bounds in self._bounds.items()
+        ]
+        return discrete, point
+
+    def add(self, trial):
+        discrete, point = self._locate(trial.params)
+        cell = tuple(int(math.floor(x / self._cell)) for x in point)
+        self._cells[(discrete, cell)].append((point, trial))
+
+    def find(self, params):
+        """Returns a trial with nearly the same hparams as `params`, None if
+        there is none.
+
+        :param params: The hparams.
+        :type params: dict
+        :rtype: Trial
+        """
+        discrete, point = self._locate(params)
+        neighbours = []
+        for x in point:
+            c = int(math.floor(x / self._cell))
+            cells = [c]
+            if x - self.tolerance < c * self._cell:
+                cells.append(c - 1)
+            if x + self.tolerance >= (c + 1) * self._cell:
+                cells.append(c + 1)
+            neighbours.append(cells)
+        for cell in itertools.product(*neighbours):
+            for other, trial in self._cells.get((discrete, cell), ()):
+                if all(abs(a - b) <= self.tolerance for a, b in zip(point, other)):
+                    return trial
+        return None
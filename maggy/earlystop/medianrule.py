@@ -14,7 +14,10 @@
 #   limitations under the License.
 #
 
+import bisect
 import statistics
+import weakref
+
 from maggy.earlystop.abstractearlystop import AbstractEarlyStop
 
 
@@ -22,12 +25,19 @@ class MedianStoppingRule(AbstractEarlyStop):
     """The Median Stopping Rule implements the simple strategy of stopping a
     trial if its performance falls below the median of other trials at similar
     points in time.
+
+    The running averages of the finalized trials are kept in sorted lists per
+    step, which are extended with the trials finalized since the last check,
+    so the median at a step is a lookup.
     """
 
+    # finalized trials store of the last check and its StepMedians
+    _store_ref = None
+    _step_medians = None
+
     @staticmethod
     def earlystop_check(to_check, finalized_trials, direction):
 
-        results = []
         median = None
 
         # count step from zero so it can be used as index for array
@@ -35,14 +45,10 @@ class MedianStoppingRule(AbstractEarlyStop):
 
         if step > 0:
 
-            for fin_trial in finalized_trials:
-
-                if len(fin_trial.metric_history) >= step:
-                    avg = sum(fin_trial.metric_history[:step]) / float(step)
-                    results.append(avg)
+            medians = MedianStoppingRule._get_step_medians(finalized_trials)
 
             try:
-                median = statistics.median(results)
+                median = medians.median(step)
             except statistics.StatisticsError as e:
                 raise Exception(
                     "Warning: StatisticsError when calling early stop method\n{}".format(
@@ -58,3 +64,82 @@ class MedianStoppingRule(AbstractEarlyStop):
                     if min(to_check.metric_history) > median:
                         return to_check.trial_id
             return None
+
+    @staticmethod
+    def _get_step_medians(finalized_trials):
+        # reuse the averages if the trials were appended to the store of the
+        # last check, the experiment driver always passes its final store
+        store_ref = MedianStoppingRule._store_ref
+        medians = MedianStoppingRule._step_medians
+        if (
+            store_ref is None
+            or store_ref() is not finalized_trials
+            or medians.n_trials > len(finalized_trials)
+        ):
+            medians = StepMedians()
+            try:
+                store_ref = weakref.ref(finalized_trials)
+            except TypeError:
+                # e.g. a plain list, start from scratch every time
+                store_ref = None
+            MedianStoppingRule._store_ref = store_ref
+            MedianStoppingRule._step_medians = medians
+        medians.extend(finalized_trials)
+        return medians
+
+
+class StepMedians(object):
+    """Running averages of the metric histories of finalized trials, kept in
+    one sorted list per step.
+
+    Adding a trial with a history of length L costs L insertions, the median
+    of the averages up to a step is then read from the middle of its list.
+    """
+
+    def __init__(self):
+        # sorted running averages per step, index 0 is step 1
+        self.averages = []
+        # number of trials of the finalized trials store added so far
+        self.n_trials = 0
+
+    def extend(self, finalized_trials):
+        """Adds the trials finalized since the last call.
+
+        :param finalized_trials: Finalized trials in the order they finished,
+            the store this instance was extended with before.
+        :type finalized_trials: list
+        """
+        for trial in finalized_trials[self.n_trials :]:
+            self.add(trial.metric_history)
+        self.n_trials = len(finalized_trials)
+
+    def add(self, metric_history):
+        """Adds the running averages of a metric history.
+
+        :param metric_history: Metrics of a trial, one per step.
+        :type metric_history: list
+        """
+        total = 0
+        for i, metric in enumerate(metric_history):
+            if i == len(self.averages):
+                self.averages.append([])
+            # same summation order as `sum(metric_history[:step])`
+            total += metric
+            bisect.insort(self.averages[i], total / float(i + 1))
+
+    def median(self, step):
+        """Returns the median of the averages of the first `step` metrics of
+        the trials with at least `step` metrics.
+
+        :param step: Number of metrics, at least 1.
+        :type step: int
+        :raises statistics.StatisticsError: If no trial has `step` metrics.
+        :rtype: float
+        """
+        if step > len(self.averages):
+            raise statistics.StatisticsError("no median for empty data")
+        averages = self.averages[step - 1]
+        n = len(averages)
+        if n % 2 == 1:
+            return averages[n // 2]
+        return (averages[n // 2 - 1] + averages[n // 2]) / 2
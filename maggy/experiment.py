@@ -57,6 +57,9 @@ def lagom(
     es_interval=1,
     es_min=10,
     description="",
+    rpc_backend="select",
+    rpc_multiplex=False,
+    prefetch_suggestions=0,
 ):
     """Launches a maggy experiment, which depending on `experiment_type` can
     either be a hyperparameter optimization or an ablation study experiment.
@@ -106,6 +109,20 @@ def lagom(
     :type es_min: int, optional
     :param description: A longer description of the experiment.
     :type description: str, optional
+    :param rpc_backend: Implementation of the experiment driver's server
+        handling the executor connections, either 'select' (default) or
+        'asyncio'. The asyncio server scales better to a large number of
+        executors.
+    :type rpc_backend: str, optional
+    :param rpc_multiplex: Let executors send their heartbeats and control
+        messages over a single connection to the driver instead of two,
+        defaults to False.
+    :type rpc_multiplex: bool, optional
+    :param prefetch_suggestions: Number of trials the optimizer computes
+        ahead on a background thread, so executors get their next trial
+        right away. Not supported for ASHA and optimizers with a pruner,
+        defaults to 0 (no prefetching).
+    :type prefetch_suggestions: int, optional
     :raises RuntimeError: An experiment is currently running.
     :return: A dictionary indicating the best trial and best hyperparameter
         combination with it's performance metric
@@ -162,6 +179,9 @@ def lagom(
                 es_min=es_min,
                 description=description,
                 log_dir=experiment_utils._get_logdir(app_id, run_id),
+                rpc_backend=rpc_backend,
+                rpc_multiplex=rpc_multiplex,
+                prefetch_suggestions=prefetch_suggestions,
             )
 
         elif experiment_type == "ablation":
@@ -174,6 +194,8 @@ def lagom(
                 description=description,
                 direction="max",
                 log_dir=experiment_utils._get_logdir(app_id, run_id),
+                rpc_backend=rpc_backend,
+                rpc_multiplex=rpc_multiplex,
             )
             # using exp_driver.num_executor since
             # it has been set using ablator.get_number_of_trials()
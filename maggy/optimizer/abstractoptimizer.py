@@ -21,17 +21,22 @@ import time
 from hops import hdfs
 import numpy as np
 
+from maggy.core.trialstore import ToleranceGrid
 from maggy.trial import Trial
-from maggy.pruner import Hyperband
+from maggy.pruner import AsyncHyperband, Hyperband
 
 
 class AbstractOptimizer(ABC):
-    def __init__(self, pruner=None, pruner_kwargs=None):
+    def __init__(self, pruner=None, pruner_kwargs=None, duplicate_tolerance=None):
         """
-        :param pruner: name of pruning algorithm to use. So far only `hyperband` supported
+        :param pruner: name of pruning algorithm to use, `hyperband` or `async_hyperband`
         :type pruner: str
         :param pruner_kwargs: dict of arguments for initializing pruner. See pruner classes for reference.
         :type pruner_kwargs: dict
+        :param duplicate_tolerance: If set, configs whose DOUBLE hparams differ by at most this fraction of their
+                                    range from an existing trial, with equal other hparams, count as duplicates.
+                                    By default only equal configs are duplicates.
+        :type duplicate_tolerance: float
         """
         self.searchspace = None
         self.num_trials = None
@@ -40,6 +45,17 @@ class AbstractOptimizer(ABC):
         self.direction = None
         self.pruner = None
 
+        if duplicate_tolerance is not None and not 0 < duplicate_tolerance < 1:
+            raise ValueError(
+                "duplicate_tolerance should be in (0, 1) but it is {}".format(
+                    duplicate_tolerance
+                )
+            )
+        self.duplicate_tolerance = duplicate_tolerance
+        # near duplicate index of the finalized trials, built lazily
+        self._duplicate_grid = None
+        self._duplicate_grid_size = 0
+
         # configure pruner
         if pruner:
             self.init_pruner(pruner, pruner_kwargs)
@@ -142,19 +158,28 @@ class AbstractOptimizer(ABC):
         :return: dict of trial_ids and hparams. Example: {`trial_id1`: `hparam_dict1`, ... , `trial_idn`: `hparam_dictn`}
         :rtype: dict
         """
-        # return trials with specified trial_ids or return all trials
-        include_trial = (
-            lambda x: x == trial_ids or x in trial_ids or trial_ids == "all"
-        )  # noqa: E731
-
         hparam_dict = {
-            trial.trial_id: trial.params
-            for trial in self.final_store
-            if include_trial(trial.trial_id)
+            trial.trial_id: trial.params for trial in self._get_final_trials(trial_ids)
         }
 
         return hparam_dict
 
+    def _get_final_trials(self, trial_ids="all"):
+        """returns the finished trials with the given trial ids, ignoring ids that have not finished
+
+        :param trial_ids: trial_id or list of trial_ids that should be returned.
+                          If set to default ("all"), return all trials
+        :type trial_ids: list[str]|str
+        :rtype: list[Trial]
+        """
+        if trial_ids == "all":
+            return list(self.final_store)
+        if isinstance(trial_ids, str):
+            trial_ids = [trial_ids]
+
+        trials = [self.final_store.get(trial_id) for trial_id in trial_ids]
+        return [trial for trial in trials if trial is not None]
+
     def get_hparams_array(self, budget=0):
         """returns array of hparams that were evaluated with `budget`
 
@@ -162,23 +187,19 @@ class AbstractOptimizer(ABC):
 
         :param budget: budget of trials to return
         :type budget: int
-        :return: array of hparams, shape (n_finalized_trials, n_hparams)
+        :return: read-only array of hparams with the types of the values, shape (n_finalized_trials, n_hparams)
         :rtype: np.ndarray[np.ndarray]
 
         # todo when budget becomes attr of Trial object ( and not part of params anymore ) adapt
         """
 
-        include_trial = lambda x: x == budget  # noqa: E731
-
-        hparams = np.array(
-            [
-                self.searchspace.dict_to_list(trial.params)
-                for trial in self.final_store
-                # include trials with given budget or include all trials if no budget is given
-                if budget == 0
-                or budget is None
-                or include_trial(trial.params["budget"])
-            ]
+        # include trials with given budget or include all trials if no budget is given
+        # the store keeps the hparams of each finalized trial as array
+        hparams = self.final_store.column(
+            "hparams",
+            lambda trial: self.searchspace.dict_to_list(trial.params),
+            budget,
+            dtype=object,
         )
 
         return hparams
@@ -199,15 +220,9 @@ class AbstractOptimizer(ABC):
         else:
             metric_multiplier = 1
 
-        # return trials with specified trial_ids or return all trials
-        include_trial = (
-            lambda x: x == trial_ids or x in trial_ids or trial_ids == "all"
-        )  # noqa: E731
-
         metrics = {
             trial.trial_id: trial.final_metric * metric_multiplier
-            for trial in self.final_store
-            if include_trial(trial.trial_id)
+            for trial in self._get_final_trials(trial_ids)
         }
 
         return metrics
@@ -229,22 +244,22 @@ class AbstractOptimizer(ABC):
         :rtype: np.ndarray[float|np.ndarray]
         """
 
-        include_trial = lambda x: x == budget  # noqa: E731
-
-        metrics = []
-        for trial in self.final_store:
-            # include trials with given budget or include all trials if no budget is given
-            if budget == 0 or budget is None or include_trial(trial.params["budget"]):
-                if interim_metrics:
-                    # append whole metric history of trial, note the conversion to np.array
-                    m = np.array(trial.metric_history)
-                else:
-                    # append final metric of trial
-                    m = trial.final_metric
-
-                metrics.append(m)
-
-        metrics = np.array(metrics)
+        # include trials with given budget or include all trials if no budget is given
+        if interim_metrics:
+            # whole metric history of each trial, note the conversion to np.array
+            metrics = np.array(
+                [
+                    np.array(trial.metric_history)
+                    for trial in self.final_store.select(budget)
+                ]
+            )
+        else:
+            # final metrics are kept as array by the store
+            metrics = np.array(
+                self.final_store.column(
+                    "final_metric", lambda trial: trial.final_metric, budget
+                )
+            )
 
         if self.direction == "max":
             metrics = -metrics
@@ -261,49 +276,77 @@ class AbstractOptimizer(ABC):
 
         """
 
-        def remove_budget(trial_params):
-            """In multi fidelity setting budget is added as key to trial.params.
-            Needs to be removed here to compare actual params defined in search space
-            """
-            return dict(
-                (k, trial_params[k])
-                for k in self.searchspace.keys()
-                if k in trial_params
-            )
-
+        # the fingerprint ignores the budget, which in multi fidelity setting is added as key to trial.params
         # check in finished trials
-        # todo when budget becomes attr of Trial object ( and not part of params anymore ), adapt the comparison
-        for idx, finished_trial in enumerate(self.final_store):
-            if remove_budget(trial.params) == remove_budget(finished_trial.params):
-                self._log(
-                    "WARNING Duplicate Config: Hparams {} are equal to params of finished trial no. {}: {}".format(
-                        trial.params, idx, finished_trial.trial_id
-                    )
+        idx = self.final_store.find(trial.fingerprint)
+        if idx >= 0:
+            self._log(
+                "WARNING Duplicate Config: Hparams {} are equal to params of finished trial no. {}: {}".format(
+                    trial.params, idx, self.final_store[idx].trial_id
                 )
-                return True
+            )
+            return True
 
         # check in currently evaluating trials
-        for trial_id, busy_trial in self.trial_store.items():
-            if remove_budget(trial.params) == remove_budget(busy_trial.params):
-                self._log(
-                    "WARNING Duplicate Config: Hparams {} are equal to currently evaluating Trial: {}".format(
-                        trial.params, busy_trial.trial_id
-                    )
+        busy_trials = self.trial_store.select(fingerprint=trial.fingerprint)
+        if busy_trials:
+            self._log(
+                "WARNING Duplicate Config: Hparams {} are equal to currently evaluating Trial: {}".format(
+                    trial.params, busy_trials[0].trial_id
+                )
+            )
+            return True
+
+        if self.duplicate_tolerance:
+            return self._near_duplicate_exists(trial)
+
+        return False
+
+    def _near_duplicate_exists(self, trial):
+        """Checks if a finished or currently evaluating trial has nearly the same hparams as `trial`,
+        see `duplicate_tolerance`.
+        """
+        if self._duplicate_grid is None:
+            self._duplicate_grid = ToleranceGrid(
+                self.searchspace, self.duplicate_tolerance
+            )
+        # index the trials finished since the last check
+        for finished_trial in self.final_store[self._duplicate_grid_size :]:
+            self._duplicate_grid.add(finished_trial)
+            self._duplicate_grid_size += 1
+        finished_trial = self._duplicate_grid.find(trial.params)
+        if finished_trial is not None:
+            self._log(
+                "WARNING Near Duplicate Config: Hparams {} are close to params of finished trial {}: {}".format(
+                    trial.params, finished_trial.trial_id, finished_trial.params
                 )
-                return True
+            )
+            return True
+
+        busy_grid = ToleranceGrid(self.searchspace, self.duplicate_tolerance)
+        for busy_trial in self.trial_store.select():
+            busy_grid.add(busy_trial)
+        busy_trial = busy_grid.find(trial.params)
+        if busy_trial is not None:
+            self._log(
+                "WARNING Near Duplicate Config: Hparams {} are close to params of currently evaluating Trial {}: {}".format(
+                    trial.params, busy_trial.trial_id, busy_trial.params
+                )
+            )
+            return True
 
         return False
 
     def init_pruner(self, pruner, pruner_kwargs):
         """intializes pruner
 
-        :param pruner: name of pruner. so far only "hyperband" implemented
+        :param pruner: name of pruner, "hyperband" or "async_hyperband"
         :type pruner: str
         :param pruner_kwargs: dict of pruner kwargs
         :type pruner_kwargs: dict
         :return: initiated pruner instance
         """
-        allowed_pruners = ["hyperband"]
+        allowed_pruners = ["hyperband", "async_hyperband"]
         if pruner not in allowed_pruners:
             raise ValueError(
                 "expected pruner to be in {}, got {}".format(allowed_pruners, pruner)
@@ -313,8 +356,34 @@ class AbstractOptimizer(ABC):
             self.pruner = Hyperband(
                 trial_metric_getter=self.get_metrics_dict, **pruner_kwargs
             )
+        elif pruner == "async_hyperband":
+            self.pruner = AsyncHyperband(
+                trial_metric_getter=self.get_metrics_dict, **pruner_kwargs
+            )
+
+    def report_final_trial(self, trial):
+        """reports the final metric of a finished trial to the pruner
+
+        In case that the optimization `direction` is `max`, the metric is negated so it becomes a `min` problem
+
+        :param trial: last finished trial by an executor or None
+        :type trial: Trial|None
+        """
+        if self.pruner is None or trial is None:
+            return
+        metric_multiplier = -1 if self.direction == "max" else 1
+        self.pruner.report_metric(
+            trial.trial_id, trial.final_metric * metric_multiplier
+        )
 
-    def create_trial(self, hparams, sample_type, run_budget=0, model_budget=None):
+    def create_trial(
+        self,
+        hparams,
+        sample_type,
+        run_budget=0,
+        model_budget=None,
+        parent_trial_id=None,
+    ):
         """helper function to create trial with budget and trial_dict
 
         `run_budget == 0` means that it is a single fidelity optimization and budget does not need to be passed to Trial
@@ -334,6 +403,9 @@ class AbstractOptimizer(ABC):
         :type run_budget: int
         :param model_budget: If sample_type == `model`, specifies from which model the sample was generated
         :type model_budget: int
+        :param parent_trial_id: If sample_type == `promoted`, the id of the finished trial the config was promoted
+                                from. The trial can continue from the checkpoint of the parent trial.
+        :type parent_trial_id: str
         :return: Trial object with specified params
         :rtype: Trial
         """
@@ -350,18 +422,24 @@ class AbstractOptimizer(ABC):
                 "expected `model_budget` because sample_type==`model`, got None"
             )
 
-        # calculate time needed for sampling
-        sampling_time = time.time() - self.sampling_time_start
+        # calculate time needed for sampling, the time the executor waited
+        # for the trial is added by the experiment driver
+        sampling_compute_time = time.time() - self.sampling_time_start
         self.sampling_time_start = 0.0
 
         # init trial info dict
         trial_info_dict = {
             "run_budget": run_budget,
             "sample_type": sample_type,
-            "sampling_time": sampling_time,
+            "sampling_compute_time": sampling_compute_time,
         }
         if model_budget is not None:
             trial_info_dict["model_budget"] = model_budget
+        if parent_trial_id is not None:
+            trial_info_dict["parent_trial_id"] = parent_trial_id
+            trial_info_dict["parent_budget"] = self.final_store.get(
+                parent_trial_id
+            ).params.get("budget", 0)
 
         # todo legacy → in the long run have budget as explicit attr of trial object
         if run_budget > 0:
@@ -14,6 +14,8 @@
 #   limitations under the License.
 #
 
+import bisect
+import heapq
 import math
 
 from maggy.optimizer.abstractoptimizer import AbstractOptimizer
@@ -73,7 +75,15 @@ class Asha(AbstractOptimizer):
         # maps rung index k to trials in that rung
         self.rungs = {0: []}
         # maps rung index k to trial ids of trials that were promoted
-        self.promoted = {0: []}
+        self.promoted = {0: set()}
+        # maps rung index k to the sort keys of its finalized trials in
+        # ascending order, the best trial first
+        self.finished = {0: []}
+        # maps rung index k to a heap of (sort key, trial) of its finalized
+        # trials that haven't been promoted yet
+        self.promotable = {0: []}
+        # maps trial id to (rung, index in rung) of the running trials
+        self._running = {}
 
         self.max_rung = int(
             math.floor(
@@ -86,6 +96,8 @@ class Asha(AbstractOptimizer):
     def get_suggestion(self, trial=None):
 
         if trial is not None:
+            self._add_finished(trial)
+
             # stopping criterium: one trial in max rung
             if self.max_rung in self.rungs:
                 # return None to signal end to experiment driver
@@ -97,54 +109,39 @@ class Asha(AbstractOptimizer):
                 if k not in self.rungs:
                     continue
 
-                # get top_k
-                rung_finished = len(
-                    [x for x in self.rungs[k] if x.status == Trial.FINALIZED]
+                # the best trial that hasn't been promoted yet is promotable
+                # if it is in the top k of the rung
+                n_top = len(self.finished[k]) // self.reduction_factor
+                if n_top - len(self.promoted[k]) <= 0 or not self.promotable[k]:
+                    continue
+                key, old_trial = self.promotable[k][0]
+                if bisect.bisect_left(self.finished[k], key) >= n_top:
+                    continue
+
+                new_rung = k + 1
+                heapq.heappop(self.promotable[k])
+                # make copy of params to be able to change resource
+                params = old_trial.params.copy()
+                params["budget"] = self.resource_min * (
+                    self.reduction_factor ** new_rung
+                )
+                # the promoted trial can continue from the checkpoint of
+                # the old trial
+                promote_trial = Trial(
+                    params,
+                    info_dict={
+                        "parent_trial_id": old_trial.trial_id,
+                        "parent_budget": old_trial.params["budget"],
+                    },
                 )
 
-                if (rung_finished // self.reduction_factor) - len(
-                    self.promoted.get(k, [])
-                ) > 0:
-                    candidates = self._top_k(
-                        k, (rung_finished // self.reduction_factor)
-                    )
-                else:
-                    candidates = []
-
-                # if there are no candidates, check one rung below
-                if not candidates:
-                    continue
+                # open new rung if not exists
+                self._add_to_rung(new_rung, promote_trial)
 
-                # select all that haven't been promoted yet
-                promotable = [
-                    t for t in candidates if t.trial_id not in self.promoted.get(k, [])
-                ]
-
-                nr_promotable = len(promotable)
-                if nr_promotable >= 1:
-                    new_rung = k + 1
-                    # sorted in decending order, take highest -> index 0
-                    old_trial = promotable[0]
-                    # make copy of params to be able to change resource
-                    params = old_trial.params.copy()
-                    params["budget"] = self.resource_min * (
-                        self.reduction_factor ** new_rung
-                    )
-                    promote_trial = Trial(params)
-
-                    # open new rung if not exists
-                    if new_rung in self.rungs:
-                        self.rungs[new_rung].append(promote_trial)
-                    else:
-                        self.rungs[new_rung] = [promote_trial]
-
-                    # remember promoted trial
-                    if k in self.promoted:
-                        self.promoted[k].append(old_trial.trial_id)
-                    else:
-                        self.promoted[k] = [old_trial.trial_id]
-
-                    return promote_trial
+                # remember promoted trial
+                self.promoted[k].add(old_trial.trial_id)
+
+                return promote_trial
 
         # else return random configuration in base rung
         params = self.searchspace.get_random_parameter_values(1)[0]
@@ -152,19 +149,27 @@ class Asha(AbstractOptimizer):
         params["budget"] = self.resource_min
         to_return = Trial(params)
         # add to bottom rung
-        self.rungs[0].append(to_return)
+        self._add_to_rung(0, to_return)
         return to_return
 
     def finalize_experiment(self, trials):
         return
 
-    def _top_k(self, rung_k, number):
-        """Find top-`number` trials in `rung_k`.
-        """
-        if number > 0:
-            filtered = [x for x in self.rungs[rung_k] if x.status == Trial.FINALIZED]
-            filtered.sort(key=lambda x: x.final_metric, reverse=True)
-            # return top k trials if finalized
-            return filtered[:number]
-        else:
-            return []
+    def _add_to_rung(self, rung_k, trial):
+        if rung_k not in self.rungs:
+            self.rungs[rung_k] = []
+            self.promoted[rung_k] = set()
+            self.finished[rung_k] = []
+            self.promotable[rung_k] = []
+        self._running[trial.trial_id] = (rung_k, len(self.rungs[rung_k]))
+        self.rungs[rung_k].append(trial)
+
+    def _add_finished(self, trial):
+        """Adds a finalized trial to the sorted trials of its rung."""
+        if trial.status != Trial.FINALIZED or trial.trial_id not in self._running:
+            return
+        rung_k, index = self._running.pop(trial.trial_id)
+        # descending metric, ties in the order the trials were created
+        key = (-trial.final_metric, index)
+        bisect.insort(self.finished[rung_k], key)
+        heapq.heappush(self.promotable[rung_k], (key, trial))
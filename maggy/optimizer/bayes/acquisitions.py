@@ -156,6 +156,9 @@ class TPE_EI(AbstractAcquisitionFunction):
 
 
 class AsyTS(AbstractAcquisitionFunction):
+    # `sample_y` draws with random_state=0, i.e. a sample at a single point is mean + Z * std with this Z
+    Z = np.random.RandomState(0).standard_normal()
+
     @staticmethod
     def evaluate(X, surrogate_model, y_opt, acq_func_kwargs=None):
         return surrogate_model.sample_y(X).reshape(X.shape[0],)
@@ -165,6 +168,9 @@ class AsyTS(AbstractAcquisitionFunction):
         """A wrapper around the acquisition function that is called by fmin_l_bfgs_b.
            This is because lbfgs allows only 1-D input.
 
+        Computes the sample `surrogate_model.sample_y()` would draw at x from the predicted mean and std, which also
+        gives the gradient.
+
         :param x: value where acquisition function should be evaluated. shape=(n_hparams, )
         :type x: np.ndarray
         :param surogate_model: the surrogate model of the bayesian optimizer.
@@ -173,10 +179,17 @@ class AsyTS(AbstractAcquisitionFunction):
         :type y_opt: float
         :param acq_func_kwargs: additional arguments for the acquisition function
         :type acq_func_kwargs: dict|None
-        :return: values of the acquisition function at value x. shape = (1,)
-        :rtype: np.ndarray
+        :return: tuple containing two arrays. the first holds the value of the acquisition function at value x;
+                 shape = (1,) . the second holds the gradients; shape = (n_hparams,).
+        :rtype: tuple
         """
-        return surrogate_model.sample_y(np.expand_dims(x, axis=0)).reshape(1,)
+        mean, std, mean_grad, std_grad = surrogate_model.predict(
+            np.expand_dims(x, axis=0),
+            return_std=True,
+            return_mean_grad=True,
+            return_std_grad=True,
+        )
+        return mean + AsyTS.Z * std, mean_grad + AsyTS.Z * std_grad
 
 
 class HLP(AbstractAcquisitionFunction):
@@ -137,6 +137,8 @@ class BaseAsyncBO(AbstractOptimizer):
         self.random_fraction = random_fraction
         self.interim_results = interim_results
         self.interim_results_interval = interim_results_interval
+        # (trial_id, interval) -> augumented hparams and interim metrics of a finalized trial
+        self._interim_XY = {}
 
         # helper variable to calculate time needed for calculating next suggestion
         self.sampling_time_start = 0.0
@@ -178,6 +180,7 @@ class BaseAsyncBO(AbstractOptimizer):
             )
         else:
             self._log("no previous finished trial")
+        self.report_final_trial(trial)
 
         # check if experiment has finished
         if self._experiment_finished():
@@ -206,6 +209,7 @@ class BaseAsyncBO(AbstractOptimizer):
                     hparams=parent_trial_hparams,
                     sample_type="promoted",
                     run_budget=next_trial_info["budget"],
+                    parent_trial_id=parent_trial_id,
                 )
                 # report new trial id to pruner
                 self.pruner.report_trial(
@@ -394,11 +398,15 @@ class BaseAsyncBO(AbstractOptimizer):
         else:
             return False
 
-    def get_busy_locations(self, budget=0):
+    def get_busy_locations(self, budget=0, trials=None):
         """returns hparams of currently evaluating trials
 
         Considers only trials that were sampled from model with specified budget
         This is a helper functions used when async strategy is `impute`
+
+        :param trials: evaluating trials to consider. Default are the trials currently evaluating, use the same
+                       list for `get_imputed_metrics()` when the trials change concurrently
+        :type trials: list[Trial]|None
         """
         if not self.include_busy_locations():
             raise ValueError(
@@ -410,22 +418,23 @@ class BaseAsyncBO(AbstractOptimizer):
                 )
             )
 
+        if trials is None:
+            trials = self.trial_store.select(sample_type="model", model_budget=budget)
+
         hparams_busy = np.array(
-            [
-                self.searchspace.dict_to_list(trial.params)
-                for trial_id, trial in self.trial_store.items()
-                if trial.info_dict["sample_type"] == "model"
-                and trial.info_dict["model_budget"] == budget
-            ]
+            [self.searchspace.dict_to_list(trial.params) for trial in trials]
         )
 
         return hparams_busy
 
-    def get_imputed_metrics(self, budget=0):
+    def get_imputed_metrics(self, budget=0, trials=None):
         """returns imputed metrics for currently evaluating trials
 
         Considers only trials that were sampled from model with specified budget
         This is a helper function, only used when async strategy is `impute`
+
+        :param trials: evaluating trials to consider. Default are the trials currently evaluating
+        :type trials: list[Trial]|None
         """
         if not self.include_busy_locations():
             raise ValueError(
@@ -437,23 +446,85 @@ class BaseAsyncBO(AbstractOptimizer):
                 )
             )
 
+        if trials is None:
+            trials = self.trial_store.select(sample_type="model", model_budget=budget)
+
         metrics_busy = np.empty(0, dtype=float)
-        for trial_id, trial in self.trial_store.items():
-            if (
-                trial.info_dict["sample_type"] == "model"
-                and trial.info_dict["model_budget"] == budget
-            ):
-                imputed_metric = self.impute_metric(trial.params, budget)
-                metrics_busy = np.append(metrics_busy, imputed_metric)
-                # add info about imputed metric to trial info dict
-                if "imputed_metrics" in trial.info_dict.keys():
-                    trial.info_dict["imputed_metrics"].append(imputed_metric)
-                else:
-                    trial.info_dict["imputed_metrics"] = [imputed_metric]
+        for trial in trials:
+            imputed_metric = self.impute_metric(trial.params, budget)
+            metrics_busy = np.append(metrics_busy, imputed_metric)
+            # add info about imputed metric to trial info dict
+            if "imputed_metrics" in trial.info_dict.keys():
+                trial.info_dict["imputed_metrics"].append(imputed_metric)
+            else:
+                trial.info_dict["imputed_metrics"] = [imputed_metric]
 
         return metrics_busy
 
-    def get_XY(self, budget=0, interim_results=False, interim_results_interval=10):
+    def get_busy_XY(self, budget=0, interim_results=False):
+        """get transformed hparams and imputed metrics of currently evaluating trials
+
+        Only used when async strategy is `impute`
+
+        :param budget: budget of the model that sampled the evaluating trials
+        :type budget: int
+        :param interim_results: If True, the hparams are augumented with the max budget, see `get_XY()`
+        :type interim_results: bool
+        :return: Tuple of the transformed hparams, shape (n_busy_locations, n_hparams (+ 1)), and the imputed metrics,
+                 shape (n_busy_locations,)
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        # same trials for hparams and metrics, they change concurrently when prefetching
+        trials = self.trial_store.select(sample_type="model", model_budget=budget)
+        hparams_busy = self.get_busy_locations(budget=budget, trials=trials)
+        imputed_metrics = self.get_imputed_metrics(budget=budget, trials=trials)
+        assert hparams_busy.shape[0] == imputed_metrics.shape[0], (
+            "Number of evaluating trials and imputed "
+            "metrics needs to be equal, "
+            "got n_busy_locations: {}, "
+            "n_imputed_metrics: {}".format(
+                hparams_busy.shape[0], imputed_metrics.shape[0]
+            )
+        )
+
+        n_dims = len(self.searchspace.keys()) + (1 if interim_results else 0)
+        if len(hparams_busy) == 0:
+            return np.empty((0, n_dims)), imputed_metrics
+
+        X_busy = self.searchspace.transform_array(
+            hparams_busy, normalize_categorical=self.normalize_categorical
+        )
+        if interim_results:
+            # augument with max budget (i.e. always 1 in normalized form)
+            X_busy = np.append(X_busy, np.ones(X_busy.shape[0]).reshape(-1, 1), 1)
+
+        return X_busy, imputed_metrics
+
+    def _get_transformed_hparams(self, budget=0):
+        """returns the transformed hparams of the finalized trials run with `budget`, the store transforms the
+        hparams of each finalized trial only once
+
+        :param budget: budget of trials to return
+        :type budget: int
+        :return: read-only array of transformed hparams, shape (n_finalized_trials, n_hparams)
+        :rtype: np.ndarray
+        """
+        return self.final_store.column(
+            ("transform", self.normalize_categorical),
+            lambda trial: self.searchspace.transform(
+                self.searchspace.dict_to_list(trial.params),
+                normalize_categorical=self.normalize_categorical,
+            ),
+            budget,
+        )
+
+    def get_XY(
+        self,
+        budget=0,
+        interim_results=False,
+        interim_results_interval=10,
+        busy_locations=True,
+    ):
         """get transformed hparams and metrics for fitting surrogate
 
         :param budget: budget for which model should be build. Default is 0
@@ -470,6 +541,8 @@ class BaseAsyncBO(AbstractOptimizer):
         :param interim_results_interval: Specifies the interval of the interim results being used, If interim_results==True
                                         e.g. if 10, use every metric of every 10th epoch
         :type interim_results_interval: int
+        :param busy_locations: If False, the evaluating trials are not included, even if async strategy is `impute`
+        :type busy_locations: bool
         :return: Tuple of 2 arrays, the first containing hparams and metrics.
                  There are four scenarios:
 
@@ -492,38 +565,26 @@ class BaseAsyncBO(AbstractOptimizer):
         if not interim_results:
             # return final metrics only
 
-            # get hparams and final metrics of finalized trials
-            hparams = self.get_hparams_array(budget=budget)
+            # get transformed hparams and final metrics of finalized trials
+            # note that through transform, budget param gets ommited from hparams if it was existent (pruner)
+            hparams_transform = self._get_transformed_hparams(budget)
             metrics = self.get_metrics_array(budget=budget, interim_metrics=False)
 
             # if async strategy is `impute`
-            if self.include_busy_locations():
-                # get hparams and imputed metrics of evaluating trials
-                hparams_busy = self.get_busy_locations(budget=budget)
-                imputed_metrics = self.get_imputed_metrics(budget=budget)
-                assert hparams_busy.shape[0] == imputed_metrics.shape[0], (
-                    "Number of evaluating trials and imputed "
-                    "metrics needs to be equal, "
-                    "got n_busy_locations: {}, "
-                    "n_imputed_metrics: {}".format(
-                        hparams_busy.shape[0], imputed_metrics.shape[0]
-                    )
+            if busy_locations and self.include_busy_locations():
+                # get transformed hparams and imputed metrics of evaluating trials
+                hparams_busy_transform, imputed_metrics = self.get_busy_XY(
+                    budget=budget
                 )
                 # append to hparams and metrics
-                if len(hparams_busy) > 0:
-                    hparams = np.concatenate((hparams, hparams_busy))
+                if len(hparams_busy_transform) > 0:
+                    hparams_transform = np.concatenate(
+                        (hparams_transform, hparams_busy_transform)
+                    )
                     metrics = np.concatenate((metrics, imputed_metrics))
 
-            # transform hparams
-            # note that through transform, budget param gets ommited from hparams if it was existent (pruner)
-            hparams_transform = np.apply_along_axis(
-                self.searchspace.transform,
-                1,
-                hparams,
-                normalize_categorical=self.normalize_categorical,
-            )
-
-            X = hparams_transform
+            # copy, the column of the store is read-only
+            X = np.array(hparams_transform)
             y = metrics
 
             assert X.shape[1] == len(
@@ -536,92 +597,34 @@ class BaseAsyncBO(AbstractOptimizer):
             # return interim results and hparams augumented with budget
             # return every nth interim result according to interim_results_interval. always return first and last result
 
-            # get and transform hparams of all finalized trials
-            hparams = self.get_hparams_array(budget=budget)
-            hparams_transform = np.apply_along_axis(
-                self.searchspace.transform,
-                1,
-                hparams,
-                normalize_categorical=self.normalize_categorical,
-            )
-
-            # get full metric history for all finalized trials
-            metrics = self.get_metrics_array(
-                interim_metrics=True, budget=budget
-            )  # array of metric history arrays
+            # get transformed hparams of all finalized trials
+            hparams_transform = self._get_transformed_hparams(budget)
 
-            # get indices of hparams/metrics to be used for each trial
-            interim_result_indices = np.array(
-                [
-                    self.get_interim_result_idx(
-                        metric_history, interim_results_interval
-                    )
-                    for metric_history in metrics
-                ]
-            )  # araay of list. each list represents the indices of the metrics to be used of that trial
-
-            # only use every nth interim result of metric history. specified with interim_result_indices
-            metrics_filtered = np.array(
-                [
-                    metrics[trial_idx][interim_result_indices[trial_idx]]
-                    for trial_idx in range(metrics.shape[0])
-                ]
-            )
-            # flatten results so they can be used for fitting posterior
-            # if arrays in yi_filtered do not have same length, e.g. some trials were early stopped or pruner was activated,
-            # yi_filtered is ragged (yi_filtered.shape = (n_trials,)) and flatten does not work, use np.hstack().
-            # if all trials have been trained on max budget (yi_filtered.shape = (n_trials, n_filtered_results)) use flatten() since it is better for performance.
-            if len(metrics_filtered.shape) == 2:
-                metrics_flat = metrics_filtered.flatten()
-            else:
-                metrics_flat = np.hstack(metrics_filtered)
-
-            # augument hparams with budget, i.e. z_t = [x_t, n_t] for every interim result
-            max_budget = self.get_max_budget()
-            n_hparams = len(self.searchspace.keys())
-            hparams_augumented = np.empty((0, n_hparams + 1))
-            # create one hparam config augumented with the corresponding normalized budget for every interim result
-            # loop through trials
-            for indices, trial_hparams in zip(
-                interim_result_indices, hparams_transform
+            # the augumented hparams and interim metrics of each finalized trial are only computed once
+            hparams_augumented = [np.empty((0, len(self.searchspace.keys()) + 1))]
+            metrics_flat = [np.empty(0)]
+            for trial, trial_hparams in zip(
+                self.final_store.select(budget), hparams_transform
             ):
-                # loop through interim results
-                for idx in indices:
-                    # idx is budget
-                    normalized_budget = self.searchspace._normalize_integer(
-                        [0, max_budget - 1], idx
-                    )
-                    augumented_trial_hparams = np.append(
-                        deepcopy(trial_hparams), normalized_budget
-                    )
-                    hparams_augumented = np.vstack(
-                        (hparams_augumented, augumented_trial_hparams)
+                key = (trial.trial_id, interim_results_interval)
+                if key not in self._interim_XY:
+                    self._interim_XY[key] = self._get_interim_XY(
+                        trial, trial_hparams, interim_results_interval
                     )
+                trial_X, trial_y = self._interim_XY[key]
+                hparams_augumented.append(trial_X)
+                metrics_flat.append(trial_y)
+            hparams_augumented = np.concatenate(hparams_augumented)
+            metrics_flat = np.concatenate(metrics_flat)
 
             # add evaluating trials if impute strategy, i.e. z = [x, max_budget] y = imputed_metric
-            if self.include_busy_locations():
-                # get params and imputed metrics of evaluating trials
-                hparams_busy = self.get_busy_locations(budget=budget)
-                imputed_metrics = self.get_imputed_metrics(budget=budget)
-                assert (
-                    hparams_busy.shape[0] == imputed_metrics.shape[0]
-                ), "Number of evaluating trials and imputed metrics needs to be equal, got n_busy_locations: {}, n_imputed_metrics: {}".format(
-                    hparams_busy.shape[0], imputed_metrics.shape[0]
+            if busy_locations and self.include_busy_locations():
+                # get params augumented with max budget and imputed metrics of evaluating trials
+                hp_aug, imputed_metrics = self.get_busy_XY(
+                    budget=budget, interim_results=True
                 )
 
-                if len(hparams_busy) > 0:
-                    # transform hparams
-                    hp_trans = np.apply_along_axis(
-                        self.searchspace.transform,
-                        1,
-                        hparams_busy,
-                        normalize_categorical=self.normalize_categorical,
-                    )
-                    # augument with max budget (i.e. always 1 in normalized form)
-                    hp_aug = np.append(
-                        hp_trans, np.ones(hp_trans.shape[0]).reshape(-1, 1), 1
-                    )
-
+                if len(hp_aug) > 0:
                     # append to hparams and metrics
                     hparams_augumented = np.concatenate((hparams_augumented, hp_aug))
                     metrics_flat = np.concatenate((metrics_flat, imputed_metrics))
@@ -637,6 +640,35 @@ class BaseAsyncBO(AbstractOptimizer):
 
         return X, y
 
+    def _get_interim_XY(self, trial, trial_hparams, interval=10):
+        """returns the hparams augumented with the budget and the interim metrics of one finalized trial
+
+        :param trial: the finalized trial
+        :type trial: Trial
+        :param trial_hparams: transformed hparams of the trial
+        :type trial_hparams: np.ndarray
+        :param interval: interval of interim metrics to be used, see `get_interim_result_idx()`
+        :type interval: int
+        :return: Tuple of the augumented hparams, shape (n_interim_results, n_hparams + 1), and the interim metrics,
+                 shape (n_interim_results,)
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        metric_history = np.array(trial.metric_history, dtype=float)
+        if self.direction == "max":
+            metric_history = -metric_history
+        indices = self.get_interim_result_idx(metric_history, interval)
+
+        # augument hparams with budget, i.e. z_t = [x_t, n_t] for every interim result
+        max_budget = self.get_max_budget()
+        normalized_budgets = [
+            self.searchspace._normalize_integer([0, max_budget - 1], idx)
+            for idx in indices
+        ]
+        trial_X = np.column_stack(
+            (np.tile(trial_hparams, (len(indices), 1)), normalized_budgets)
+        )
+        return trial_X, metric_history[indices]
+
     def get_interim_result_idx(self, metric_history, interval=10):
         """helper function for creating hparams with interim results
 
@@ -14,6 +14,9 @@
 #   limitations under the License.
 #
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from scipy.optimize import fmin_l_bfgs_b
 
@@ -23,6 +26,8 @@ from skopt.learning.gaussian_process.kernels import Matern
 from sklearn.base import clone
 
 from maggy.optimizer.bayes.base import BaseAsyncBO
+from maggy.optimizer.bayes.incremental_gp import IncrementalGaussianProcess
+from maggy.optimizer.bayes.sparse_gp import SparseGaussianProcess
 from maggy.optimizer.bayes.acquisitions import (
     GaussianProcess_EI,
     GaussianProcess_LCB,
@@ -42,6 +47,10 @@ class GP(BaseAsyncBO):
         acq_fun_kwargs=None,
         acq_optimizer="lbfgs",
         acq_optimizer_kwargs=None,
+        incremental_update=False,
+        refit_interval=10,
+        surrogate="auto",
+        surrogate_kwargs=None,
         **kwargs
     ):
         """
@@ -94,7 +103,34 @@ class GP(BaseAsyncBO):
                                    points to find local minima.
                                 - The optimal of these local minima is used to update the prior.
         :param acq_optimizer_kwargs: Additional arguments to be passed to the acquisition optimizer.
+                                     - `n_points`: number of randomly sampled points
+                                     - `n_restarts_optimizer`: number of starting points of `"lbfgs"`
+                                     - `n_jobs`: number of threads the `"lbfgs"` restarts and the evaluation of
+                                       the sampled points are split across, -1 for the number of CPUs, default 1.
+                                       The surrogate models release the GIL in their linear algebra.
         :type acq_optimizer_kwargs: dict
+        :param incremental_update: If True, the model is updated with new observations instead of being refit,
+                                   see `IncrementalGaussianProcess`. The kernel hyperparameters are only optimized
+                                   again every `refit_interval` observations and liars of busy locations are replaced
+                                   without refitting.
+        :type incremental_update: bool
+        :param refit_interval: Number of new observations after which the kernel hyperparameters are optimized again,
+                               if `incremental_update` is True.
+        :type refit_interval: int
+        :param surrogate: Surrogate model to use.
+                          - `"exact"`: exact gaussian process
+                          - `"sparse"`: gaussian process approximated with inducing points, see
+                            `SparseGaussianProcess`. Scales linearly with the number of observations, e.g. for many
+                            interim results. The kernel hyperparameters are optimized on a subsample.
+                          - `"auto"`: `"sparse"` for more than `threshold` observations, else `"exact"`
+        :type surrogate: str
+        :param surrogate_kwargs: Additional arguments for the surrogate model
+                                 - `threshold`: number of observations above which `"auto"` switches to
+                                   `"sparse"`, default 2000
+                                 - `n_inducing`: number of inducing points, default 300
+                                 - `max_fit_samples`: max size of the subsample to optimize the kernel
+                                   hyperparameters of `"sparse"` on, default 1000
+        :type surrogate_kwargs: dict
         """
         super().__init__(**kwargs)
 
@@ -161,6 +197,16 @@ class GP(BaseAsyncBO):
         else:
             self.n_points = acq_optimizer_kwargs.get("n_points", 10000)
         self.n_restarts_optimizer = acq_optimizer_kwargs.get("n_restarts_optimizer", 5)
+        n_jobs = acq_optimizer_kwargs.get("n_jobs", 1)
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs < 1:
+            raise ValueError(
+                "expected n_jobs to be a positive integer or -1, got {}".format(n_jobs)
+            )
+        self.n_jobs = n_jobs
+        # thread pool of the acquisition optimization, created with the first suggestion
+        self._executor = None
         self.acq_optimizer_kwargs = acq_optimizer_kwargs
 
         # configure impute strategy
@@ -177,37 +223,63 @@ class GP(BaseAsyncBO):
         # estimator that has not been fit on any data.
         self.base_model = None
 
+        # incremental model updates
+        if refit_interval < 1:
+            raise ValueError(
+                "expected refit_interval to be a positive integer, got {}".format(
+                    refit_interval
+                )
+            )
+        self.incremental_update = incremental_update
+        self.refit_interval = refit_interval
+
+        # configure surrogate
+        allowed_surrogates = ["exact", "sparse", "auto"]
+        if surrogate not in allowed_surrogates:
+            raise ValueError(
+                "expected surrogate to be in {}, got {}".format(
+                    allowed_surrogates, surrogate
+                )
+            )
+        self.surrogate = surrogate
+        if surrogate_kwargs is None:
+            surrogate_kwargs = dict()
+        self.sparse_threshold = surrogate_kwargs.get("threshold", 2000)
+        self.n_inducing = surrogate_kwargs.get("n_inducing", 300)
+        self.sparse_max_fit_samples = surrogate_kwargs.get("max_fit_samples", 1000)
+        # number of observations of the last hyperparameter optimization per budget
+        self.refit_sizes = {}
+
         if self.async_strategy == "impute":
             self._log("Impute Strategy: {}".format(self.impute_strategy))
 
     def sampling_routine(self, budget=0):
         # even with BFGS as optimizer we want to sample a large number
         # of points and then pick the best ones as starting points
-        random_hparams = self.searchspace.get_random_parameter_values(self.n_points)
-        random_hparams_list = np.array(
-            [self.searchspace.dict_to_list(hparams) for hparams in random_hparams]
+        # sample transformed configs directly
+        X = self.searchspace.get_random_parameter_array(
+            self.n_points, transformed=True, normalize_categorical=True
         )
         y_opt = self.ybest(budget)
 
-        # transform configs
-        X = np.apply_along_axis(
-            self.searchspace.transform,
-            1,
-            random_hparams_list,
-            normalize_categorical=True,
-        )
-
         if self.interim_results:
             # Always sample with max budget: xt ← argmax acq([x, N])
             # normalized max budget is 1 → add 1 to hparam configs
             X = np.append(X, np.ones(X.shape[0]).reshape(-1, 1), 1)
 
-        values = self.acq_fun.evaluate(
-            X=X,
-            surrogate_model=self.models[budget],
-            y_opt=y_opt,
-            acq_func_kwargs=self.acq_func_kwargs,
-        )
+        def evaluate(X):
+            return self.acq_fun.evaluate(
+                X=X,
+                surrogate_model=self.models[budget],
+                y_opt=y_opt,
+                acq_func_kwargs=self.acq_func_kwargs,
+            )
+
+        if self.async_strategy == "asy_ts":
+            # thompson sample is drawn jointly for all points
+            values = evaluate(X)
+        else:
+            values = np.concatenate(self._map(evaluate, np.array_split(X, self.n_jobs)))
 
         # Find the minimum of the acquisition function by randomly
         # sampling points from the space
@@ -218,28 +290,24 @@ class GP(BaseAsyncBO):
         # minimization starts from `n_restarts_optimizer` different
         # points and the best minimum is
         elif self.acq_optimizer == "lbfgs":
-            # in asynchronous ts the acquisition function is not returning the gradient, hence we need to approximate
-            approx_grad = True if self.async_strategy == "asy_ts" else False
-
             x0 = X[np.argsort(values)[: self.n_restarts_optimizer]]
 
-            results = []
             # bounds of transformed hparams are always [0.0,1.0] ( if categorical encodings get normalized,
             # which is the case here )
             bounds = [(0.0, 1.0) for _ in self.searchspace.values()]
             if self.interim_results:
                 bounds.append((0.0, 1.0))
-            for x in x0:
-                # todo evtl. use Parallel / delayed like skopt
-                result = fmin_l_bfgs_b(
+
+            def minimize(x):
+                return fmin_l_bfgs_b(
                     func=self.acq_fun.evaluate_1_d,
                     x0=x,
-                    args=(self.models[budget], y_opt, self.acq_func_kwargs,),
+                    args=(self.models[budget], y_opt, self.acq_func_kwargs),
                     bounds=bounds,
-                    approx_grad=approx_grad,
                     maxiter=20,
                 )
-                results.append(result)
+
+            results = self._map(minimize, x0)
 
             cand_xs = np.array([r[0] for r in results])
             cand_acqs = np.array([r[1] for r in results])
@@ -259,6 +327,25 @@ class GP(BaseAsyncBO):
 
         return hparam_dict
 
+    def _map(self, fn, iterable):
+        """applies `fn` to the items of `iterable` in the thread pool of `n_jobs` threads
+
+        :return: results in the order of `iterable`
+        :rtype: list
+        """
+        if self.n_jobs == 1:
+            return [fn(item) for item in iterable]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.n_jobs, thread_name_prefix="gp-acq"
+            )
+        return list(self._executor.map(fn, iterable))
+
+    def finalize_experiment(self, trials):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
     def init_model(self):
         """initializes the surrogate model of the gaussian process
 
@@ -305,16 +392,40 @@ class GP(BaseAsyncBO):
             )
             return
 
-        # create model without any data
-        model = clone(self.base_model)
+        # liars are imputed with the model so far, e.g. for `kb`
+        X_busy, y_busy = None, None
+        if self.include_busy_locations():
+            X_busy, y_busy = self.get_busy_XY(
+                budget=budget, interim_results=self.interim_results
+            )
 
         Xi, yi = self.get_XY(
             budget=budget,
             interim_results=self.interim_results,
             interim_results_interval=self.interim_results_interval,
+            busy_locations=False,
         )
 
-        # fit model with data
+        if self.surrogate == "sparse" or (
+            self.surrogate == "auto" and len(Xi) > self.sparse_threshold
+        ):
+            self._update_incremental_model(
+                budget, SparseGaussianProcess, Xi, yi, X_busy, y_busy
+            )
+            return
+        if self.incremental_update:
+            self._update_incremental_model(
+                budget, IncrementalGaussianProcess, Xi, yi, X_busy, y_busy
+            )
+            return
+
+        # create model without any data
+        model = clone(self.base_model)
+
+        # fit model with observations and liars
+        if X_busy is not None:
+            Xi = np.concatenate((Xi, X_busy))
+            yi = np.concatenate((yi, y_busy))
         model.fit(Xi, yi)
 
         self._log("fitted model with data")
@@ -322,6 +433,67 @@ class GP(BaseAsyncBO):
         # update model of budget
         self.models[budget] = model
 
+    def _update_incremental_model(self, budget, model_class, Xi, yi, X_busy, y_busy):
+        """update the incremental surrogate model of `budget` with the observations since the last update
+
+        The kernel hyperparameters are optimized on the observations of finished trials every `refit_interval`
+        observations if `incremental_update`, else every update. In between the model gets updated with the new
+        observations. The liars of busy locations are replaced afterwards.
+
+        :param model_class: `IncrementalGaussianProcess` or `SparseGaussianProcess`
+        :type model_class: type
+        :param Xi: transformed hparams of the observations, in the same order as in previous updates
+        :type Xi: np.ndarray
+        :param yi: metrics of the observations
+        :type yi: np.ndarray
+        :param X_busy: transformed hparams of the busy locations if async strategy is `impute`
+        :type X_busy: np.ndarray|None
+        :param y_busy: imputed metrics of the busy locations
+        :type y_busy: np.ndarray|None
+        """
+        model = self.models.get(budget)
+        if (
+            not isinstance(model, model_class)
+            or not self.incremental_update
+            or len(Xi) < model.n_observations
+            or len(Xi) - self.refit_sizes[budget] >= self.refit_interval
+        ):
+            # optimize kernel hyperparameters
+            regressor = clone(self.base_model)
+            if model_class is SparseGaussianProcess:
+                # on a subsample, the exact GP is too expensive for all observations
+                idx = np.random.permutation(len(Xi))[: self.sparse_max_fit_samples]
+                regressor.fit(Xi[idx], yi[idx])
+                model = SparseGaussianProcess.from_regressor(
+                    regressor, inducing_points=Xi[idx[: self.n_inducing]]
+                )
+            else:
+                regressor.fit(Xi, yi)
+                model = IncrementalGaussianProcess.from_regressor(regressor)
+            model.fit(Xi, yi)
+            self.refit_sizes[budget] = len(Xi)
+            self._log(
+                "fitted {} with data, kernel: {}".format(
+                    model_class.__name__, regressor.kernel_
+                )
+            )
+        else:
+            try:
+                model.add(Xi[model.n_observations :], yi[model.n_observations :])
+            except np.linalg.LinAlgError:
+                # new factorization with the same hyperparameters
+                model.fit(Xi, yi)
+            self._log("updated model with {} observations".format(len(Xi)))
+
+        if X_busy is not None:
+            try:
+                model.set_liars(X_busy, y_busy)
+            except np.linalg.LinAlgError:
+                self._log("could not add busy locations to model, skip them")
+
+        # update model of budget
+        self.models[budget] = model
+
     def impute_metric(self, hparams, budget=0):
         """calculates the value of the imputed metric for hparams of a currently evaluating trial.
 
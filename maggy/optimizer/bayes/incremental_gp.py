@@ -0,0 +1,252 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from sklearn.utils import check_random_state
+
+
+class IncrementalGaussianProcess(object):
+    """Gaussian process posterior with fixed kernel hyperparameters which is
+    updated with new observations instead of being refit.
+
+    Keeps the Cholesky factor of the kernel matrix of the observations and
+    extends it by the rows of new observations, which costs O(n^2) per
+    observation instead of O(n^3) for a new factorization.
+
+    Imputed observations of evaluating trials (liars) are kept as a separate
+    layer after the real observations: replacing them truncates the factor to
+    the real observations and extends it by the new liars.
+
+    The kernel hyperparameters are taken from a fitted
+    `GaussianProcessRegressor`, see `from_regressor()`. Implements the parts of
+    its interface used by the acquisition functions: `predict()` and
+    `sample_y()`.
+    """
+
+    def __init__(self, kernel, noise=None, alpha=1e-10, normalize_y=True):
+        """
+        :param kernel: Fitted kernel without the noise term.
+        :type kernel: sklearn.gaussian_process.kernels.Kernel
+        :param noise: Variance of the gaussian noise of the observations.
+        :type noise: float|None
+        :param alpha: Value added to the diagonal of the kernel matrix.
+        :type alpha: float
+        :param normalize_y: If True, the mean of the metrics is subtracted and they are divided by their standard
+                            deviation before fitting.
+        :type normalize_y: bool
+        """
+        self.kernel_ = kernel
+        self.noise = noise
+        self.alpha = alpha
+        self.normalize_y = normalize_y
+
+        self.X_train_ = None
+        self.y_train_ = None
+        self.L_ = None
+        self.alpha_ = None
+        self.y_train_mean_ = 0.0
+        self.y_train_std_ = 1.0
+        # number of real observations, the liars follow them
+        self.n_observations = 0
+
+    @classmethod
+    def from_regressor(cls, regressor):
+        """Creates an incremental GP with the hyperparameters of a fitted regressor.
+
+        :param regressor: Fitted gaussian process.
+        :type regressor: skopt.learning.GaussianProcessRegressor
+        :rtype: IncrementalGaussianProcess
+        """
+        return cls(
+            kernel=regressor.kernel_,
+            noise=getattr(regressor, "noise_", None),
+            alpha=regressor.alpha,
+            normalize_y=regressor.normalize_y,
+        )
+
+    def fit(self, X, y):
+        """Fits the posterior to the observations `X`, `y`, dropping previous observations and liars.
+
+        :param X: transformed hparams, shape (n_observations, n_dims)
+        :type X: np.ndarray
+        :param y: metrics, shape (n_observations,)
+        :type y: np.ndarray
+        :return: self
+        """
+        X = np.asarray(X, dtype=float)
+        self.X_train_ = X
+        self.y_train_ = np.asarray(y, dtype=float)
+        self.L_ = cholesky(self._kernel_matrix(X), lower=True)
+        self.n_observations = len(X)
+        self._solve()
+        return self
+
+    def add(self, X, y):
+        """Adds new observations, extending the Cholesky factor by their rows. Drops the liars.
+
+        :param X: transformed hparams of the new observations, shape (n_new, n_dims)
+        :type X: np.ndarray
+        :param y: metrics of the new observations, shape (n_new,)
+        :type y: np.ndarray
+        :return: self
+        """
+        self._truncate(self.n_observations)
+        try:
+            self._extend(X, y)
+        finally:
+            # without the liars if the factor can't be extended
+            self.n_observations = len(self.X_train_)
+            self._solve()
+        return self
+
+    def set_liars(self, X, y):
+        """Replaces the imputed observations of the evaluating trials.
+
+        :param X: transformed hparams of the evaluating trials, shape (n_busy, n_dims)
+        :type X: np.ndarray
+        :param y: imputed metrics, shape (n_busy,)
+        :type y: np.ndarray
+        :return: self
+        """
+        self._truncate(self.n_observations)
+        try:
+            self._extend(X, y)
+        finally:
+            self._solve()
+        return self
+
+    def _kernel_matrix(self, X):
+        K = self.kernel_(X)
+        K[np.diag_indices_from(K)] += self.alpha + (self.noise or 0.0)
+        return K
+
+    def _truncate(self, n):
+        self.X_train_ = self.X_train_[:n]
+        self.y_train_ = self.y_train_[:n]
+        self.L_ = self.L_[:n, :n]
+
+    def _extend(self, X, y):
+        X = np.asarray(X, dtype=float).reshape(-1, self.X_train_.shape[1])
+        if len(X) == 0:
+            return
+        # block Cholesky: [[L, 0], [B, C]] with L B^T = K(X_train, X) and
+        # C C^T = K(X, X) - B B^T
+        B = solve_triangular(
+            self.L_, self.kernel_(self.X_train_, X), lower=True, check_finite=False
+        ).T
+        C = cholesky(self._kernel_matrix(X) - B.dot(B.T), lower=True)
+        n, m = len(self.L_), len(X)
+        L = np.zeros((n + m, n + m))
+        L[:n, :n] = self.L_
+        L[n:, :n] = B
+        L[n:, n:] = C
+        self.L_ = L
+        self.X_train_ = np.vstack((self.X_train_, X))
+        self.y_train_ = np.concatenate((self.y_train_, np.asarray(y, dtype=float)))
+
+    def _solve(self):
+        if self.normalize_y and len(self.y_train_) > 0:
+            self.y_train_mean_ = np.mean(self.y_train_)
+            self.y_train_std_ = np.std(self.y_train_)
+            if self.y_train_std_ == 0:
+                self.y_train_std_ = 1.0
+        y = (self.y_train_ - self.y_train_mean_) / self.y_train_std_
+        self.alpha_ = cho_solve((self.L_, True), y, check_finite=False)
+
+    def predict(
+        self,
+        X,
+        return_std=False,
+        return_cov=False,
+        return_mean_grad=False,
+        return_std_grad=False,
+    ):
+        """Predicts the metrics at `X`, see `skopt.learning.GaussianProcessRegressor.predict()`.
+
+        :param X: transformed hparams, shape (n_samples, n_dims)
+        :type X: np.ndarray
+        :param return_std: If True, also return the standard deviation of the predictions.
+        :type return_std: bool
+        :param return_cov: If True, also return the covariance of the predictions.
+        :type return_cov: bool
+        :param return_mean_grad: If True, also return the gradient of the mean. Only for a single sample.
+        :type return_mean_grad: bool
+        :param return_std_grad: If True, also return the gradient of the standard deviation. Only for a single sample.
+        :type return_std_grad: bool
+        :return: mean and the requested statistics
+        :rtype: np.ndarray|tuple
+        """
+        if return_std and return_cov:
+            raise RuntimeError(
+                "Not returning standard deviation of predictions when "
+                "returning full covariance."
+            )
+        if return_std_grad and not return_std:
+            raise ValueError("Not returning std_gradient without returning the std.")
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if X.shape[0] != 1 and (return_mean_grad or return_std_grad):
+            raise ValueError("Not implemented for n_samples > 1")
+
+        K_trans = self.kernel_(X, self.X_train_)
+        y_mean = K_trans.dot(self.alpha_) * self.y_train_std_ + self.y_train_mean_
+
+        if return_cov:
+            v = solve_triangular(self.L_, K_trans.T, lower=True, check_finite=False)
+            y_cov = (self.kernel_(X) - v.T.dot(v)) * self.y_train_std_**2
+            return y_mean, y_cov
+
+        if not return_std:
+            if return_mean_grad:
+                return y_mean, self._mean_grad(X)
+            return y_mean
+
+        v = solve_triangular(self.L_, K_trans.T, lower=True, check_finite=False)
+        y_var = np.maximum(self.kernel_.diag(X) - np.einsum("ij,ij->j", v, v), 0.0)
+        y_std = np.sqrt(y_var)
+        if not return_mean_grad:
+            return y_mean, y_std * self.y_train_std_
+
+        grad_mean = self._mean_grad(X)
+        if not return_std_grad:
+            return y_mean, y_std * self.y_train_std_, grad_mean
+
+        grad_std = np.zeros(X.shape[1])
+        if not np.allclose(y_std, 0.0):
+            grad = self.kernel_.gradient_x(X[0], self.X_train_)
+            K_inv_k = cho_solve((self.L_, True), K_trans.T, check_finite=False)
+            grad_std = -K_inv_k.T.dot(grad)[0] / y_std[0] * self.y_train_std_
+        return y_mean, y_std * self.y_train_std_, grad_mean, grad_std
+
+    def _mean_grad(self, X):
+        grad = self.kernel_.gradient_x(X[0], self.X_train_)
+        return grad.T.dot(self.alpha_) * self.y_train_std_
+
+    def sample_y(self, X, n_samples=1, random_state=0):
+        """Draws samples from the posterior at `X`, see `sklearn.gaussian_process.GaussianProcessRegressor.sample_y()`.
+
+        :param X: transformed hparams, shape (n_samples_X, n_dims)
+        :type X: np.ndarray
+        :param n_samples: number of samples drawn at each point
+        :type n_samples: int
+        :param random_state: seed or random state
+        :type random_state: int|np.random.RandomState|None
+        :return: samples, shape (n_samples_X, n_samples)
+        :rtype: np.ndarray
+        """
+        rng = check_random_state(random_state)
+        y_mean, y_cov = self.predict(X, return_cov=True)
+        return rng.multivariate_normal(y_mean, y_cov, n_samples).T
@@ -0,0 +1,194 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+from scipy import optimize
+
+
+class KernelDensity(object):
+    """Product kernel density estimator for mixed continuous and categorical data.
+
+    Same estimator as `statsmodels.nonparametric.KDEMultivariate` with `var_type` of `"c"` and `"u"` variables:
+    a gaussian kernel for continuous variables and an Aitchison-Aitken kernel for unordered categorical variables,
+    with the bandwidth selection methods
+
+    - `"normal_reference"`: normal reference rule of thumb
+    - `"cv_ml"`: cross validation maximum likelihood, starting from the normal reference
+    - `"cv_ls"`: cross validation least squares, starting from the normal reference
+
+    Unlike statsmodels, `pdf()` evaluates all points at once and the kernel matrices of the cross validation are
+    computed in one go. Observations can be added with `add()`: the normal reference is updated from running moments
+    and the cross validation restarts from the current bandwidth.
+    """
+
+    BW_METHODS = ["normal_reference", "cv_ml", "cv_ls"]
+
+    # max number of (point, observation) pairs evaluated at once in `pdf()`
+    CHUNK_SIZE = 2 ** 20
+
+    def __init__(self, data, var_type, bw="normal_reference", num_levels=None):
+        """
+        :param data: observations, shape (n_observations, n_vars). Categorical variables are encoded as integers.
+        :type data: np.ndarray
+        :param var_type: type of each variable, `"c"` for continuous and `"u"` for unordered categorical, e.g.
+                         `"ccu"`
+        :type var_type: str
+        :param bw: bandwidth selection method, see class docstring, or the bandwidth per variable.
+        :type bw: str|np.ndarray
+        :param num_levels: number of categories per variable, ignored for continuous variables. If None, the number
+                           of distinct values in the data like statsmodels, which is undefined for a single value.
+        :type num_levels: list|None
+        """
+        self.var_type = var_type
+        self.k_vars = len(var_type)
+        if set(var_type) - {"c", "u"}:
+            raise ValueError(
+                "Expected var_type to consist of 'c' and 'u', got {}".format(var_type)
+            )
+        if isinstance(bw, str) and bw not in KernelDensity.BW_METHODS:
+            raise ValueError(
+                "Expected bw to be in {} or an array, got {}".format(
+                    KernelDensity.BW_METHODS, bw
+                )
+            )
+        self.data = np.asarray(data, dtype=float).reshape(-1, self.k_vars)
+        self.nobs = len(self.data)
+        if self.nobs <= self.k_vars:
+            raise ValueError(
+                "The number of observations must be larger than the number of variables."
+            )
+
+        self._continuous = np.array([t == "c" for t in var_type])
+        if num_levels is None:
+            num_levels = [len(np.unique(column)) for column in self.data.T]
+        self.num_levels = np.array(
+            [n if t == "u" else 0 for n, t in zip(num_levels, var_type)], dtype=float
+        )
+
+        # running moments for the normal reference
+        self._sum = self.data.sum(axis=0)
+        self._sum_sq = (self.data ** 2).sum(axis=0)
+
+        self._bw_method = bw if isinstance(bw, str) else "user-specified"
+        if isinstance(bw, str):
+            self.bw = self._compute_bw(self._normal_reference())
+        else:
+            self.bw = np.asarray(bw, dtype=float)
+
+    def add(self, data):
+        """Adds observations and updates the bandwidth.
+
+        :param data: new observations, shape (n_new, n_vars)
+        :type data: np.ndarray
+        :return: self
+        """
+        data = np.asarray(data, dtype=float).reshape(-1, self.k_vars)
+        self.data = np.vstack((self.data, data))
+        self.nobs = len(self.data)
+        self._sum += data.sum(axis=0)
+        self._sum_sq += (data ** 2).sum(axis=0)
+        if self._bw_method == "normal_reference":
+            self.bw = self._normal_reference()
+        elif self._bw_method != "user-specified":
+            # warm start from the current bandwidth
+            self.bw = self._compute_bw(self.bw)
+        return self
+
+    def _normal_reference(self):
+        mean = self._sum / self.nobs
+        std = np.sqrt(np.maximum(self._sum_sq / self.nobs - mean ** 2, 0.0))
+        return 1.06 * std * self.nobs ** (-1.0 / (4 + self.k_vars))
+
+    def _compute_bw(self, bw0):
+        if self._bw_method == "normal_reference":
+            return bw0
+        objective = self._loo_likelihood if self._bw_method == "cv_ml" else self._imse
+        bw = optimize.fmin(
+            objective, x0=bw0, maxiter=1e3, maxfun=1e3, disp=0, xtol=1e-3
+        )
+        # bound bw like statsmodels
+        bw[bw < 0] = 1e-10
+        bw[~self._continuous] = np.minimum(bw[~self._continuous], 1.0)
+        return bw
+
+    def _kernels(self, bw, X, data, convolution=False):
+        """Returns the product kernel between the rows of `X` and `data` divided by the continuous bandwidths,
+        shape (len(X), len(data))."""
+        # gaussian kernels of all continuous variables from the squared scaled distances, the convolution kernel
+        # is a gaussian with twice the variance
+        scale = 4.0 if convolution else 2.0
+        h = bw[self._continuous]
+        A = X[:, self._continuous] / h
+        B = data[:, self._continuous] / h
+        D = (
+            (A ** 2).sum(axis=1)[:, np.newaxis]
+            + (B ** 2).sum(axis=1)[np.newaxis, :]
+            - 2 * A.dot(B.T)
+        )
+        K = np.exp(-np.maximum(D, 0.0) / scale) / (
+            np.sqrt(scale * np.pi) ** len(h) * np.prod(h)
+        )
+
+        for i in np.flatnonzero(~self._continuous):
+            if self.num_levels[i] <= 1:
+                # a single category, the kernel is constant 1
+                continue
+            h = bw[i]
+            same = X[:, i, np.newaxis] == data[np.newaxis, :, i]
+            other = h / (self.num_levels[i] - 1)
+            if convolution:
+                # sum over the categories of the kernels of both values
+                n_other = self.num_levels[i] - 2
+                K *= np.where(
+                    same,
+                    (1 - h) ** 2 + (n_other + 1) * other ** 2,
+                    2 * (1 - h) * other + n_other * other ** 2,
+                )
+            else:
+                K *= np.where(same, 1 - h, other)
+        return K
+
+    def _loo_likelihood(self, bw):
+        # negative leave-one-out log likelihood, up to a constant
+        K = self._kernels(bw, self.data, self.data)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # like statsmodels, negative bandwidths during the optimization give nan
+            return -np.log(K.sum(axis=1) - np.diag(K)).sum()
+
+    def _imse(self, bw):
+        # cross validation least squares objective
+        K = self._kernels(bw, self.data, self.data)
+        K_conv = self._kernels(bw, self.data, self.data, convolution=True)
+        loo = K.sum() - np.trace(K)
+        return K_conv.sum() / self.nobs ** 2 - 2 * loo / (self.nobs * (self.nobs - 1))
+
+    def pdf(self, X):
+        """Evaluates the probability density function.
+
+        :param X: points, shape (n_points, n_vars)
+        :type X: np.ndarray
+        :return: densities, shape (n_points,)
+        :rtype: np.ndarray
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, self.k_vars)
+        chunk = max(1, KernelDensity.CHUNK_SIZE // self.nobs)
+        return np.concatenate(
+            [
+                self._kernels(self.bw, X[start : start + chunk], self.data).mean(axis=1)
+                for start in range(0, len(X), chunk)
+            ]
+            or [np.empty(0)]
+        )
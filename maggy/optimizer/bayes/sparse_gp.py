@@ -0,0 +1,273 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, cholesky, solve_triangular
+from sklearn.utils import check_random_state
+
+
+class SparseGaussianProcess(object):
+    """Gaussian process approximated with inducing points for many
+    observations.
+
+    The observations only enter through the kernel between them and m
+    inducing points (deterministic training conditional, Quinonero-Candela and
+    Rasmussen, 2005), so the GP becomes a Bayesian linear regression on m
+    features. Fitting costs O(n * m^2) for n observations instead of O(n^3),
+    predicting O(m^2) per point instead of O(n^2).
+
+    Like `IncrementalGaussianProcess`, the observations are kept as
+    sufficient statistics which new observations are added to, and imputed
+    observations of evaluating trials (liars) as a separate layer which can be
+    replaced.
+
+    The kernel hyperparameters are taken from a fitted
+    `GaussianProcessRegressor`, see `from_regressor()`. Implements the parts of
+    its interface used by the acquisition functions: `predict()` and
+    `sample_y()`.
+    """
+
+    def __init__(
+        self, kernel, inducing_points, noise=None, alpha=1e-10, normalize_y=True
+    ):
+        """
+        :param kernel: Fitted stationary kernel without the noise term.
+        :type kernel: sklearn.gaussian_process.kernels.Kernel
+        :param inducing_points: transformed hparams the observations are projected on, shape (n_inducing, n_dims)
+        :type inducing_points: np.ndarray
+        :param noise: Variance of the gaussian noise of the observations.
+        :type noise: float|None
+        :param alpha: Value added to the noise variance.
+        :type alpha: float
+        :param normalize_y: If True, the mean of the metrics is subtracted and they are divided by their standard
+                            deviation before fitting.
+        :type normalize_y: bool
+        """
+        self.kernel_ = kernel
+        self.inducing_points = np.unique(
+            np.asarray(inducing_points, dtype=float), axis=0
+        )
+        self.noise_variance = (noise or 0.0) + alpha
+        self.normalize_y = normalize_y
+
+        # whitening of the features, jitter relative to the kernel variance
+        K = self.kernel_(self.inducing_points)
+        K[np.diag_indices_from(K)] += 1e-8 * np.mean(np.diag(K))
+        self.L_ = cholesky(K, lower=True)
+
+        self.n_observations = 0
+        # sufficient statistics of the observations and of the liars:
+        # [Phi^T Phi, Phi^T y, Phi^T 1, n, sum(y), sum(y^2)]
+        self._observations = self._statistics(self.inducing_points[:0], np.empty(0))
+        self._liars = self._observations
+
+        self.weights_ = None
+        self.y_train_mean_ = 0.0
+        self.y_train_std_ = 1.0
+
+    @classmethod
+    def from_regressor(cls, regressor, inducing_points):
+        """Creates a sparse GP with the hyperparameters of a fitted regressor.
+
+        :param regressor: Fitted gaussian process.
+        :type regressor: skopt.learning.GaussianProcessRegressor
+        :param inducing_points: transformed hparams the observations are projected on, shape (n_inducing, n_dims)
+        :type inducing_points: np.ndarray
+        :rtype: SparseGaussianProcess
+        """
+        return cls(
+            kernel=regressor.kernel_,
+            inducing_points=inducing_points,
+            noise=getattr(regressor, "noise_", None),
+            alpha=regressor.alpha,
+            normalize_y=regressor.normalize_y,
+        )
+
+    def features(self, X):
+        """Returns the whitened kernel between `X` and the inducing points, shape (n_samples, n_inducing)."""
+        return solve_triangular(
+            self.L_,
+            self.kernel_(self.inducing_points, np.asarray(X, dtype=float)),
+            lower=True,
+            check_finite=False,
+        ).T
+
+    def _statistics(self, X, y):
+        Phi = self.features(X)
+        y = np.asarray(y, dtype=float)
+        return [
+            Phi.T.dot(Phi),
+            Phi.T.dot(y),
+            Phi.sum(axis=0),
+            len(y),
+            y.sum(),
+            y.dot(y),
+        ]
+
+    def fit(self, X, y):
+        """Fits the posterior to the observations `X`, `y`, dropping previous observations and liars.
+
+        :param X: transformed hparams, shape (n_observations, n_dims)
+        :type X: np.ndarray
+        :param y: metrics, shape (n_observations,)
+        :type y: np.ndarray
+        :return: self
+        """
+        self._observations = self._statistics(X, y)
+        self._liars = self._statistics(X[:0], y[:0])
+        self.n_observations = len(y)
+        self._solve()
+        return self
+
+    def add(self, X, y):
+        """Adds new observations. Drops the liars.
+
+        :param X: transformed hparams of the new observations, shape (n_new, n_dims)
+        :type X: np.ndarray
+        :param y: metrics of the new observations, shape (n_new,)
+        :type y: np.ndarray
+        :return: self
+        """
+        new = self._statistics(X, y)
+        self._observations = [a + b for a, b in zip(self._observations, new)]
+        self._liars = self._statistics(X[:0], y[:0])
+        self.n_observations = self._observations[3]
+        self._solve()
+        return self
+
+    def set_liars(self, X, y):
+        """Replaces the imputed observations of the evaluating trials.
+
+        :param X: transformed hparams of the evaluating trials, shape (n_busy, n_dims)
+        :type X: np.ndarray
+        :param y: imputed metrics, shape (n_busy,)
+        :type y: np.ndarray
+        :return: self
+        """
+        self._liars = self._statistics(X, y)
+        self._solve()
+        return self
+
+    def _solve(self):
+        PhiPhi, Phiy, Phi1, n, sum_y, sum_y2 = [
+            a + b for a, b in zip(self._observations, self._liars)
+        ]
+        if self.normalize_y and n > 0:
+            self.y_train_mean_ = sum_y / n
+            self.y_train_std_ = np.sqrt(max(sum_y2 / n - self.y_train_mean_**2, 0.0))
+            if self.y_train_std_ == 0:
+                self.y_train_std_ = 1.0
+        # Phi^T of the normalized metrics
+        Phiy = (Phiy - self.y_train_mean_ * Phi1) / self.y_train_std_
+        # posterior of the whitened weights with prior N(0, I)
+        A = PhiPhi / self.noise_variance
+        A[np.diag_indices_from(A)] += 1.0
+        self._A_factor = cho_factor(A, lower=True)
+        self.weights_ = cho_solve(self._A_factor, Phiy / self.noise_variance)
+
+    def predict(
+        self,
+        X,
+        return_std=False,
+        return_cov=False,
+        return_mean_grad=False,
+        return_std_grad=False,
+    ):
+        """Predicts the metrics at `X`, see `skopt.learning.GaussianProcessRegressor.predict()`.
+
+        :param X: transformed hparams, shape (n_samples, n_dims)
+        :type X: np.ndarray
+        :param return_std: If True, also return the standard deviation of the predictions.
+        :type return_std: bool
+        :param return_cov: If True, also return the covariance of the predictions.
+        :type return_cov: bool
+        :param return_mean_grad: If True, also return the gradient of the mean. Only for a single sample.
+        :type return_mean_grad: bool
+        :param return_std_grad: If True, also return the gradient of the standard deviation. Only for a single sample.
+        :type return_std_grad: bool
+        :return: mean and the requested statistics
+        :rtype: np.ndarray|tuple
+        """
+        if return_std and return_cov:
+            raise RuntimeError(
+                "Not returning standard deviation of predictions when "
+                "returning full covariance."
+            )
+        if return_std_grad and not return_std:
+            raise ValueError("Not returning std_gradient without returning the std.")
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if X.shape[0] != 1 and (return_mean_grad or return_std_grad):
+            raise ValueError("Not implemented for n_samples > 1")
+
+        Phi = self.features(X)
+        y_mean = Phi.dot(self.weights_) * self.y_train_std_ + self.y_train_mean_
+
+        if return_cov:
+            # prior covariance not explained by the inducing points is kept
+            A_inv_Phi = cho_solve(self._A_factor, Phi.T)
+            y_cov = self.kernel_(X) - Phi.dot(Phi.T) + Phi.dot(A_inv_Phi)
+            return y_mean, y_cov * self.y_train_std_**2
+
+        if return_mean_grad:
+            # gradient of the features, shape (n_inducing, n_dims)
+            Phi_grad = solve_triangular(
+                self.L_,
+                self.kernel_.gradient_x(X[0], self.inducing_points),
+                lower=True,
+                check_finite=False,
+            )
+            grad_mean = self.weights_.dot(Phi_grad) * self.y_train_std_
+
+        if not return_std:
+            if return_mean_grad:
+                return y_mean, grad_mean
+            return y_mean
+
+        A_inv_Phi = cho_solve(self._A_factor, Phi.T)
+        y_var = (
+            self.kernel_.diag(X)
+            - np.einsum("ij,ij->i", Phi, Phi)
+            + np.einsum("ij,ji->i", Phi, A_inv_Phi)
+        )
+        y_std = np.sqrt(np.maximum(y_var, 0.0))
+        if not return_mean_grad:
+            return y_mean, y_std * self.y_train_std_
+        if not return_std_grad:
+            return y_mean, y_std * self.y_train_std_, grad_mean
+
+        # the prior variance of a stationary kernel is constant
+        grad_std = np.zeros(X.shape[1])
+        if not np.allclose(y_std, 0.0):
+            grad_std = (
+                (A_inv_Phi[:, 0] - Phi[0]).dot(Phi_grad) / y_std[0] * self.y_train_std_
+            )
+        return y_mean, y_std * self.y_train_std_, grad_mean, grad_std
+
+    def sample_y(self, X, n_samples=1, random_state=0):
+        """Draws samples from the posterior at `X`, see `sklearn.gaussian_process.GaussianProcessRegressor.sample_y()`.
+
+        :param X: transformed hparams, shape (n_samples_X, n_dims)
+        :type X: np.ndarray
+        :param n_samples: number of samples drawn at each point
+        :type n_samples: int
+        :param random_state: seed or random state
+        :type random_state: int|np.random.RandomState|None
+        :return: samples, shape (n_samples_X, n_samples)
+        :rtype: np.ndarray
+        """
+        rng = check_random_state(random_state)
+        y_mean, y_cov = self.predict(X, return_cov=True)
+        return rng.multivariate_normal(y_mean, y_cov, n_samples).T
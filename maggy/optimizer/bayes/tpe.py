@@ -15,10 +15,10 @@
 #
 
 import numpy as np
-import statsmodels.api as sm
 import scipy.stats as sps
 
 from maggy.optimizer.bayes.base import BaseAsyncBO
+from maggy.optimizer.bayes.kde import KernelDensity
 
 """
 The implementation is heavliy inspired by the BOHB (Falkner et al. 2018) paper and the HpBandSter Framework
@@ -52,7 +52,8 @@ class TPE(BaseAsyncBO):
         :type gamma: float
         :param n_samples: number of samples drawn from model to optimize EI via sampling
         :type n_samples: int
-        :param bw_estimation: method used by statsmodel for the bandwidth estimation of the kde. Options are 'normal_reference', 'silvermann', 'scott'
+        :param bw_estimation: method used for the bandwidth estimation of the kde. Options are 'normal_reference',
+                              'cv_ml', 'cv_ls', see `KernelDensity`
         :type bw_estimation: str
         :param bw_factor: widens the bandwidth for contiuous parameters for proposed points to optimize EI. Higher values favor more exploration
         :type bw_factor: float
@@ -65,64 +66,66 @@ class TPE(BaseAsyncBO):
                 "Set `interim_results`=False when intitializing the optimizer or use GP"
             )
 
+        if bw_estimation not in KernelDensity.BW_METHODS:
+            raise ValueError(
+                "expected bw_estimation to be in {}, got {}".format(
+                    KernelDensity.BW_METHODS, bw_estimation
+                )
+            )
+
         # configure tpe specific meta hyperparameters
         self.gamma = gamma
         self.n_samples = n_samples
         self.bw_estimation = bw_estimation
         self.min_bw = 1e-3  # from HpBandSter
         self.bw_factor = bw_factor
+        # indices of the good and bad trials the kdes of each budget were fitted with
+        self.splits = {}
 
     def sampling_routine(self, budget=0):
-        best_improvement = -np.inf
-        best_sample = None
-
         kde_good = self.models[budget]["good"]
         kde_bad = self.models[budget]["bad"]
 
-        # alternative way of implementation:
-        # instead of this loop, sample all configs beforehand and then optimize acquisition function like in GP
-        for sample in range(self.n_samples):
-            # randomly choose one of the `good` samples as mean
-            idx = np.random.randint(0, len(kde_good.data))
-            obs = kde_good.data[idx]
-            sample_vector = []
-
-            # loop through hparams
-            for mean, bw, hparam_spec in zip(
-                obs, kde_good.bw, self.searchspace.items()
-            ):
-
-                if hparam_spec["type"] in [
-                    self.searchspace.DOUBLE,
-                    self.searchspace.INTEGER,
-                ]:
-                    # sample for cont. hparams
-                    # clip by min bw and multiply by factor to favor more exploration
-                    bw = max(bw, self.min_bw) * self.bw_factor
-
-                    # low and high are calculated with bounds of hparamsm, because they are always [0,
-                    # 1] for transformed hparams we do not have to incorporate them explicitly
-                    # `a, b = (myclip_a - my_mean) / my_std, (myclip_b - my_mean) / my_std`
-                    # see: https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.truncnorm.html
-                    low = -mean / bw
-                    high = (1 - mean) / bw
-
-                    rv = sps.truncnorm.rvs(low, high, loc=mean, scale=bw)
-                    sample_vector.append(rv)
-                else:
-                    # sample for categorical hparams (sampling logic taken from HpBandSter)
-                    if np.random.rand() < (1 - bw):
-                        sample_vector.append(int(mean))
-                    else:
-                        n_choices = len(hparam_spec["values"])
-                        sample_vector.append(np.random.randint(n_choices))
-
-            # calculate EI for current sample
-            ei_val = self._calculate_ei(sample_vector, kde_good, kde_bad)
-
-            if ei_val > best_improvement:
-                best_improvement = ei_val
-                best_sample = sample_vector
+        # sample all candidates at once, each around one randomly chosen `good` observation
+        idx = np.random.randint(0, len(kde_good.data), size=self.n_samples)
+        means = kde_good.data[idx]
+        samples = np.array(means, dtype=float)
+        bws = np.asarray(kde_good.bw)
+
+        continuous = np.array(
+            [
+                hparam_spec["type"]
+                in [self.searchspace.DOUBLE, self.searchspace.INTEGER]
+                for hparam_spec in self.searchspace.items()
+            ]
+        )
+        if continuous.any():
+            # sample for cont. hparams
+            # clip by min bw and multiply by factor to favor more exploration
+            bw = np.maximum(bws[continuous], self.min_bw) * self.bw_factor
+            mean = means[:, continuous]
+
+            # low and high are calculated with bounds of hparamsm, because they are always [0,
+            # 1] for transformed hparams we do not have to incorporate them explicitly
+            # `a, b = (myclip_a - my_mean) / my_std, (myclip_b - my_mean) / my_std`
+            # see: https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.truncnorm.html
+            low = -mean / bw
+            high = (1 - mean) / bw
+
+            samples[:, continuous] = sps.truncnorm.rvs(low, high, loc=mean, scale=bw)
+
+        for i, hparam_spec in enumerate(self.searchspace.items()):
+            if not continuous[i]:
+                # sample for categorical hparams (sampling logic taken from HpBandSter)
+                # keep the category of the mean with probability 1 - bw, else choose randomly
+                flip = np.random.rand(self.n_samples) >= (1 - bws[i])
+                samples[flip, i] = np.random.randint(
+                    len(hparam_spec["values"]), size=np.count_nonzero(flip)
+                )
+
+        # calculate EI for all samples
+        ei_vals = self._calculate_ei(samples, kde_good, kde_bad)
+        best_sample = samples[np.argmax(ei_vals)]
 
         # get original representation of hparams in dict
         best_sample_dict = self.searchspace.list_to_dict(
@@ -140,6 +143,8 @@ class TPE(BaseAsyncBO):
             - creating and storing kde for *good* and *bad* observations
             - Only build model when there are more observations than hyperparameters
               i.e. for each kde
+            - if the good and bad observations of the last update are still good and bad, the kdes are extended
+              with the new observations instead of being fitted from scratch
 
         :param budget: the budget for which model should be updated
                        If budget > 0 : multifidelity optimization. Only use observations that were run with
@@ -148,42 +153,66 @@ class TPE(BaseAsyncBO):
         :type budget: int
         """
         # split good and bad trials
-        good_hparams, bad_hparams = self._split_trials(budget)
+        good_idx, bad_idx = self._split_trials(budget)
 
         n_hparams = len(self.searchspace.keys())
-        if n_hparams >= len(good_hparams) or n_hparams >= len(bad_hparams):
+        if n_hparams >= len(good_idx) or n_hparams >= len(bad_idx):
             self._log(
                 "Not enough observations to build model with budget {} yet. n_good_hparams: {}, n_bad_hparams: {}, n_hparmas: {}".format(
-                    budget, len(good_hparams), len(bad_hparams), n_hparams
+                    budget, len(good_idx), len(bad_idx), n_hparams
                 )
             )
             return
 
         self._log(
             "Update Model with budget {}. n_good_hparams: {}, n_bad_hparams: {}".format(
-                budget, len(good_hparams), len(bad_hparams)
+                budget, len(good_idx), len(bad_idx)
             )
         )
 
-        transformed_good_hparams = np.apply_along_axis(
-            self.searchspace.transform, 1, good_hparams
+        hparam_history = self.get_hparams_array(budget=budget)
+        good, bad = set(good_idx), set(bad_idx)
+        old_good, old_bad = self.splits.get(budget, (None, None))
+        self.splits[budget] = (good, bad)
+
+        if budget in self.models and old_good <= good and old_bad <= bad:
+            # extend the kdes with the observations that are new to them
+            for kde, new_idx in [
+                (self.models[budget]["good"], sorted(good - old_good)),
+                (self.models[budget]["bad"], sorted(bad - old_bad)),
+            ]:
+                if new_idx:
+                    kde.add(self.searchspace.transform_array(hparam_history[new_idx]))
+            return
+
+        transformed_good_hparams = self.searchspace.transform_array(
+            hparam_history[good_idx]
         )
-        transformed_bad_hparams = np.apply_along_axis(
-            self.searchspace.transform, 1, bad_hparams
+        transformed_bad_hparams = self.searchspace.transform_array(
+            hparam_history[bad_idx]
         )
 
-        # self._log("good: {}".format(good_hparams))
-        # self._log("normalized good: {}".format(transformed_good_hparams))
-        # self._log("bad: {}".format(bad_hparams))
-        # self._log("normalized bad: {}".format(transformed_bad_hparams))
-
         var_type = self._get_statsmodel_vartype()
-
-        good_kde = sm.nonparametric.KDEMultivariate(
-            data=transformed_good_hparams, var_type=var_type, bw=self.bw_estimation
+        num_levels = [
+            (
+                len(hparam_spec["values"])
+                if hparam_spec["type"] == self.searchspace.CATEGORICAL
+                else 0
+            )
+            for hparam_spec in self.searchspace.items()
+        ]
+
+        good_kde = KernelDensity(
+            data=transformed_good_hparams,
+            var_type=var_type,
+            bw=self.bw_estimation,
+            num_levels=num_levels,
         )
-        bad_kde = sm.nonparametric.KDEMultivariate(
-            data=transformed_bad_hparams, var_type=var_type, bw=self.bw_estimation
+        bad_kde = KernelDensity(
+            data=transformed_bad_hparams,
+            var_type=var_type,
+            bw=self.bw_estimation,
+            num_levels=num_levels,
         )
 
         self.models[budget] = {"good": good_kde, "bad": bad_kde}
@@ -199,13 +228,12 @@ class TPE(BaseAsyncBO):
 
         :param budget: the budget for which observations shoul be split
         :type budget: int
-        :return: tuple with arrays of good trials and bad trials
-        :rtype (np.ndarray(n_trials, n_hparams), np.ndarray(n_trials, n_params))
+        :return: tuple with the indices of the good trials and the bad trials in `get_hparams_array(budget)`
+        :rtype (np.ndarray(n_good,), np.ndarray(n_bad,))
         """
 
         metric_history = self.get_metrics_array(budget=budget)
         metric_idx_ascending = np.argsort(metric_history)
-        hparam_history = self.get_hparams_array(budget=budget)
 
         n_good = max(
             len(self.searchspace.keys()) + 1, int(self.gamma * metric_history.shape[0])
@@ -215,13 +243,13 @@ class TPE(BaseAsyncBO):
             int((1 - self.gamma) * metric_history.shape[0]),
         )
 
-        good_trials = hparam_history[metric_idx_ascending[:n_good]]
-        bad_trials = hparam_history[metric_idx_ascending[n_good : n_good + n_bad]]
+        good_idx = metric_idx_ascending[:n_good]
+        bad_idx = metric_idx_ascending[n_good : n_good + n_bad]
 
-        return good_trials, bad_trials
+        return good_idx, bad_idx
 
     def _get_statsmodel_vartype(self):
-        """Returns *statsmodel* type specifier string consisting of the types for each hparam of the searchspace , so for example 'ccuo'.
+        """Returns *statsmodel* type specifier string consisting of the types for each hparam of the searchspace , so for example 'ccu'.
 
         :rtype: str
         """
@@ -251,16 +279,16 @@ class TPE(BaseAsyncBO):
             raise NotImplementedError("Only cont vartypes are implemented yer")
 
     @staticmethod
-    def _calculate_ei(x, kde_good, kde_bad):
+    def _calculate_ei(X, kde_good, kde_bad):
         """Returns Expected Improvement for given hparams
 
-        :param x: list of hyperparameters, shape(n_hparams,)
-        :type x: list
+        :param X: transformed hyperparameters, shape(n_samples, n_hparams)
+        :type X: np.ndarray
         :param kde_good: kde of good observations
-        :type kde_good: sm.KDEMultivariate
+        :type kde_good: KernelDensity
         :param kde_bad: pdf of kde of bad observations
-        :type kde_bad: sm.KDEMultivariate of KDE instance
-        :return: expected improvement
-        :rtype: float
+        :type kde_bad: KernelDensity
+        :return: expected improvement, shape(n_samples,)
+        :rtype: np.ndarray
         """
-        return max(1e-32, kde_good.pdf(x)) / max(kde_bad.pdf(x), 1e-32)
+        return np.maximum(kde_good.pdf(X), 1e-32) / np.maximum(kde_bad.pdf(X), 1e-32)
@@ -45,6 +45,7 @@ class RandomSearch(AbstractOptimizer):
 
         # sampling routine for randomsearch + pruner
         if self.pruner:
+            self.report_final_trial(trial)
             next_trial_info = self.pruner.pruning_routine()
             if next_trial_info == "IDLE":
                 self._log(
@@ -66,6 +67,7 @@ class RandomSearch(AbstractOptimizer):
                     hparams=parent_trial_hparams,
                     sample_type="promoted",
                     run_budget=next_trial_info["budget"],
+                    parent_trial_id=parent_trial_id,
                 )
                 self._log("use hparams from promoted trial {}".format(parent_trial_id))
             else:
@@ -14,9 +14,10 @@
 #   limitations under the License.
 #
 
-from maggy.pruner import hyperband, abstractpruner
+from maggy.pruner import hyperband, asynchyperband, abstractpruner
 
 Hyperband = hyperband.Hyperband
+AsyncHyperband = asynchyperband.AsyncHyperband
 AbstractPruner = abstractpruner.AbstractPruner
 
-__all__ = ["Hyperband", "AbstractPruner"]
+__all__ = ["Hyperband", "AsyncHyperband", "AbstractPruner"]
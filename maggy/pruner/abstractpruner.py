@@ -50,6 +50,18 @@ class AbstractPruner(ABC):
         """
         pass
 
+    @abstractmethod
+    def report_metric(self, trial_id, metric):
+        """
+        hook for reporting the final metric of a finished trial from optimizer to pruner
+
+        :param trial_id: the id of the finished trial
+        :type trial_id: str
+        :param metric: final metric of the trial, with the lowest metric being the "best"
+        :type metric: float
+        """
+        pass
+
     @abstractmethod
     def finished(self):
         """
@@ -89,6 +101,6 @@ class AbstractPruner(ABC):
             self.fd.write((msg + "\n").encode())
 
     def _close_log(self):
-        if not self.fd.closed:
+        if self.fd and not self.fd.closed:
             self.fd.flush()
             self.fd.close()
@@ -0,0 +1,194 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+The asynchronous promotion rule is the one of ASHA (Li et al. 2020), applied to the SH iterations of Hyperband
+
+ASHA: https://arxiv.org/abs/1810.05934
+"""
+
+import bisect
+
+from maggy.pruner.hyperband import Hyperband, SHIteration
+
+
+class AsyncHyperband(Hyperband):
+    """
+    **Asynchronous Hyperband**
+
+    Runs the same SH iterations (brackets) with the same budgets and number of configs per rung as `Hyperband`, but
+    promotes a trial to the next rung as soon as it ranks in the top 1/eta of the finished trials of its rung, instead
+    of waiting until all trials of the rung have finished. Hence workers are only idle when no promotion is possible
+    and all configs of the first rungs of the started iterations have been sampled.
+
+    Like ASHA, a trial that was promoted early can drop out of the top 1/eta later on and a trial that would have been
+    promoted by synchronous SH can miss the promotion, because the number of trials per rung is the same as in
+    `Hyperband`.
+
+    Use it as a pruner of an optimizer with `pruner="async_hyperband"`, the pruner kwargs are the ones of `Hyperband`.
+    """
+
+    def create_iteration(self, n_configs, budgets, iteration_id):
+        """returns an asynchronous SH iteration, see `AsyncSHIteration` for the params
+
+        :rtype: AsyncSHIteration
+        """
+        return AsyncSHIteration(
+            n_configs=n_configs,
+            budgets=budgets,
+            iteration_id=iteration_id,
+            eta=self.eta,
+            logger=self._log,
+        )
+
+
+class AsyncSHIteration(SHIteration):
+    """SuccessiveHalving Iteration with asynchronous promotions
+
+    A finished trial of a rung is promotable if it is among the best `n_finished // eta` trials of the rung and has
+    not been promoted yet. Once all trials of a rung have finished, the best `n_configs` of the next rung are
+    promotable, like in `SHIteration`.
+
+    `current_rung` is the rung of the last run returned by `get_next_run()`, it's the rung that `report_trial()` adds
+    the trial to.
+    """
+
+    def __init__(self, n_configs, budgets, iteration_id, eta, logger):
+        """
+        Attributes
+        ----------
+
+        rung_results (dict): finished trials of each rung as (metric, trial_id) tuples, sorted by metric
+        promoted (dict): trial ids of the trials of each rung that have been promoted to the next rung
+
+        See `SHIteration` for the other attributes and params.
+
+        :param eta: only the best 1/eta of the finished trials of a rung are promoted
+        :type eta: int
+        """
+        super().__init__(n_configs, budgets, iteration_id, logger)
+        self.eta = eta
+        self.rung_results = {rung: [] for rung in range(0, self.n_rungs)}
+        self.promoted = {rung: set() for rung in range(0, self.n_rungs)}
+
+    def get_next_run(self):
+        """returns dict with `trial_id` and `budget` for next trial.
+
+        Promotions to higher rungs are preferred over new configs in the first rung.
+
+        **There are 3 possible outcomes:**
+
+        1. A trial is promotable
+            - return {"trial_id": `promoted_trial_id`, "budget": `budget`}
+        2. No trial is promotable and there are still slots to fill in the first rung
+            - return {"trial_id": None, "budget": `budget`}
+        3. No trial is promotable and all slots of the first rung are filled, i.e. the iteration has to wait for
+           running trials or has finished
+            - return None
+
+        :return: dict with info about trial id and budget for the next run in the iteration, or None if iteration is
+                 busy or finished.
+        :rtype: None|dict
+        """
+        for rung in reversed(range(self.n_rungs - 1)):
+            trial_id = self.promotable_trial(rung)
+            if trial_id is not None:
+                self.promote_trial(rung, trial_id)
+                return {"trial_id": trial_id, "budget": self.budgets[rung + 1]}
+
+        if self.actual_n_configs[0] < self.n_configs[0]:
+            self.current_rung = 0
+            self.actual_n_configs[0] += 1
+            return {"trial_id": None, "budget": self.budgets[0]}
+
+        if self.finished():
+            # set state so it is no longer returned in `active_iterations()`
+            self.state = SHIteration.FINISHED
+            self._log("{}. Iteration finished".format(self.iteration_id))
+        return None
+
+    def report_metric(self, trial_id, metric):
+        """adds the final metric of a finished trial of the iteration to the results of its rung
+
+        :param trial_id: the id of the finished trial
+        :type trial_id: str
+        :param metric: final metric of the trial, with the lowest metric being the "best"
+        :type metric: float
+        """
+        if trial_id in self.metrics:
+            return
+        super().report_metric(trial_id, metric)
+        bisect.insort(
+            self.rung_results[self._trial_rungs[trial_id]], (metric, trial_id)
+        )
+
+    def promotable_trial(self, rung):
+        """returns the best promotable trial of `rung` or None
+
+        :param rung: rung to promote from, not the last rung
+        :type rung: int
+        :rtype: str|None
+        """
+        n_next = self.n_configs[rung + 1]
+        if self.actual_n_configs[rung + 1] >= n_next:
+            # all slots in next rung are filled
+            return None
+
+        results = self.rung_results[rung]
+        if self.n_finished[rung] == self.n_configs[rung]:
+            n_top = n_next
+        else:
+            n_top = min(len(results) // self.eta, n_next)
+
+        for _, trial_id in results[:n_top]:
+            if trial_id not in self.promoted[rung]:
+                return trial_id
+        return None
+
+    def promote_trial(self, rung, trial_id):
+        """promotes a finished trial of `rung` to the next rung
+
+        :param rung: rung of the trial
+        :type rung: int
+        :param trial_id: the id of the trial, it becomes the `original_trial_id` of the trial in the next rung
+        :type trial_id: str
+        """
+        self.promoted[rung].add(trial_id)
+        self.current_rung = rung + 1
+        self.actual_n_configs[self.current_rung] += 1
+        self._config_index[self.current_rung][trial_id] = len(
+            self.configs[self.current_rung]
+        )
+        self.configs[self.current_rung].append(
+            {"original_trial_id": trial_id, "actual_trial_id": None}
+        )
+        self._log(
+            "{}. Iteration, promoted trial {} from rung {} with {}/{} finished trials".format(
+                self.iteration_id,
+                trial_id,
+                rung,
+                self.n_finished[rung],
+                self.n_configs[rung],
+            )
+        )
+
+    def finished(self):
+        """checks if SH Iteration has finished, i.e. if all trials in all rungs are finished
+
+        :return: True if SH Iteration is finished, False else
+        :rtype: bool
+        """
+        return self.n_finished == self.n_configs
@@ -47,7 +47,9 @@ class Hyperband(AbstractPruner):
 
     Hyperband is initialized as a subroutine in an instance of `BaseAsyncBO` (optimizer) and its method
     `pruning_routine()` is called at the beginning of the `get_suggestion()` method of the optimizer to return the budget
-    and hparam config for the next Trial
+    and hparam config for the next Trial. The optimizer reports the final metric of every finished trial with
+    `report_metric()`, so checking whether a rung can be promoted is a comparison of counters instead of a lookup of
+    all trials of the rung in the `final_store`.
 
     **Parallelization**
 
@@ -74,6 +76,7 @@ class Hyperband(AbstractPruner):
         - budgets (np.array[int]): budgets used for calculating budgets of SH iterations
         - iterations (list(SHIteration)): list of initialized SH iterations
         - updating_iteration (None|int): id of currently updating SH iteration
+        - metrics (dict): final metric of every reported trial, with `trial_id` as key
 
         :param min_budget: The smallest budget to consider. Needs to be positive!
         :type min_budget: int
@@ -87,7 +90,7 @@ class Hyperband(AbstractPruner):
         :type eta: int
         :param n_iterations: number of SH Iterations
         :type n_iterations: int
-        :param trial_metric_getter: a that returns a dict with `trial_id` as key and `metric` as value
+        :param trial_metric_getter: a function that returns a dict with `trial_id` as key and `metric` as value
             with the lowest metric being the "best"
             It's only argument is `trial_ids`, it can be either str of single trial or list of trial ids
         :type trial_metric_getter: function
@@ -124,8 +127,13 @@ class Hyperband(AbstractPruner):
         ).tolist()
         # convert tolist to convert values from np.int64 to int, necessary to be json serializable when creating trialid
 
+        # final metrics of the finished trials and the iteration of the started ones
+        self.metrics = {}
+        self._trial_iterations = {}
+
         # configure SH iterations
         self.iterations = []
+        self._active_iterations = []
         self.init_iterations()
 
         # start first SH iteration
@@ -165,6 +173,8 @@ class Hyperband(AbstractPruner):
                 # set updateing iteration
                 self.updating_iteration = iteration.iteration_id
                 break
+            if iteration.state == SHIteration.FINISHED:
+                self._active_iterations.remove(iteration)
 
         if next_run is not None:
             # schedule new run for `iteration`
@@ -207,15 +217,19 @@ class Hyperband(AbstractPruner):
             ns = [max(int(n0 * (self.eta ** (-i))), 1) for i in range(n_rungs + 1)]
             # budgets per rung
             budgets = self.budgets[-n_rungs - 1 :]
-            self.iterations.append(
-                SHIteration(
-                    n_configs=ns,
-                    budgets=budgets,
-                    iteration_id=iteration,
-                    trial_metric_getter=self.trial_metric_getter,
-                    logger=self._log,
-                )
-            )
+            self.iterations.append(self.create_iteration(ns, budgets, iteration))
+
+    def create_iteration(self, n_configs, budgets, iteration_id):
+        """returns a SH iteration, see `SHIteration` for the params
+
+        :rtype: SHIteration
+        """
+        return SHIteration(
+            n_configs=n_configs,
+            budgets=budgets,
+            iteration_id=iteration_id,
+            logger=self._log,
+        )
 
     def active_iterations(self):
         """returns currently active (i.e. state == "RUNNING") iterations
@@ -224,25 +238,22 @@ class Hyperband(AbstractPruner):
 
         :rtype: list[SHIteration]
         """
-        active = [
-            iteration
-            for iteration in self.iterations
-            if iteration.state == SHIteration.RUNNING
-        ]
-        return active
+        return list(self._active_iterations)
 
     def start_next_iteration(self):
         """Sets state of next SH iteration in queue to RUNNING"""
-        for iteration in self.iterations:
-            if iteration.state == SHIteration.INIT:
-                iteration.state = SHIteration.RUNNING
-                self._log(
-                    "{}. Iteration started. n_configs: {}, budgets: {}".format(
-                        iteration.iteration_id, iteration.n_configs, iteration.budgets
-                    )
+        # iterations are started in order, the next one follows the ones started so far
+        n_started = len(self.iterations) - self.n_iterations
+        if n_started < len(self.iterations):
+            iteration = self.iterations[n_started]
+            iteration.state = SHIteration.RUNNING
+            self._active_iterations.append(iteration)
+            self._log(
+                "{}. Iteration started. n_configs: {}, budgets: {}".format(
+                    iteration.iteration_id, iteration.n_configs, iteration.budgets
                 )
-                self.n_iterations -= 1
-                break
+            )
+            self.n_iterations -= 1
 
     def finished(self):
         """returns True if all iterations have finished
@@ -250,11 +261,10 @@ class Hyperband(AbstractPruner):
         :return: True, if all iterations have state == 'FINISHED'. Else, False
         :rtype: bool
         """
-        for iteration in self.iterations:
-            if iteration.state != SHIteration.FINISHED:
-                return False
-
-        return True
+        return self.n_iterations == 0 and all(
+            iteration.state == SHIteration.FINISHED
+            for iteration in self._active_iterations
+        )
 
     def num_trials(self):
         n_trials = 0
@@ -273,11 +283,26 @@ class Hyperband(AbstractPruner):
         :param new_trial_id: the id of the newly started trial
         :type new_trial_id: str
         """
-        self.iterations[self.updating_iteration].report_trial(
-            original_trial_id, new_trial_id
-        )
+        iteration = self.iterations[self.updating_iteration]
+        iteration.report_trial(original_trial_id, new_trial_id)
+        self._trial_iterations[new_trial_id] = iteration
         self.updating_iteration = None
 
+    def report_metric(self, trial_id, metric):
+        """reports the final metric of a finished trial to HB
+
+        This method is an interface to the `optimizer` and is called with the last finished trial in `get_suggestion()`
+
+        :param trial_id: the id of the finished trial
+        :type trial_id: str
+        :param metric: final metric of the trial, with the lowest metric being the "best"
+        :type metric: float
+        """
+        self.metrics[trial_id] = metric
+        iteration = self._trial_iterations.pop(trial_id, None)
+        if iteration is not None:
+            iteration.report_metric(trial_id, metric)
+
 
 class SHIteration:
     """SuccessiveHalving Iteration
@@ -301,7 +326,7 @@ class SHIteration:
     RUNNING = "RUNNING"
     FINISHED = "FINISHED"
 
-    def __init__(self, n_configs, budgets, iteration_id, trial_metric_getter, logger):
+    def __init__(self, n_configs, budgets, iteration_id, logger):
         """
         Attributes
         ----------
@@ -320,6 +345,9 @@ class SHIteration:
                         of the current rung.
                         Having a `actual_trial_id` means that a trial has been started, but not neccessarily finished
         n_rungs (int): number of rungs in the SH iteration
+        n_finished (list[int]): number of finished trials in each rung. A rung is complete when it is equal to
+                                `n_configs`.
+        metrics (dict): final metrics of the finished trials of the iteration, with `actual_trial_id` as key
         state (str): current state of the iteration, can be "INIT", "RUNNING" or "FINISHED
 
         Note: this strategy gives also the opportunity to later continue
@@ -353,10 +381,6 @@ class SHIteration:
         :type budgets: list[int]
         :param iteration_id: the id of the iteration is the index of the iteration in the `iterations` list of the pruner
         :type iteration_id: int
-        :param trial_metric_getter: a function that returns a finished Trial object or a list of finished Trial objects from
-                             the `final_store` of the `optimizer`.
-                             It's only argument is the `trial_id` or a list of `trial_id`
-        :type trial_metric_getter: function
         :param logger: logger
         """
         self.iteration_id = iteration_id
@@ -368,8 +392,12 @@ class SHIteration:
         self.current_rung = 0
         self.actual_n_configs = [0] * len(self.n_configs)
         self.configs = {rung: [] for rung in range(0, self.n_rungs)}
+        self.n_finished = [0] * self.n_rungs
+        self.metrics = {}
 
-        self.trial_metric_getter = trial_metric_getter
+        # rung of each started trial and index of the promoted trials in `configs`
+        self._trial_rungs = {}
+        self._config_index = {rung: {} for rung in range(0, self.n_rungs)}
 
         # configure logger
         self._log = logger
@@ -464,16 +492,10 @@ class SHIteration:
                 }
             )
         else:
-            # find index of trial and insert actual trial id
-            trial_idx = next(
-                (
-                    index
-                    for (index, d) in enumerate(self.configs[self.current_rung])
-                    if d["original_trial_id"] == original_trial_id
-                ),
-                None,
-            )
+            # insert actual trial id
+            trial_idx = self._config_index[self.current_rung][original_trial_id]
             self.configs[self.current_rung][trial_idx]["actual_trial_id"] = new_trial_id
+        self._trial_rungs[new_trial_id] = self.current_rung
 
         self._log(
             "{}. Iteration, {}. Rung. Started Trial {}/{}".format(
@@ -484,6 +506,21 @@ class SHIteration:
             )
         )
 
+    def report_metric(self, trial_id, metric):
+        """adds the final metric of a finished trial of the iteration
+
+        is called from `pruner.report_metric()`
+
+        :param trial_id: the id of the finished trial
+        :type trial_id: str
+        :param metric: final metric of the trial, with the lowest metric being the "best"
+        :type metric: float
+        """
+        if trial_id in self.metrics:
+            return
+        self.metrics[trial_id] = metric
+        self.n_finished[self._trial_rungs[trial_id]] += 1
+
     def promote(self):
         """promotes n_configs to the next rung based on final metric
 
@@ -492,15 +529,11 @@ class SHIteration:
         :return: list of trial ids that are advancing to the next rung
         :rtype: list[str]
         """
-        # get trial ids of current rung
-        trial_ids = [
-            trial["actual_trial_id"] for trial in self.configs[self.current_rung]
-        ]
-
-        # get trials from `final_store` of optimizer
-        trial_metrics = self.trial_metric_getter(
-            trial_ids
-        )  # {`trial_id`: `metric`, ... }
+        # get metrics of trials of current rung, {`trial_id`: `metric`, ... }
+        trial_metrics = {
+            trial["actual_trial_id"]: self.metrics[trial["actual_trial_id"]]
+            for trial in self.configs[self.current_rung]
+        }
 
         # sort trials
         sorted_trials = list(
@@ -516,6 +549,9 @@ class SHIteration:
         # promote trials to next rung
         self.current_rung += 1
         for trial in promoted_trials:
+            self._config_index[self.current_rung][trial] = len(
+                self.configs[self.current_rung]
+            )
             self.configs[self.current_rung].append(
                 {"original_trial_id": trial, "actual_trial_id": None}
             )
@@ -555,18 +591,20 @@ class SHIteration:
             )
             return False
 
-        for trial in self.configs[self.current_rung]:
-            if not self.trial_metric_getter(trial["actual_trial_id"]):
-                # trial has not finished
-                self._log(
-                    "{}. Iteration, rung {} is not promotable. At least one trial ({}) is not finished yet".format(
-                        self.iteration_id, self.current_rung, trial["actual_trial_id"]
-                    )
+        if self.n_finished[self.current_rung] < self.n_configs[self.current_rung]:
+            # not all trials have finished
+            self._log(
+                "{}. Iteration, rung {} is not promotable. {}/{} trials are finished".format(
+                    self.iteration_id,
+                    self.current_rung,
+                    self.n_finished[self.current_rung],
+                    self.n_configs[self.current_rung],
                 )
-                return False
+            )
+            return False
 
         self._log(
-            "{}. Iteration, rung {} is not promotable. Not all slots in rung filled yet".format(
+            "{}. Iteration, rung {} is promotable".format(
                 self.iteration_id, self.current_rung
             )
         )
@@ -586,9 +624,5 @@ class SHIteration:
             # current rung is not the last rung in the iteration
             return False
 
-        for trial in self.configs[self.current_rung]:
-            if not self.trial_metric_getter(trial["actual_trial_id"]):
-                # trial has not finished
-                return False
-
-        return True
+        # all trials in last rung have finished
+        return self.n_finished[self.current_rung] == self.n_configs[self.current_rung]
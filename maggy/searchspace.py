@@ -65,6 +65,8 @@ class Searchspace(object):
     def __init__(self, **kwargs):
         self._hparam_types = {}
         self._names = []
+        # per hparam bounds and lookup tables of the array transforms
+        self._array_spec = None
         for name, value in kwargs.items():
             self.add(name, value)
 
@@ -138,6 +140,7 @@ class Searchspace(object):
                 self._hparam_types[name] = param_type
                 setattr(self, name, value[1])
                 self._names.append(name)
+                self._array_spec = None
             else:
                 raise ValueError(
                     "Hyperparameter type is not of type DOUBLE, "
@@ -207,6 +210,61 @@ class Searchspace(object):
 
         return return_list
 
+    def get_random_parameter_array(
+        self, num, transformed=False, normalize_categorical=False, rng=None
+    ):
+        """Generate random hparam configs at once, as rows of an array.
+
+        Samples the hparams column by column with numpy instead of one config
+        at a time. The columns are in the order of `keys()`.
+
+        :param num: number of random configs to be generated.
+        :type num: int
+        :param transformed: If True, return the configs in the representation of
+            `transform()`, else in the original representation.
+        :type transformed: bool
+        :param normalize_categorical: If True, the encoded categorical hparams are also max-min normalized between
+            0 and 1, see `transform()`. Only used if `transformed` is True.
+        :type normalize_categorical: bool
+        :param rng: Random generator, or seed to create one.
+        :type rng: np.random.Generator or int
+        :raises NotImplementedError: `transformed` is True and there is a DISCRETE hparam.
+        :return: array of shape (num, number of hparams). Of dtype float if
+            `transformed`, else of dtype object holding the values as python
+            types.
+        :rtype: np.ndarray
+        """
+        if not isinstance(rng, np.random.Generator):
+            rng = np.random.default_rng(rng)
+
+        if transformed:
+            configs = np.empty((num, len(self._names)), dtype=float)
+        else:
+            configs = np.empty((num, len(self._names)), dtype=object)
+        for i, hparam in enumerate(self.items()):
+            hparam_type, values = hparam["type"], hparam["values"]
+            if hparam_type == Searchspace.DOUBLE:
+                column = rng.random(num)
+                if not transformed:
+                    column = (values[0] + column * (values[1] - values[0])).tolist()
+            elif hparam_type == Searchspace.INTEGER:
+                column = rng.integers(values[0], values[1] + 1, num)
+                if transformed:
+                    column = (column - values[0]) / (values[1] - values[0])
+                else:
+                    column = column.tolist()
+            elif transformed and hparam_type == Searchspace.CATEGORICAL:
+                column = rng.integers(0, len(values), num)
+                if normalize_categorical and len(values) > 1:
+                    column = column / (len(values) - 1)
+            elif transformed:
+                raise NotImplementedError("Not Implemented other types yet")
+            else:
+                # DISCRETE or CATEGORICAL
+                column = [values[j] for j in rng.integers(0, len(values), num)]
+            configs[:, i] = column
+        return configs
+
     def __iter__(self):
         self._returned = self._names.copy()
         return self
@@ -352,6 +410,132 @@ class Searchspace(object):
 
         return hparams
 
+    def _get_array_spec(self):
+        """Returns the column types, the bounds of the columns as arrays and
+        lookup tables of the categorical columns, for transforming whole
+        arrays of configs.
+        """
+        if self._array_spec is None:
+            types = [self._hparam_types[name] for name in self._names]
+            lower = np.zeros(len(types))
+            upper = np.ones(len(types))
+            categories = {}
+            for i, (hparam_type, values) in enumerate(self.values()):
+                if hparam_type in [Searchspace.DOUBLE, Searchspace.INTEGER]:
+                    lower[i], upper[i] = values
+                elif hparam_type == Searchspace.CATEGORICAL:
+                    upper[i] = max(len(values) - 1, 1)
+                    choices = np.empty(len(values), dtype=object)
+                    choices[:] = values
+                    if all(isinstance(value, str) for value in values):
+                        # sorted choices and their positions for np.searchsorted
+                        order = np.argsort(np.array(values))
+                        lookup = (np.array(values)[order], order)
+                    else:
+                        lookup = {value: j for j, value in enumerate(values)}
+                    categories[i] = (choices, lookup)
+            self._array_spec = (types, lower, upper, categories)
+        return self._array_spec
+
+    @staticmethod
+    def _encode_categorical_array(lookup, column):
+        """Encodes a column of categories to their list indices."""
+        if isinstance(lookup, tuple):
+            sorted_choices, order = lookup
+            column = column.astype(str)
+            positions = np.searchsorted(sorted_choices, column)
+            positions = np.minimum(positions, len(sorted_choices) - 1)
+            unknown = sorted_choices[positions] != column
+            if unknown.any():
+                raise ValueError(
+                    "{} is not a category".format(column[np.argmax(unknown)])
+                )
+            return order[positions].astype(float)
+        try:
+            return np.fromiter((lookup[value] for value in column), float, len(column))
+        except KeyError as e:
+            raise ValueError("{} is not a category".format(e.args[0]))
+
+    def transform_array(self, hparams, normalize_categorical=False):
+        """Transforms an array of hparam configs, one config per row, like
+        `transform()` transforms a single config, but column by column.
+
+        :param hparams: hparams in original representation, of shape (n_configs, n_hparams)
+        :type hparams: 2D np.ndarray or list
+        :param normalize_categorical: If True, the encoded categorical hparams are also max-min normalized between
+            0 and 1. `inverse_transform_array()` must use the same value for this parameter
+        :type normalize_categorical: bool
+        :raises NotImplementedError: There is a DISCRETE hparam.
+        :return: transformed hparams
+        :rtype: np.ndarray[np.float64]
+        """
+        types, lower, upper, categories = self._get_array_spec()
+        if not isinstance(hparams, np.ndarray):
+            # keep the types of the values, e.g. of categories
+            hparams = np.array(hparams, dtype=object)
+        if hparams.size == 0:
+            return np.empty((0, len(types)))
+        # like `transform()`, ignores additional columns, e.g. the budget
+        hparams = hparams[:, : len(types)]
+        transformed = np.empty(hparams.shape, dtype=np.float64)
+        for i, hparam_type in enumerate(types):
+            if hparam_type == Searchspace.DOUBLE:
+                transformed[:, i] = hparams[:, i].astype(np.float64)
+            elif hparam_type == Searchspace.INTEGER:
+                transformed[:, i] = np.trunc(hparams[:, i].astype(np.float64))
+            elif hparam_type == Searchspace.CATEGORICAL:
+                transformed[:, i] = Searchspace._encode_categorical_array(
+                    categories[i][1], hparams[:, i]
+                )
+            else:
+                raise NotImplementedError("Not Implemented other types yet")
+
+        # max-min normalize all but the encoded categorical hparams, if they
+        # are not normalized
+        normalize = np.array(
+            [normalize_categorical or t != Searchspace.CATEGORICAL for t in types]
+        )
+        transformed[:, normalize] = np.clip(
+            (transformed[:, normalize] - lower[normalize])
+            / (upper[normalize] - lower[normalize]),
+            0.0,
+            1.0,
+        )
+        return transformed
+
+    def inverse_transform_array(self, transformed_hparams, normalize_categorical=False):
+        """Returns an array of hparam configs, one config per row, in the
+        original representation, like `inverse_transform()` does for a single
+        config.
+
+        :param transformed_hparams: hparams in transformed representation, of shape (n_configs, n_hparams)
+        :type transformed_hparams: 2D np.ndarray
+        :param normalize_categorical: If True, the encoded categorical hparams were also max-min normalized
+            between 0 and 1. `transform_array()` must use the same value for this parameter
+        :type normalize_categorical: bool
+        :raises NotImplementedError: There is a DISCRETE hparam.
+        :return: hparams of dtype object, holding the values as python types
+        :rtype: np.ndarray
+        """
+        types, lower, upper, categories = self._get_array_spec()
+        transformed_hparams = np.asarray(transformed_hparams, dtype=np.float64)
+        hparams = np.empty(transformed_hparams.shape, dtype=object)
+        for i, hparam_type in enumerate(types):
+            column = transformed_hparams[:, i]
+            if hparam_type == Searchspace.DOUBLE:
+                hparams[:, i] = (column * (upper[i] - lower[i]) + lower[i]).tolist()
+            elif hparam_type == Searchspace.INTEGER:
+                column = np.round(column * (upper[i] - lower[i]) + lower[i])
+                hparams[:, i] = column.astype(int).tolist()
+            elif hparam_type == Searchspace.CATEGORICAL:
+                if normalize_categorical:
+                    column = np.round(column * upper[i])
+                hparams[:, i] = categories[i][0][column.astype(int)]
+            else:
+                raise NotImplementedError("Not Implemented other types yet")
+
+        return hparams
+
     @staticmethod
     def _encode_categorical(choices, value):
         """Encodes category to integer. The encoding is the list index of the category
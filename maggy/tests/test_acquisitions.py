@@ -0,0 +1,59 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import pytest
+from skopt.learning.gaussian_process import GaussianProcessRegressor
+from skopt.learning.gaussian_process.kernels import ConstantKernel, Matern
+
+from maggy.optimizer.bayes.acquisitions import AsyTS
+from maggy.optimizer.bayes.gp import GP
+
+
+def _regressor(n=30, n_dims=3):
+    rng = np.random.RandomState(0)
+    X = rng.rand(n, n_dims)
+    y = np.sin(3 * X.sum(axis=1)) + 0.1 * rng.randn(n)
+    return GaussianProcessRegressor(
+        kernel=ConstantKernel(1.0, (0.01, 1000.0))
+        * Matern(length_scale=np.ones(n_dims), nu=2.5),
+        normalize_y=True,
+        noise="gaussian",
+        random_state=0,
+    ).fit(X, y)
+
+
+def test_asy_ts_1_d_is_sample_with_gradient():
+    model = _regressor()
+    x = np.array([0.2, 0.5, 0.7])
+
+    value, grad = AsyTS.evaluate_1_d(x, model, None)
+
+    assert value[0] == pytest.approx(model.sample_y(x[np.newaxis])[0, 0], abs=1e-6)
+    eps = 1e-5
+    for dim in range(3):
+        dx = np.zeros(3)
+        dx[dim] = eps
+        upper, _ = AsyTS.evaluate_1_d(x + dx, model, None)
+        lower, _ = AsyTS.evaluate_1_d(x - dx, model, None)
+        assert grad[dim] == pytest.approx((upper - lower)[0] / (2 * eps), abs=1e-4)
+
+
+def test_n_jobs():
+    assert GP(acq_optimizer_kwargs={"n_jobs": 4}).n_jobs == 4
+    assert GP(acq_optimizer_kwargs={"n_jobs": -1}).n_jobs >= 1
+    with pytest.raises(ValueError):
+        GP(acq_optimizer_kwargs={"n_jobs": 0})
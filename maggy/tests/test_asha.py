@@ -0,0 +1,75 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import random
+
+import pytest
+
+from maggy import Searchspace
+from maggy.optimizer import Asha
+from maggy.trial import Trial
+
+
+def _expected_promotion(asha):
+    """Returns (rung, trial) of the next promotion by filtering and sorting the rungs, or None."""
+    for k in range(asha.max_rung - 1, -1, -1):
+        if k not in asha.rungs:
+            continue
+        finalized = [t for t in asha.rungs[k] if t.status == Trial.FINALIZED]
+        n_top = len(finalized) // asha.reduction_factor
+        if n_top <= len(asha.promoted[k]):
+            continue
+        top = sorted(finalized, key=lambda t: t.final_metric, reverse=True)[:n_top]
+        promotable = [t for t in top if t.trial_id not in asha.promoted[k]]
+        if promotable:
+            return k + 1, promotable[0]
+    return None
+
+
+@pytest.mark.parametrize("reduction_factor", [2, 3])
+def test_asha_promotes_top_trials(reduction_factor):
+    random.seed(0)
+    asha = Asha(reduction_factor=reduction_factor, resource_min=1, resource_max=27)
+    asha.searchspace = Searchspace(x=("DOUBLE", [0, 10]))
+    asha.num_trials = 1000
+    asha.initialize()
+
+    running = [asha.get_suggestion() for _ in range(4)]
+    n_promoted = 0
+    while True:
+        trial = running.pop(random.randrange(len(running)))
+        trial.final_metric = trial.params["x"]
+        trial.status = Trial.FINALIZED
+
+        expected = None if asha.max_rung in asha.rungs else _expected_promotion(asha)
+        suggestion = asha.get_suggestion(trial)
+        if suggestion is None:
+            break
+        if expected is None:
+            assert suggestion.params["budget"] == 1
+            assert "parent_trial_id" not in suggestion.info_dict
+        else:
+            rung, parent = expected
+            n_promoted += 1
+            assert suggestion.params == dict(
+                parent.params, budget=reduction_factor ** rung
+            )
+            assert suggestion.info_dict["parent_trial_id"] == parent.trial_id
+            assert suggestion in asha.rungs[rung]
+        running.append(suggestion)
+
+    assert asha.max_rung in asha.rungs
+    assert n_promoted == sum(len(promoted) for promoted in asha.promoted.values())
@@ -0,0 +1,79 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer.bayes.gp import GP
+from maggy.trial import Trial
+
+
+def _optimizer(direction="min"):
+    gp = GP(num_warmup_trials=1, async_strategy="asy_ts", interim_results=True)
+    gp.searchspace = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        activation=("CATEGORICAL", ["relu", "tanh"]),
+    )
+    gp.num_trials = 10
+    gp.direction = direction
+    gp.final_store = FinalStore()
+    gp.trial_store = TrialStore()
+    return gp
+
+
+def _finalize(gp, params, history):
+    trial = Trial(params)
+    trial.metric_history = list(history)
+    trial.final_metric = history[-1]
+    trial.status = Trial.FINALIZED
+    gp.final_store.append(trial)
+
+
+def test_get_hparams_array():
+    gp = _optimizer()
+    _finalize(gp, {"lr": 0.01, "activation": "tanh"}, [0.5])
+    assert gp.get_hparams_array().tolist() == [[0.01, "tanh"]]
+
+    _finalize(gp, {"lr": 0.05, "activation": "relu"}, [0.3])
+    hparams = gp.get_hparams_array()
+    assert hparams.tolist() == [[0.01, "tanh"], [0.05, "relu"]]
+    np.testing.assert_allclose(
+        gp.searchspace.transform_array(hparams),
+        gp.searchspace.transform_array([[0.01, "tanh"], [0.05, "relu"]]),
+    )
+
+
+def test_get_XY_interim_results():
+    for direction in ["min", "max"]:
+        gp = _optimizer(direction)
+        sign = -1 if direction == "max" else 1
+        _finalize(gp, {"lr": 0.01, "activation": "tanh"}, np.arange(25.0))
+        X, y = gp.get_XY(interim_results=True, interim_results_interval=10)
+        # every 10th and the final result, with the normalized budget
+        np.testing.assert_allclose(y, sign * np.array([9.0, 19.0, 24.0]))
+        np.testing.assert_allclose(X[:, -1], [9 / 24, 19 / 24, 1.0])
+        np.testing.assert_allclose(
+            X[:, :-1],
+            np.tile(gp.searchspace.transform([0.01, "tanh"], True), (3, 1)),
+        )
+
+        # an early stopped trial, the results of the first one are kept
+        _finalize(gp, {"lr": 0.05, "activation": "relu"}, [3.0, 2.0])
+        X, y = gp.get_XY(interim_results=True, interim_results_interval=10)
+        np.testing.assert_allclose(y, sign * np.array([9.0, 19.0, 24.0, 2.0]))
+        np.testing.assert_allclose(X[:, -1], [9 / 24, 19 / 24, 1.0, 1 / 24])
+        assert len(gp._interim_XY) == 2
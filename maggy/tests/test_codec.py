@@ -0,0 +1,140 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import pytest
+import numpy as np
+from pyspark import cloudpickle
+
+from maggy.core import codec
+
+MESSAGES = [
+    {
+        "partition_id": 3,
+        "type": "METRIC",
+        "secret": "abcdef0123456789",
+        "trial_id": "3d1cc9fdb1d4d001",
+        "logs": "0: epoch 1\n",
+        "data": {"value": 0.93, "step": 4},
+    },
+    {
+        "partition_id": 0,
+        "type": "METRIC",
+        "secret": "abcdef0123456789",
+        "trial_id": None,
+        "logs": None,
+        "data": {"value": None, "step": -1},
+    },
+    {
+        "partition_id": 1,
+        "type": "FINAL",
+        "secret": "abcdef0123456789",
+        "trial_id": "3d1cc9fdb1d4d001",
+        "logs": None,
+        "data": 12,
+    },
+    {
+        "partition_id": 2,
+        "type": "METRIC",
+        "secret": "abcdef0123456789",
+        "trial_id": "3d1cc9fdb1d4d001",
+        "logs": None,
+        "data": [(4, 0.93), (5, 0.94), (6, 1)],
+    },
+    {"partition_id": 1, "type": "GET", "secret": "abcdef0123456789", "data": None},
+    {"partition_id": 1, "type": "GET", "secret": "abcdef0123456789", "data": 10},
+    {
+        "partition_id": 1,
+        "type": "GET",
+        "secret": "abcdef0123456789",
+        "data": 10,
+        "rid": 2**40,
+    },
+    {"type": "OK"},
+    {"type": "GSTOP"},
+    {"type": "QUERY", "data": True},
+    {"type": "STOP", "hb_interval": 2.5},
+    {"type": "TRIAL", "trial_id": None, "data": None},
+]
+
+
+@pytest.mark.parametrize("msg", MESSAGES)
+def test_struct_roundtrip(msg):
+    struct_codec = codec.get("struct")
+
+    data = struct_codec.encode(msg)
+
+    assert data[0] == codec.SCHEMA_VERSION
+    assert codec.decode(data) == msg
+    assert len(data) < len(cloudpickle.dumps(msg))
+
+
+def test_struct_fallback():
+    struct_codec = codec.get("struct")
+    msgs = [
+        # arbitrary trial params
+        {"type": "TRIAL", "trial_id": "3d1cc9fdb1d4d001", "data": {"lr": 0.1}},
+        # registration
+        {
+            "partition_id": 0,
+            "type": "REG",
+            "secret": "abcdef0123456789",
+            "data": {"partition_id": 0, "trial_id": None},
+            "codecs": ["struct", "pickle"],
+        },
+        # unknown key
+        {"type": "OK", "codec": "struct"},
+        # metric that doesn't fit the numeric field
+        {
+            "partition_id": 1,
+            "type": "FINAL",
+            "secret": "abcdef0123456789",
+            "trial_id": "3d1cc9fdb1d4d001",
+            "logs": None,
+            "data": True,
+        },
+        # heartbeat with other metric keys
+        {
+            "partition_id": 1,
+            "type": "METRIC",
+            "secret": "abcdef0123456789",
+            "trial_id": "3d1cc9fdb1d4d001",
+            "logs": None,
+            "data": {"loss": 0.93, "epoch": 4},
+        },
+    ]
+
+    for msg in msgs:
+        data = struct_codec.encode(msg)
+        assert data[0] == codec.PICKLE_MARKER
+        assert codec.decode(data) == msg
+
+
+def test_numpy_metric():
+    msg = dict(MESSAGES[2], data=np.float32(0.5))
+
+    decoded = codec.decode(codec.get("struct").encode(msg))
+
+    assert decoded["data"] == 0.5
+    assert isinstance(decoded["data"], float)
+
+
+def test_negotiate():
+    assert codec.negotiate(["struct", "pickle"]) == "struct"
+    assert codec.negotiate(["msgpack", "pickle"]) == "pickle"
+    assert codec.negotiate(None) == "pickle"
+
+    with pytest.raises(ValueError):
+        codec.get("msgpack")
@@ -0,0 +1,99 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import random
+import statistics
+
+import pytest
+
+from maggy.core.trialstore import FinalStore
+from maggy.earlystop import MedianStoppingRule
+from maggy.earlystop.medianrule import StepMedians
+from maggy.trial import Trial
+
+
+def _trial(x, metric_history):
+    trial = Trial({"x": x})
+    trial.metric_history = metric_history
+    return trial
+
+
+def _random_trial(x):
+    return _trial(x, [random.random() for _ in range(random.randint(1, 20))])
+
+
+def _median(finalized_trials, step):
+    return statistics.median(
+        sum(trial.metric_history[:step]) / float(step)
+        for trial in finalized_trials
+        if len(trial.metric_history) >= step
+    )
+
+
+def test_step_medians():
+    random.seed(0)
+    trials = [_random_trial(x) for x in range(50)]
+    medians = StepMedians()
+    for n in [1, 2, 10, 50]:
+        medians.extend(trials[:n])
+        assert medians.n_trials == n
+        for step in range(1, max(len(t.metric_history) for t in trials[:n]) + 1):
+            assert medians.median(step) == _median(trials[:n], step)
+
+    with pytest.raises(statistics.StatisticsError):
+        medians.median(21)
+
+
+@pytest.mark.parametrize("direction", ["min", "max"])
+def test_median_rule(direction):
+    random.seed(1)
+    store = FinalStore()
+    for i in range(100):
+        store.append(_random_trial(i))
+        to_check = _random_trial(-1)
+        step = len(to_check.metric_history)
+        if not any(len(t.metric_history) >= step for t in store):
+            with pytest.raises(Exception, match="StatisticsError"):
+                MedianStoppingRule.earlystop_check(to_check, store, direction)
+            continue
+
+        median = _median(store, step)
+        if direction == "max":
+            stop = max(to_check.metric_history) < median
+        else:
+            stop = min(to_check.metric_history) > median
+        expected = to_check.trial_id if stop else None
+        assert (
+            MedianStoppingRule.earlystop_check(to_check, store, direction) == expected
+        )
+
+    # plain lists are supported without caching the averages
+    for trials in [store[:10], store]:
+        to_check = _trial(-1, [0.5] * 5)
+        assert MedianStoppingRule.earlystop_check(
+            to_check, list(trials), direction
+        ) == MedianStoppingRule.earlystop_check(to_check, FinalStore(trials), direction)
+
+
+def test_median_rule_new_store():
+    old_store = FinalStore([_trial(0, [1.0, 1.0])])
+    assert MedianStoppingRule.earlystop_check(_trial(1, [0.0, 0.0]), old_store, "max")
+
+    # the averages of the last store are not reused
+    store = FinalStore([_trial(0, [-1.0, -1.0])])
+    assert (
+        MedianStoppingRule.earlystop_check(_trial(1, [0.0, 0.0]), store, "max") is None
+    )
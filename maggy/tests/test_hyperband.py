@@ -0,0 +1,169 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import pytest
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer import RandomSearch
+from maggy.trial import Trial
+
+
+def _optimizer(direction="min", pruner="hyperband", **pruner_kwargs):
+    kwargs = {"min_budget": 1, "max_budget": 9, "eta": 3, "n_iterations": 4}
+    kwargs.update(pruner_kwargs)
+    optimizer = RandomSearch(pruner=pruner, pruner_kwargs=kwargs)
+    optimizer.searchspace = Searchspace(x=("DOUBLE", [0, 10]))
+    optimizer.num_trials = optimizer.pruner.num_trials()
+    optimizer.direction = direction
+    optimizer.final_store = FinalStore()
+    optimizer.trial_store = TrialStore()
+    optimizer.initialize()
+    return optimizer
+
+
+def _run_experiment(optimizer, n_workers):
+    """Runs the optimizer like the experiment driver, the trials finish in the order they were started."""
+    running, started = [], []
+    finished_trial = None
+    while True:
+        suggestion = optimizer.get_suggestion(finished_trial)
+        finished_trial = None
+        if isinstance(suggestion, Trial):
+            running.append(suggestion)
+            started.append(suggestion)
+            if len(running) < n_workers:
+                continue
+        elif suggestion is None and not running:
+            return started
+        # an idle worker waits for a running trial to finish
+        assert running
+        finished_trial = running.pop(0)
+        finished_trial.final_metric = finished_trial.params["x"]
+        finished_trial.status = Trial.FINALIZED
+        optimizer.final_store.append(finished_trial)
+
+
+@pytest.mark.parametrize("n_workers", [1, 4])
+@pytest.mark.parametrize("direction", ["min", "max"])
+def test_hyperband_promotes_best_trials(n_workers, direction):
+    optimizer = _optimizer(direction=direction)
+    pruner = optimizer.pruner
+
+    started = _run_experiment(optimizer, n_workers)
+
+    assert len(started) == pruner.num_trials()
+    assert pruner.finished()
+    for iteration in pruner.iterations:
+        assert iteration.n_finished == iteration.n_configs
+        for rung in range(iteration.n_rungs - 1):
+            trial_ids = [t["actual_trial_id"] for t in iteration.configs[rung]]
+            metrics = optimizer.get_metrics_dict(trial_ids)
+            best = sorted(trial_ids, key=lambda trial_id: metrics[trial_id])[
+                : iteration.n_configs[rung + 1]
+            ]
+            promoted = [t["original_trial_id"] for t in iteration.configs[rung + 1]]
+            assert promoted == best
+            for config in iteration.configs[rung + 1]:
+                trial = optimizer.final_store.get(config["actual_trial_id"])
+                assert trial.info_dict["sample_type"] == "promoted"
+                assert trial.params["budget"] == iteration.budgets[rung + 1]
+                assert trial.info_dict["parent_trial_id"] == config["original_trial_id"]
+                assert trial.info_dict["parent_budget"] == iteration.budgets[rung]
+
+
+def test_hyperband_waits_for_rung():
+    optimizer = _optimizer(n_iterations=1)
+    pruner = optimizer.pruner
+
+    first_rung = [optimizer.get_suggestion() for _ in range(9)]
+    assert all(isinstance(trial, Trial) for trial in first_rung)
+    assert optimizer.get_suggestion() == "IDLE"
+
+    for trial in first_rung[:-1]:
+        trial.final_metric = trial.params["x"]
+        optimizer.final_store.append(trial)
+        assert optimizer.get_suggestion(trial) == "IDLE"
+    assert pruner.iterations[0].n_finished[0] == 8
+
+    trial = first_rung[-1]
+    trial.final_metric = trial.params["x"]
+    optimizer.final_store.append(trial)
+    promoted = optimizer.get_suggestion(trial)
+    assert promoted.info_dict["sample_type"] == "promoted"
+    assert pruner.iterations[0].current_rung == 1
+    assert pruner.metrics == {t.trial_id: t.params["x"] for t in first_rung}
+
+
+@pytest.mark.parametrize("n_workers", [1, 4])
+def test_async_hyperband_runs_all_trials(n_workers):
+    optimizer = _optimizer(pruner="async_hyperband")
+    pruner = optimizer.pruner
+
+    started = _run_experiment(optimizer, n_workers)
+
+    assert len(started) == pruner.num_trials()
+    assert pruner.finished()
+    for iteration in pruner.iterations:
+        assert iteration.n_finished == iteration.n_configs
+        for rung in range(1, iteration.n_rungs):
+            for config in iteration.configs[rung]:
+                trial = optimizer.final_store.get(config["actual_trial_id"])
+                assert trial.info_dict["sample_type"] == "promoted"
+                assert trial.params["budget"] == iteration.budgets[rung]
+                assert trial.info_dict["parent_trial_id"] == config["original_trial_id"]
+                assert trial.info_dict["parent_budget"] == iteration.budgets[rung - 1]
+
+
+def test_async_hyperband_promotes_early():
+    optimizer = _optimizer(pruner="async_hyperband", n_iterations=1)
+    pruner = optimizer.pruner
+
+    first_rung = [optimizer.get_suggestion() for _ in range(9)]
+    assert all(isinstance(trial, Trial) for trial in first_rung)
+    assert optimizer.get_suggestion() == "IDLE"
+
+    for trial in first_rung[:2]:
+        trial.final_metric = trial.params["x"]
+        optimizer.final_store.append(trial)
+        assert optimizer.get_suggestion(trial) == "IDLE"
+
+    # the best of three finished trials ranks in the top 1/eta
+    trial = first_rung[2]
+    trial.final_metric = trial.params["x"]
+    optimizer.final_store.append(trial)
+    promoted = optimizer.get_suggestion(trial)
+    best = min(first_rung[:3], key=lambda trial: trial.params["x"])
+    assert promoted.info_dict["sample_type"] == "promoted"
+    assert promoted.params == dict(best.params, budget=3)
+    assert pruner.iterations[0].configs[1] == [
+        {"original_trial_id": best.trial_id, "actual_trial_id": promoted.trial_id}
+    ]
+    assert optimizer.get_suggestion() == "IDLE"
+
+
+def test_get_metrics_dict():
+    optimizer = _optimizer(direction="max")
+    trials = [Trial({"x": float(x)}) for x in range(3)]
+    for trial in trials:
+        trial.final_metric = trial.params["x"]
+        optimizer.final_store.append(trial)
+
+    trial_id = trials[1].trial_id
+    assert optimizer.get_metrics_dict(trial_id) == {trial_id: -1.0}
+    assert optimizer.get_metrics_dict([trial_id, "missing"]) == {trial_id: -1.0}
+    assert optimizer.get_metrics_dict() == {t.trial_id: -t.params["x"] for t in trials}
+    assert optimizer.get_hparams_dict(trial_id) == {trial_id: {"x": 1.0}}
@@ -0,0 +1,110 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import pytest
+from skopt.learning.gaussian_process import GaussianProcessRegressor
+from skopt.learning.gaussian_process.kernels import ConstantKernel, Matern
+
+from maggy.optimizer.bayes.incremental_gp import IncrementalGaussianProcess
+
+
+def _data(n, n_dims=3, seed=0):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(n, n_dims)
+    return X, np.sin(3 * X.sum(axis=1)) + 0.1 * rng.randn(n)
+
+
+def _regressor(n_dims=3):
+    return GaussianProcessRegressor(
+        kernel=ConstantKernel(1.0, (0.01, 1000.0))
+        * Matern(
+            length_scale=np.ones(n_dims),
+            length_scale_bounds=[(0.01, 100)] * n_dims,
+            nu=2.5,
+        ),
+        normalize_y=True,
+        noise="gaussian",
+        random_state=0,
+    )
+
+
+def _assert_same_posterior(model, regressor, X_test):
+    for expected, actual in zip(
+        regressor.predict(X_test, return_std=True),
+        model.predict(X_test, return_std=True),
+    ):
+        np.testing.assert_allclose(actual, expected, atol=1e-8)
+    for expected, actual in zip(
+        regressor.predict(
+            X_test[:1], return_std=True, return_mean_grad=True, return_std_grad=True
+        ),
+        model.predict(
+            X_test[:1], return_std=True, return_mean_grad=True, return_std_grad=True
+        ),
+    ):
+        np.testing.assert_allclose(actual, expected, atol=1e-8)
+    np.testing.assert_allclose(
+        model.sample_y(X_test), regressor.sample_y(X_test), atol=1e-6
+    )
+
+
+def test_incremental_updates():
+    X, y = _data(40)
+    X_test, _ = _data(5, seed=1)
+    regressor = _regressor().fit(X, y)
+
+    model = IncrementalGaussianProcess.from_regressor(regressor).fit(X[:10], y[:10])
+    model.add(X[10:30], y[10:30])
+    for i in range(30, 40):
+        model.add(X[i : i + 1], y[i : i + 1])
+
+    assert model.n_observations == 40
+    _assert_same_posterior(model, regressor, X_test)
+
+
+def test_liars():
+    X, y = _data(30)
+    X_busy, _ = _data(3, seed=2)
+    y_busy = np.full(3, y.min())
+    X_test, _ = _data(5, seed=1)
+    regressor = _regressor().fit(X, y)
+
+    model = IncrementalGaussianProcess.from_regressor(regressor).fit(X[:20], y[:20])
+    model.set_liars(X[25:], np.zeros(5))
+    # new observations replace the liars
+    model.add(X[20:], y[20:])
+    model.set_liars(X_busy, y_busy)
+    assert model.n_observations == 30
+    assert len(model.X_train_) == 33
+
+    # same as a new factorization of observations and liars
+    refit = IncrementalGaussianProcess.from_regressor(regressor).fit(
+        np.vstack((X, X_busy)), np.concatenate((y, y_busy))
+    )
+    _assert_same_posterior(model, refit, X_test)
+
+    model.set_liars(np.empty((0, 3)), np.empty(0))
+    _assert_same_posterior(model, regressor, X_test)
+
+
+def test_predict_validation():
+    X, y = _data(10)
+    model = IncrementalGaussianProcess.from_regressor(_regressor().fit(X, y)).fit(X, y)
+    with pytest.raises(ValueError):
+        model.predict(X[:2], return_std=True, return_mean_grad=True)
+    with pytest.raises(RuntimeError):
+        model.predict(X, return_std=True, return_cov=True)
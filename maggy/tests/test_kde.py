@@ -0,0 +1,86 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import pytest
+
+from maggy.optimizer.bayes.kde import KernelDensity
+
+
+def _data(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return np.column_stack(
+        [rng.rand(n), rng.beta(2, 5, n), rng.randint(0, 3, n), rng.randint(0, 4, n)]
+    )
+
+
+@pytest.mark.parametrize("bw", KernelDensity.BW_METHODS)
+def test_same_as_statsmodels(bw):
+    sm = pytest.importorskip("statsmodels.api")
+    data, X = _data(40), _data(30, seed=1)
+
+    expected = sm.nonparametric.KDEMultivariate(data=data, var_type="ccuu", bw=bw)
+    kde = KernelDensity(data, "ccuu", bw=bw)
+
+    np.testing.assert_allclose(kde.bw, expected.bw, rtol=1e-8)
+    np.testing.assert_allclose(kde.pdf(X), expected.pdf(X), rtol=1e-8)
+
+
+def test_pdf_integrates_to_one():
+    data = _data(30)
+    kde = KernelDensity(data[:, [0, 2]], "cu", num_levels=[0, 5])
+
+    # numerical integral over the continuous variable, sum over the categories
+    grid = np.linspace(-1, 2, 3001)
+    X = np.array([[x, c] for c in range(5) for x in grid])
+    integral = kde.pdf(X).sum() * (grid[1] - grid[0])
+    assert integral == pytest.approx(1.0, abs=1e-3)
+
+
+def test_add():
+    data = _data(60)
+    for bw in ["normal_reference", "cv_ml"]:
+        kde = KernelDensity(data[:40], "ccuu", bw=bw).add(data[40:])
+        refit = KernelDensity(data, "ccuu", bw=bw)
+
+        assert kde.nobs == 60
+        np.testing.assert_allclose(kde.bw, refit.bw, rtol=1e-2)
+        np.testing.assert_allclose(kde.pdf(data), refit.pdf(data), rtol=1e-2)
+
+
+def test_single_category():
+    data = _data(30)
+    data[:, 3] = 0
+    X = _data(20, seed=1)
+    X[:, 3] = 0
+    for bw in KernelDensity.BW_METHODS:
+        kde = KernelDensity(data, "ccuu", bw=bw, num_levels=[0, 0, 3, 1])
+        # same density as without the variable
+        expected = KernelDensity(
+            data[:, :3], "ccu", bw=kde.bw[:3], num_levels=[0, 0, 3]
+        )
+        assert np.all(np.isfinite(kde.pdf(X)))
+        np.testing.assert_allclose(kde.pdf(X), expected.pdf(X[:, :3]))
+
+
+def test_validation():
+    data = _data(10)
+    with pytest.raises(ValueError):
+        KernelDensity(data, "ccuo")
+    with pytest.raises(ValueError):
+        KernelDensity(data, "ccuu", bw="scott")
+    with pytest.raises(ValueError):
+        KernelDensity(data[:4], "ccuu")
@@ -0,0 +1,78 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+
+from maggy.core.experiment_driver.message_queue import MessageQueue
+
+
+def _msg(msg_type, partition_id, **kwargs):
+    return dict(kwargs, type=msg_type, partition_id=partition_id)
+
+
+def test_control_before_telemetry():
+    q = MessageQueue()
+    q.put(_msg("METRIC", 0, step=0))
+    q.put(_msg("METRIC", 1, step=0))
+    q.put(_msg("METRIC", 0, step=1))
+    q.put(_msg("REG", 2))
+    q.put(_msg("FINAL", 1))
+    assert q.qsize() == 5
+
+    assert q.get() == _msg("REG", 2)
+    # the telemetry the executor sent before FINAL is handed out with it
+    assert q.get() == _msg("FINAL", 1, telemetry=[_msg("METRIC", 1, step=0)])
+    assert q.get() == _msg("METRIC", 0, step=0)
+    assert q.get() == _msg("METRIC", 0, step=1)
+    assert q.qsize() == 0
+    assert q.get(timeout=0.01) is None
+
+
+def test_telemetry_round_robin():
+    q = MessageQueue()
+    for step in range(3):
+        q.put(_msg("METRIC", 0, step=step))
+    q.put(_msg("METRIC", 1, step=0))
+
+    assert [(m["partition_id"], m["step"]) for m in [q.get() for _ in range(4)]] == [
+        (0, 0),
+        (1, 0),
+        (0, 1),
+        (0, 2),
+    ]
+
+
+def test_delayed_put():
+    q = MessageQueue()
+    start = time.time()
+    q.put(_msg("IDLE", 0), delay=0.1)
+    assert q.qsize() == 0
+    assert q.get(timeout=0.01) is None
+    assert q.get() == _msg("IDLE", 0)
+    assert time.time() - start >= 0.1
+
+
+def test_close_wakes_consumer():
+    q = MessageQueue()
+    result = []
+    t = threading.Thread(target=lambda: result.append(q.get()))
+    t.start()
+    time.sleep(0.05)
+    q.close()
+    t.join(1)
+    assert not t.is_alive()
+    assert result == [None]
@@ -0,0 +1,239 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+
+import pytest
+
+from maggy.core.experiment_driver.optimization import Driver
+from maggy.core.experiment_driver.prefetch import SuggestionPrefetcher
+from maggy.core.trialstore import TrialStore
+from maggy.optimizer import Asha, RandomSearch
+from maggy.trial import Trial
+
+
+class _Optimizer(object):
+    def __init__(self, num_trials, delay=0.0, sample_type="model"):
+        self.num_trials = num_trials
+        self.delay = delay
+        self.sample_type = sample_type
+        self.final_store = []
+        self.calls = 0
+
+    def get_suggestion(self, trial=None):
+        time.sleep(self.delay)
+        if self.calls == self.num_trials:
+            return None
+        self.calls += 1
+        return Trial({"x": self.calls}, info_dict={"sample_type": self.sample_type})
+
+
+def _wait_for(condition, timeout=2.0):
+    start = time.time()
+    while not condition():
+        assert time.time() - start < timeout
+        time.sleep(0.01)
+
+
+def _prefetcher(optimizer, size, max_suggestions=10):
+    prefetcher = SuggestionPrefetcher(
+        optimizer.get_suggestion,
+        lambda: len(optimizer.final_store),
+        size,
+        max_suggestions,
+    )
+    prefetcher.start()
+    return prefetcher
+
+
+def test_prefetch():
+    optimizer = _Optimizer(10, delay=0.1)
+    prefetcher = _prefetcher(optimizer, 2)
+    try:
+        _wait_for(lambda: optimizer.calls == 2)
+        time.sleep(0.15)
+        # the buffer stays at its size
+        assert optimizer.calls == 2
+
+        start = time.time()
+        assert prefetcher.get().params == {"x": 1}
+        assert time.time() - start < 0.05
+        # consuming a suggestion refills the buffer
+        _wait_for(lambda: optimizer.calls == 3)
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetch_stale():
+    optimizer = _Optimizer(10)
+    prefetcher = _prefetcher(optimizer, 2)
+    try:
+        _wait_for(lambda: optimizer.calls == 2)
+        optimizer.final_store.append(None)
+        # suggestions which missed one result are still handed out
+        assert prefetcher.get().params == {"x": 1}
+        optimizer.final_store.append(None)
+        # older ones are dropped and computed again
+        _wait_for(lambda: optimizer.calls == 4)
+        assert prefetcher.get().params == {"x": 3}
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetch_random_not_stale():
+    optimizer = _Optimizer(10, sample_type="random")
+    prefetcher = _prefetcher(optimizer, 1)
+    try:
+        _wait_for(lambda: optimizer.calls == 1)
+        optimizer.final_store.extend([None, None])
+        assert prefetcher.get().params == {"x": 1}
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetch_limit():
+    optimizer = _Optimizer(3)
+    prefetcher = _prefetcher(optimizer, 2, max_suggestions=2)
+    try:
+        assert [prefetcher.get().params["x"] for _ in range(2)] == [1, 2]
+        time.sleep(0.05)
+        assert optimizer.calls == 2
+        # beyond the limit suggestions are computed when needed
+        assert prefetcher.get().params == {"x": 3}
+        assert prefetcher.get() is None
+    finally:
+        prefetcher.stop()
+
+
+class _DedupOptimizer(_Optimizer):
+    """Suggests the smallest x that isn't busy, like the duplicate checks of
+    the optimizers it only sees the trials in the trial store."""
+
+    def __init__(self, num_trials):
+        super().__init__(num_trials)
+        self.trial_store = TrialStore()
+
+    def get_suggestion(self, trial=None):
+        if self.calls == self.num_trials:
+            return None
+        self.calls += 1
+        x = 1
+        while self.trial_store.select(
+            fingerprint=Trial._generate_fingerprint({"x": x})
+        ):
+            x += 1
+        return Trial({"x": x}, info_dict={"sample_type": "model"})
+
+
+def test_prefetch_buffer_in_trial_store():
+    optimizer = _DedupOptimizer(10)
+    prefetcher = SuggestionPrefetcher(
+        optimizer.get_suggestion,
+        lambda: len(optimizer.final_store),
+        3,
+        10,
+        trial_store=optimizer.trial_store,
+    )
+    prefetcher.start()
+    try:
+        _wait_for(lambda: optimizer.calls == 3)
+        # the buffered suggestions are pending trials, so there are no duplicates
+        busy = optimizer.trial_store.select(sample_type="model")
+        assert [trial.params["x"] for trial in busy] == [1, 2, 3]
+        assert all(trial.status == Trial.PENDING for trial in busy)
+
+        assert prefetcher.get().params == {"x": 1}
+        _wait_for(lambda: optimizer.calls == 4)
+        assert prefetcher.get().params == {"x": 2}
+
+        # stale suggestions leave the store, trials handed out stay until
+        # they finish
+        _wait_for(lambda: optimizer.calls == 5)
+        optimizer.trial_store.pop(busy[0].trial_id)
+        optimizer.final_store.extend([None, None])
+        assert prefetcher.get().params == {"x": 1}
+        _wait_for(lambda: optimizer.calls == 9)
+        assert sorted(
+            trial.params["x"] for trial in optimizer.trial_store.values()
+        ) == [1, 2, 3, 4, 5]
+    finally:
+        prefetcher.stop()
+    # stopping drops the buffered suggestions from the store
+    remaining = [trial.params["x"] for trial in optimizer.trial_store.values()]
+    assert sorted(remaining) == [1, 2]
+
+
+class _ReadingOptimizer(_Optimizer):
+    """Reads the number of results twice, like the separate reads of the
+    hparams and metrics of a model fit."""
+
+    def get_suggestion(self, trial=None):
+        n_hparams = len(self.final_store)
+        time.sleep(0.005)
+        if len(self.final_store) != n_hparams:
+            raise ValueError("X and y have different lengths")
+        return super().get_suggestion(trial)
+
+
+def test_prefetch_concurrent_results():
+    optimizer = _ReadingOptimizer(100)
+    lock = threading.RLock()
+    prefetcher = SuggestionPrefetcher(
+        optimizer.get_suggestion,
+        lambda: len(optimizer.final_store),
+        2,
+        100,
+        lock=lock,
+    )
+    prefetcher.start()
+    try:
+        # the worker thread finalizes trials while suggestions are computed
+        for _ in range(30):
+            with lock:
+                optimizer.final_store.append(None)
+            assert isinstance(prefetcher.get(), Trial)
+            time.sleep(0.002)
+        assert prefetcher.exception is None
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetch_exception():
+    def _fail(trial=None):
+        raise ValueError("no suggestion")
+
+    prefetcher = SuggestionPrefetcher(_fail, lambda: 0, 1, 10)
+    prefetcher.start()
+    with pytest.raises(ValueError, match="no suggestion"):
+        prefetcher.get()
+
+
+def test_prefetch_not_supported():
+    # skips the setup of the experiment's logs
+    driver = Driver.__new__(Driver)
+    driver.controller = Asha(3, 1, 9)
+    # ASHA only promotes with the finished trials, which the prefetched
+    # suggestions don't get
+    with pytest.raises(Exception, match="not supported for ASHA"):
+        driver._init_prefetcher(2)
+
+    driver.controller = RandomSearch(
+        pruner="hyperband",
+        pruner_kwargs={"min_budget": 1, "max_budget": 9, "eta": 3, "n_iterations": 1},
+    )
+    with pytest.raises(Exception, match="with a pruner"):
+        driver._init_prefetcher(2)
@@ -0,0 +1,507 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from maggy.core import codec, rpc
+from maggy.trial import Trial
+
+
+def test_receive_fragmented_frame():
+    msg = {"type": "OK", "ex_logs": "x" * (3 * 1024 * 1024)}
+    data = codec.DEFAULT.encode(msg)
+    frame = struct.pack(">I", len(data)) + data
+
+    def _send_fragmented(sock):
+        # split the length header itself across two sends
+        sock.sendall(frame[:2])
+        for i in range(2, len(frame), 65536):
+            sock.sendall(frame[i : i + 65536])
+
+    reader, writer = socket.socketpair()
+    t = threading.Thread(target=_send_fragmented, args=(writer,))
+    t.start()
+    try:
+        assert rpc.MessageSocket().receive(reader) == msg
+    finally:
+        t.join()
+        reader.close()
+        writer.close()
+
+
+def test_receive_max_frame_size():
+    receiver = rpc.MessageSocket()
+    receiver.max_frame_size = 16
+
+    reader, writer = socket.socketpair()
+    try:
+        writer.sendall(struct.pack(">I", 17) + b"\x00" * 17)
+        with pytest.raises(Exception, match="maximum frame size"):
+            receiver.receive(reader)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_receive_closed_socket():
+    reader, writer = socket.socketpair()
+    writer.sendall(struct.pack(">I", 8) + b"\x80")
+    writer.close()
+    try:
+        with pytest.raises(Exception, match="socket closed"):
+            rpc.MessageSocket().receive(reader)
+    finally:
+        reader.close()
+
+
+class _Reporter(object):
+    lock = threading.RLock()
+
+    def __init__(self, history=None):
+        self.history = history or []
+        self.stop = False
+
+    def get_data(self):
+        return None, -1, ""
+
+    def get_history(self):
+        history, self.history = self.history, []
+        return history, ""
+
+    def early_stop(self):
+        self.stop = True
+
+    def get_trial_id(self):
+        return None
+
+    def reset(self):
+        pass
+
+    def log(self, log_msg, jupyter=False):
+        pass
+
+
+class _Driver(object):
+    _secret = "abcdef0123456789"
+    experiment_done = False
+
+    def __init__(self):
+        self.messages = []
+        self.trials = {}
+
+    def add_message(self, msg):
+        self.messages.append(msg)
+
+    def get_trial(self, trial_id):
+        return self.trials[trial_id]
+
+    def _log(self, log_msg):
+        pass
+
+
+def _wait_for(condition, timeout=2.0):
+    start = time.time()
+    while not condition():
+        assert time.time() - start < timeout
+        time.sleep(0.01)
+
+
+def _preset_server_address():
+    # presetting the address skips the registration with Hopsworks
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    rpc.server_host_port = sock.getsockname()
+    sock.close()
+
+
+@pytest.mark.parametrize("server_cls", [rpc.Server, rpc.AsyncServer])
+def test_server_backends(server_cls):
+    _preset_server_address()
+    driver = _Driver()
+    server = server_cls(1)
+    server_addr = server.start(driver)
+    client = rpc.Client(server_addr, 0, 0, 1, driver._secret)
+    try:
+        resp = client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        assert resp["type"] == "OK"
+        assert server.reservations.done()
+        assert client._request(client.sock, "GET") == {
+            "type": "TRIAL",
+            "trial_id": None,
+            "data": None,
+        }
+        assert client._request(client.hb_sock, "METRIC", None, None, None) == {
+            "type": "OK"
+        }
+        assert [msg["type"] for msg in driver.messages] == ["REG", "METRIC"]
+
+        # connections with a wrong secret get closed
+        client._secret = "wrong"
+        with pytest.raises(Exception):
+            client._request(client.sock, "GET")
+    finally:
+        client.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+@pytest.mark.parametrize("server_cls", [rpc.Server, rpc.AsyncServer])
+def test_get_promoted_trial(server_cls):
+    _preset_server_address()
+    driver = _Driver()
+    driver.trials["t1"] = Trial({"x": 1, "budget": 1})
+    driver.trials["t2"] = Trial(
+        {"x": 1, "budget": 3}, info_dict={"parent_trial_id": "t1", "parent_budget": 1}
+    )
+    server = server_cls(1)
+    server_addr = server.start(driver)
+    client = rpc.Client(server_addr, 0, 0, 1, driver._secret)
+    reporter = _Reporter()
+    try:
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        server.reservations.assign_trial(0, "t2")
+        assert client.get_suggestion(reporter) == ("t2", {"x": 1, "budget": 3})
+        assert client.resume == {"trial_id": "t1", "budget": 1}
+
+        # trials starting from scratch don't resume
+        client.finalize_metric(0.5, reporter)
+        server.reservations.assign_trial(0, "t1")
+        assert client.get_suggestion(reporter) == ("t1", {"x": 1, "budget": 1})
+        assert client.resume is None
+    finally:
+        client.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+@pytest.mark.parametrize("server_cls", [rpc.Server, rpc.AsyncServer])
+def test_long_poll(server_cls):
+    _preset_server_address()
+    driver = _Driver()
+    driver.trials["t1"] = Trial({"x": 1})
+    server = server_cls(1)
+    server_addr = server.start(driver)
+    client = rpc.Client(server_addr, 0, 0, 1, driver._secret)
+    reporter = _Reporter()
+    try:
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        assert client.long_poll
+        client.finalize_metric(0.5, reporter)
+
+        # the pending GET is answered as soon as the trial gets assigned
+        timer = threading.Timer(0.2, server.reservations.assign_trial, (0, "t1"))
+        timer.start()
+        start = time.time()
+        assert client.get_suggestion(reporter) == ("t1", {"x": 1})
+        assert time.time() - start < 0.9
+        assert 0.2 <= driver.trials["t1"].info_dict["assignment_latency"] < 0.9
+        assert driver.trials["t1"].status == Trial.RUNNING
+
+        # requests without a trial expire and are answered with an empty trial
+        client.finalize_metric(0.7, reporter)
+        assert client._request(client.sock, "GET", 0.1)["trial_id"] is None
+
+        # finishing the experiment stops waiting executors
+        driver.experiment_done = True
+        timer = threading.Timer(0.2, server.reservations.assign_trial, (0, None))
+        timer.start()
+        assert client.get_suggestion(reporter) == (None, None)
+        assert client.done
+    finally:
+        client.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+def test_batched_heartbeat():
+    _preset_server_address()
+    driver = _Driver()
+    server = rpc.Server(1)
+    server_addr = server.start(driver)
+    client = rpc.Client(server_addr, 0, 0, 0.05, driver._secret)
+    reporter = _Reporter([(0, 0.1), (1, 0.2), (2, 0.3)])
+    try:
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        assert client.batch_metrics
+
+        # the driver sets the interval with the response to a heartbeat
+        server.set_hb_interval(0, 0.02)
+        client.start_heartbeat(reporter)
+        time.sleep(0.5)
+        assert client.hb_interval == 0.02
+
+        metrics = [msg for msg in driver.messages if msg["type"] == "METRIC"]
+        assert metrics[0]["data"] == [(0, 0.1), (1, 0.2), (2, 0.3)]
+        # empty beats are skipped, only backed off keepalives are sent
+        assert 2 <= len(metrics) < 8
+        assert all(msg["data"] == [] for msg in metrics[1:])
+    finally:
+        client.stop()
+        client.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+class _FaultyProxy(object):
+    """TCP proxy between client and server which delays data and drops
+    connections on request."""
+
+    def __init__(self, server_addr):
+        self.server_addr = server_addr
+        self.delay = 0
+        # drop the connection instead of forwarding the next response
+        self.drop_response = threading.Event()
+        self.num_dropped = 0
+        self.num_connections = 0
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(10)
+        self.addr = self.listener.getsockname()
+        t = threading.Thread(target=self._accept)
+        t.daemon = True
+        t.start()
+
+    def _accept(self):
+        while True:
+            try:
+                client_sock, _ = self.listener.accept()
+            except OSError:
+                return
+            self.num_connections += 1
+            server_sock = socket.create_connection(self.server_addr)
+            for src, dst, is_response in [
+                (client_sock, server_sock, False),
+                (server_sock, client_sock, True),
+            ]:
+                t = threading.Thread(target=self._pump, args=(src, dst, is_response))
+                t.daemon = True
+                t.start()
+
+    def _pump(self, src, dst, is_response):
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                time.sleep(self.delay)
+                if is_response and self.drop_response.is_set():
+                    self.drop_response.clear()
+                    self.num_dropped += 1
+                    break
+                dst.sendall(data)
+        except OSError:
+            pass
+        # shutdown wakes up the pump blocked on the other direction
+        for sock in (src, dst):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def close(self):
+        self.listener.close()
+
+
+def test_reconnect_with_resume():
+    _preset_server_address()
+    driver = _Driver()
+    driver.trials["t1"] = Trial({"x": 1})
+    server = rpc.Server(1)
+    proxy = _FaultyProxy(server.start(driver))
+    client = rpc.Client(proxy.addr, 0, 0, 1, driver._secret)
+    reporter = _Reporter()
+    try:
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        server.reservations.assign_trial(0, "t1")
+        assert client.get_suggestion(reporter) == ("t1", {"x": 1})
+
+        # the connection breaks while the trial is running, the executor
+        # registers again and keeps its trial
+        proxy.delay = 0.05
+        proxy.drop_response.set()
+        resp = client._request(client.hb_sock, "METRIC", [(0, 0.5)], "t1", None)
+        assert resp["type"] == "OK"
+        assert proxy.num_dropped == 1
+        assert server.get_assigned_trial_id(0) == "t1"
+        assert driver.trials["t1"].status == Trial.RUNNING
+
+        # the response to FINAL gets lost, the retry is not processed again
+        proxy.drop_response.set()
+        assert client.finalize_metric(0.5, reporter)["type"] == "OK"
+        assert proxy.num_dropped == 2
+        assert client.trial_id is None
+        assert [msg["type"] for msg in driver.messages] == ["REG", "METRIC", "FINAL"]
+        assert server.get_assigned_trial_id(0) is None
+    finally:
+        client.close()
+        proxy.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+@pytest.mark.parametrize("server_cls", [rpc.Server, rpc.AsyncServer])
+def test_new_task_attempt(server_cls):
+    _preset_server_address()
+    driver = _Driver()
+    driver.trials["t1"] = Trial({"x": 1})
+    driver.trials["t2"] = Trial({"x": 2})
+    server = server_cls(1)
+    server_addr = server.start(driver)
+    client = rpc.Client(server_addr, 0, 0, 1, driver._secret)
+    retry = rpc.Client(server_addr, 0, 1, 1, driver._secret)
+    reporter = _Reporter()
+    try:
+        # request ids of different clients don't collide
+        assert client._rid != retry._rid
+        # the retried task reuses the request ids of the failed one
+        client._rid = retry._rid = 0
+
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        server.reservations.assign_trial(0, "t1")
+        assert client.get_suggestion(reporter) == ("t1", {"x": 1})
+        client._request(client.hb_sock, "METRIC", [(0, 0.5)], "t1", None)
+
+        # the requests of the retried task are still processed and the lost
+        # trial is blacklisted
+        resp = retry.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 1, "trial_id": None}
+        )
+        assert resp["type"] == "OK"
+        assert driver.trials["t1"].status == Trial.ERROR
+        assert server.reservations.get()[0]["task_attempt"] == 1
+        assert [msg["type"] for msg in driver.messages] == ["REG", "METRIC", "BLACK"]
+
+        server.reservations.assign_trial(0, "t2")
+        assert retry.get_suggestion(reporter) == ("t2", {"x": 2})
+        retry._request(retry.hb_sock, "METRIC", [(0, 0.7)], "t2", None)
+        assert retry.finalize_metric(0.7, reporter)["type"] == "OK"
+        assert [msg["type"] for msg in driver.messages[3:]] == ["METRIC", "FINAL"]
+        assert driver.messages[-1]["data"] == 0.7
+    finally:
+        client.close()
+        retry.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+@pytest.mark.parametrize("server_cls", [rpc.Server, rpc.AsyncServer])
+def test_multiplex(server_cls):
+    _preset_server_address()
+    driver = _Driver()
+    driver.trials["t1"] = Trial({"x": 1})
+    server = server_cls(1, multiplex=True)
+    proxy = _FaultyProxy(server.start(driver))
+    client = rpc.Client(proxy.addr, 0, 0, 1, driver._secret)
+    reporter = _Reporter()
+    try:
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        assert client.hb_sock is client.sock
+        assert proxy.num_connections == 1
+
+        # heartbeats are answered while the GET is waiting for a trial
+        timer = threading.Timer(0.3, server.reservations.assign_trial, (0, "t1"))
+        timer.start()
+        result = {}
+        t = threading.Thread(
+            target=lambda: result.update(trial=client.get_suggestion(reporter))
+        )
+        t.start()
+        time.sleep(0.1)
+        start = time.time()
+        resp = client._request(client.hb_sock, "METRIC", [(0, 0.5)], "t1", None)
+        assert resp["type"] == "OK"
+        assert time.time() - start < 0.2
+        t.join()
+        assert result["trial"] == ("t1", {"x": 1})
+
+        # a lost response breaks the shared connection, pending requests are
+        # retried on the new one
+        proxy.drop_response.set()
+        assert client.finalize_metric(0.5, reporter)["type"] == "OK"
+        assert proxy.num_dropped == 1
+        assert proxy.num_connections == 2
+        assert [msg["type"] for msg in driver.messages] == [
+            "REG",
+            "METRIC",
+            "FINAL",
+        ]
+    finally:
+        client.close()
+        proxy.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+def test_async_server_closed_connection():
+    _preset_server_address()
+    driver = _Driver()
+    server = rpc.AsyncServer(1, multiplex=True)
+    server_addr = server.start(driver)
+    client = rpc.Client(server_addr, 0, 0, 1, driver._secret)
+    sock = socket.create_connection(server_addr)
+    try:
+        client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        # a GET waits for a trial on a multiplexed connection, which closes
+        rpc.MessageSocket().send(sock, client._message("GET", 5), tag=1)
+        _wait_for(lambda: 0 in server.parked)
+        sock.close()
+        _wait_for(lambda: 0 not in server.parked)
+    finally:
+        client.close()
+        server.stop()
+        rpc.server_host_port = None
+
+
+def test_multiplex_declined():
+    _preset_server_address()
+    driver = _Driver()
+    server = rpc.Server(1)
+    client = rpc.Client(server.start(driver), 0, 0, 1, driver._secret)
+    try:
+        resp = client.register(
+            {"partition_id": 0, "host_port": None, "task_attempt": 0, "trial_id": None}
+        )
+        assert "mux" not in resp
+        assert client.hb_sock is not client.sock
+        assert client._request(client.hb_sock, "METRIC", [], None, None) == {
+            "type": "OK"
+        }
+    finally:
+        client.close()
+        server.stop()
+        rpc.server_host_port = None
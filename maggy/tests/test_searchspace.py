@@ -18,6 +18,8 @@ import pytest
 import time
 import random
 
+import numpy as np
+
 from maggy import Searchspace
 
 
@@ -75,3 +77,92 @@ def test_searchspace_add():
         # Non numeric interval boundaries
         sp.add("param2", ("DOUBLE", ["lower", 5]))
     assert "type DOUBLE need to be integer or float:" in str(excinfo.value)
+
+
+def test_searchspace_random_parameter_array():
+
+    sp = Searchspace(
+        x=("DOUBLE", [-3, 3]),
+        y=("INTEGER", [2, 6]),
+        z=("CATEGORICAL", ["red", "green", 1]),
+    )
+
+    configs = sp.get_random_parameter_array(1000, rng=0)
+    assert configs.shape == (1000, 3)
+    assert all(-3 <= x <= 3 and isinstance(x, float) for x in configs[:, 0])
+    assert set(configs[:, 1]) == {2, 3, 4, 5, 6}
+    assert all(isinstance(y, int) for y in configs[:, 1])
+    assert set(configs[:, 2]) == {"red", "green", 1}
+
+    # same seed, same configs
+    assert (configs == sp.get_random_parameter_array(1000, rng=0)).all()
+
+    transformed = sp.get_random_parameter_array(
+        1000, transformed=True, normalize_categorical=True, rng=0
+    )
+    assert transformed.dtype == float
+    assert ((transformed >= 0) & (transformed <= 1)).all()
+    assert set(transformed[:, 1]) == {0.0, 0.25, 0.5, 0.75, 1.0}
+    assert set(transformed[:, 2]) == {0.0, 0.5, 1.0}
+    # transformed samples are valid transformed configs
+    for config in transformed[:10]:
+        assert sp.transform(
+            sp.inverse_transform(config, normalize_categorical=True),
+            normalize_categorical=True,
+        ) == pytest.approx(config)
+
+    encoded = sp.get_random_parameter_array(100, transformed=True)
+    assert set(encoded[:, 2]) <= {0.0, 1.0, 2.0}
+
+    with pytest.raises(NotImplementedError):
+        Searchspace(d=("DISCRETE", [1, 2])).get_random_parameter_array(
+            1, transformed=True
+        )
+
+
+def test_searchspace_transform_array():
+
+    sp = Searchspace(
+        x=("DOUBLE", [-3, 3]),
+        y=("INTEGER", [2, 6]),
+        z=("CATEGORICAL", ["red", "green", "blue"]),
+        w=("CATEGORICAL", [0.1, "a", 3]),
+    )
+
+    for normalize_categorical in [False, True]:
+        configs = sp.get_random_parameter_array(200, rng=1)
+        transformed = sp.transform_array(
+            configs, normalize_categorical=normalize_categorical
+        )
+        assert transformed.dtype == np.float64
+        # same as transforming config by config
+        for config, row in zip(configs, transformed):
+            assert row == pytest.approx(
+                sp.transform(config, normalize_categorical=normalize_categorical)
+            )
+        # round trip
+        inverse = sp.inverse_transform_array(
+            transformed, normalize_categorical=normalize_categorical
+        )
+        assert inverse[:, 0].astype(float) == pytest.approx(configs[:, 0].astype(float))
+        assert (inverse[:, 1:] == configs[:, 1:]).all()
+        assert sp.transform_array(
+            inverse, normalize_categorical=normalize_categorical
+        ) == pytest.approx(transformed)
+
+    # lists of configs, additional columns like the budget are ignored
+    configs = [[-3.0, 6, "blue", 3, 9], [0.0, 4, "red", 0.1, 9]]
+    assert sp.transform_array(configs, normalize_categorical=True) == pytest.approx(
+        np.array([[0.0, 1.0, 1.0, 1.0], [0.5, 0.5, 0.0, 0.0]])
+    )
+    assert sp.transform_array([]).shape == (0, 4)
+    # numpy turns configs with strings into string arrays
+    string_configs = np.array([c[:3] + ["a"] for c in configs])
+    assert sp.transform_array(string_configs) == pytest.approx(
+        np.array([[0.0, 1.0, 2.0, 1.0], [0.5, 0.5, 0.0, 1.0]])
+    )
+
+    with pytest.raises(ValueError):
+        sp.transform_array([[0.0, 4, "yellow", 3]])
+    with pytest.raises(ValueError):
+        sp.transform_array([[0.0, 4, "red", 4]])
@@ -0,0 +1,124 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import pytest
+from skopt.learning.gaussian_process import GaussianProcessRegressor
+from skopt.learning.gaussian_process.kernels import ConstantKernel, Matern
+
+from maggy.optimizer.bayes.gp import GP
+from maggy.optimizer.bayes.sparse_gp import SparseGaussianProcess
+
+
+def _data(n, n_dims=2, seed=0):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(n, n_dims)
+    return X, np.sin(3 * X.sum(axis=1)) + 0.1 * rng.randn(n)
+
+
+def _regressor(X, y):
+    n_dims = X.shape[1]
+    return GaussianProcessRegressor(
+        kernel=ConstantKernel(1.0, (0.01, 1000.0))
+        * Matern(
+            length_scale=np.ones(n_dims),
+            length_scale_bounds=[(0.01, 100)] * n_dims,
+            nu=2.5,
+        ),
+        normalize_y=True,
+        noise="gaussian",
+        random_state=0,
+    ).fit(X, y)
+
+
+def test_all_inducing_points_is_exact():
+    X, y = _data(50)
+    X_test, _ = _data(10, seed=1)
+    regressor = _regressor(X, y)
+
+    model = SparseGaussianProcess.from_regressor(regressor, X).fit(X, y)
+
+    assert model.n_observations == 50
+    for expected, actual in zip(
+        regressor.predict(X_test, return_std=True),
+        model.predict(X_test, return_std=True),
+    ):
+        np.testing.assert_allclose(actual, expected, atol=1e-4)
+
+
+def test_approximates_exact_gp():
+    X, y = _data(500)
+    X_test, _ = _data(50, seed=1)
+    regressor = _regressor(X, y)
+
+    model = SparseGaussianProcess.from_regressor(regressor, X[:100]).fit(X, y)
+
+    exact_mean, exact_std = regressor.predict(X_test, return_std=True)
+    mean, std = model.predict(X_test, return_std=True)
+    np.testing.assert_allclose(mean, exact_mean, atol=0.01)
+    np.testing.assert_allclose(std, exact_std, atol=0.01)
+
+
+def test_gradients():
+    X, y = _data(100)
+    model = SparseGaussianProcess.from_regressor(_regressor(X, y), X[:30]).fit(X, y)
+
+    x = np.array([[0.3, 0.6]])
+    _, _, mean_grad, std_grad = model.predict(
+        x, return_std=True, return_mean_grad=True, return_std_grad=True
+    )
+    eps = 1e-6
+    for dim in range(2):
+        dx = np.zeros_like(x)
+        dx[0, dim] = eps
+        upper_mean, upper_std = model.predict(x + dx, return_std=True)
+        lower_mean, lower_std = model.predict(x - dx, return_std=True)
+        assert mean_grad[dim] == pytest.approx(
+            (upper_mean[0] - lower_mean[0]) / (2 * eps), rel=1e-4, abs=1e-6
+        )
+        assert std_grad[dim] == pytest.approx(
+            (upper_std[0] - lower_std[0]) / (2 * eps), rel=1e-4, abs=1e-6
+        )
+
+
+def test_incremental_updates_and_liars():
+    X, y = _data(60)
+    X_busy, _ = _data(3, seed=2)
+    y_busy = np.full(3, y.min())
+    X_test, _ = _data(5, seed=1)
+    regressor = _regressor(X, y)
+
+    model = SparseGaussianProcess.from_regressor(regressor, X[:20])
+    model.fit(X[:20], y[:20])
+    model.set_liars(X[50:], np.zeros(10))
+    # new observations replace the liars
+    model.add(X[20:], y[20:])
+    model.set_liars(X_busy, y_busy)
+    assert model.n_observations == 60
+
+    # same inducing points, fit on observations and liars at once
+    refit = SparseGaussianProcess.from_regressor(regressor, X[:20]).fit(
+        np.vstack((X, X_busy)), np.concatenate((y, y_busy))
+    )
+    for expected, actual in zip(
+        refit.predict(X_test, return_std=True), model.predict(X_test, return_std=True)
+    ):
+        np.testing.assert_allclose(actual, expected, atol=1e-8)
+
+
+def test_surrogate_validation():
+    with pytest.raises(ValueError):
+        GP(surrogate="rff")
@@ -0,0 +1,70 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import pytest
+
+from maggy.core.stats import MetricStatistics
+
+
+def test_moments():
+    metrics = np.random.RandomState(0).normal(3.0, 2.0, size=1000)
+    stats = MetricStatistics()
+    assert stats.mean is None and stats.std is None
+
+    for i, metric in enumerate(metrics):
+        stats.add(metric, str(i))
+
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(np.mean(metrics))
+    assert stats.std == pytest.approx(np.std(metrics, ddof=1))
+    assert stats.min == np.min(metrics)
+    assert stats.max == np.max(metrics)
+
+
+@pytest.mark.parametrize("direction", ["max", "min"])
+def test_top(direction):
+    metrics = [0.5, 0.9, 0.1, 0.7, 0.9, 0.3]
+    stats = MetricStatistics(direction, top_k=3)
+    for i, metric in enumerate(metrics):
+        stats.add(metric, "t{}".format(i))
+
+    if direction == "max":
+        # ties are ranked by arrival
+        assert stats.top() == [("t1", 0.9), ("t4", 0.9), ("t3", 0.7)]
+    else:
+        assert stats.top() == [("t2", 0.1), ("t5", 0.3), ("t0", 0.5)]
+    assert len(stats.top(1)) == 1
+
+
+def test_quantiles():
+    metrics = np.random.RandomState(1).uniform(size=10000)
+    stats = MetricStatistics(quantiles=[0.1, 0.5, 0.9])
+    for metric in metrics[:3]:
+        stats.add(metric)
+    # exact for a handful of metrics
+    assert stats.quantiles()[0.5] == np.median(metrics[:3])
+
+    for metric in metrics[3:]:
+        stats.add(metric)
+    for q, estimate in stats.quantiles().items():
+        assert estimate == pytest.approx(np.quantile(metrics, q), abs=0.02)
+    assert set(stats.to_dict()["quantiles"]) == {0.1, 0.5, 0.9}
+
+
+def test_invalid_direction():
+    with pytest.raises(ValueError):
+        MetricStatistics("maximize")
@@ -0,0 +1,117 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import pytest
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, TrialStore
+from maggy.optimizer.bayes.tpe import TPE
+from maggy.trial import Trial
+
+
+def _fitted_tpe(n_samples, n_trials=40, activations=("relu", "tanh", "elu")):
+    sp = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        units=("INTEGER", [16, 512]),
+        activation=("CATEGORICAL", list(activations)),
+    )
+    tpe = TPE(num_warmup_trials=1, n_samples=n_samples)
+    tpe.searchspace = sp
+    tpe.num_trials = n_trials + 1
+    tpe.direction = "min"
+    tpe.final_store = FinalStore()
+    tpe.trial_store = TrialStore()
+    tpe.initialize()
+    np.random.seed(0)
+    for params in sp.get_random_parameter_values(n_trials):
+        trial = Trial(params)
+        trial.final_metric = params["lr"]
+        trial.status = Trial.FINALIZED
+        tpe.final_store.append(trial)
+    tpe.update_model()
+    return tpe
+
+
+def test_sampling_routine():
+    for n_samples in [1, 500]:
+        tpe = _fitted_tpe(n_samples)
+        params = tpe.sampling_routine()
+
+        assert set(params.keys()) == {"lr", "units", "activation"}
+        assert 0.0001 <= params["lr"] <= 0.1
+        assert isinstance(params["units"], int) and 16 <= params["units"] <= 512
+        assert params["activation"] in ["relu", "tanh", "elu"]
+
+
+def test_single_category():
+    tpe = _fitted_tpe(24, activations=["relu"])
+    X = tpe.searchspace.get_random_parameter_array(20, transformed=True)
+
+    for kde in [tpe.models[0]["good"], tpe.models[0]["bad"]]:
+        assert np.all(np.isfinite(kde.pdf(X)))
+    assert tpe.sampling_routine()["activation"] == "relu"
+
+
+def test_calculate_ei_batched():
+    tpe = _fitted_tpe(1)
+    kde_good, kde_bad = tpe.models[0]["good"], tpe.models[0]["bad"]
+    X = tpe.searchspace.get_random_parameter_array(20, transformed=True)
+
+    ei = TPE._calculate_ei(X, kde_good, kde_bad)
+
+    assert ei.shape == (20,)
+    for x, ei_x in zip(X, ei):
+        expected = max(kde_good.pdf(x), 1e-32) / max(kde_bad.pdf(x), 1e-32)
+        assert ei_x == pytest.approx(expected)
+
+
+def _add_trial(tpe, lr):
+    trial = Trial({"lr": lr, "units": 16, "activation": "relu"})
+    trial.final_metric = lr
+    trial.status = Trial.FINALIZED
+    tpe.final_store.append(trial)
+
+
+def _refit(tpe):
+    models = tpe.models.pop(0)
+    tpe.update_model()
+    refit, tpe.models[0] = tpe.models[0], models
+    return refit
+
+
+def test_update_model_extends_kdes():
+    tpe = _fitted_tpe(1)
+    kde_good, kde_bad = tpe.models[0]["good"], tpe.models[0]["bad"]
+    X = tpe.searchspace.get_random_parameter_array(20, transformed=True)
+
+    # bad trials don't change the good and bad trials so far, the kdes are extended
+    for _ in range(3):
+        _add_trial(tpe, 0.1)
+        tpe.update_model()
+    assert tpe.models[0]["good"] is kde_good
+    assert tpe.models[0]["bad"] is kde_bad
+    assert kde_good.nobs == 6 and kde_bad.nobs == 36
+    refit = _refit(tpe)
+    for name in ["good", "bad"]:
+        np.testing.assert_allclose(tpe.models[0][name].bw, refit[name].bw)
+        np.testing.assert_allclose(tpe.models[0][name].pdf(X), refit[name].pdf(X))
+
+    # a new best trial moves a good trial to the bad ones, the kdes are fitted again
+    _add_trial(tpe, 0.0001)
+    tpe.update_model()
+    assert tpe.models[0]["good"] is not kde_good
+    assert tpe.models[0]["bad"] is not kde_bad
@@ -0,0 +1,162 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import json
+
+import numpy as np
+import pytest
+
+from maggy import Searchspace
+from maggy.core.trialstore import FinalStore, ToleranceGrid, TrialStore
+from maggy.optimizer import RandomSearch
+from maggy.trial import Trial
+
+
+def _trial(x, budget=0, sample_type="model", final_metric=None):
+    trial = Trial(
+        {"x": x, "budget": budget},
+        info_dict={"sample_type": sample_type, "model_budget": budget},
+    )
+    trial.final_metric = final_metric
+    return trial
+
+
+def test_trial_store_select():
+    store = TrialStore()
+    trials = [
+        _trial(0),
+        _trial(1, sample_type="random"),
+        _trial(2, budget=3),
+        _trial(3),
+    ]
+    for trial in trials:
+        store[trial.trial_id] = trial
+
+    assert store.select() == trials
+    assert store.select(sample_type="model", model_budget=0) == [trials[0], trials[3]]
+    assert store.select(run_budget=3) == [trials[2]]
+    assert store.select(sample_type="random", model_budget=3) == []
+
+    del store[trials[0].trial_id]
+    assert store.pop(trials[3].trial_id) is trials[3]
+    assert store.pop("missing", None) is None
+    assert store.select(sample_type="model", model_budget=0) == []
+
+
+def test_trial_store_status_index():
+    store = TrialStore()
+    trial = _trial(0)
+    store[trial.trial_id] = trial
+    assert store.select(status=Trial.PENDING) == [trial]
+
+    trial.status = Trial.RUNNING
+    assert store.select(status=Trial.PENDING) == []
+    assert store.select(status=Trial.RUNNING) == [trial]
+
+    # removed trials don't update the index anymore
+    store.pop(trial.trial_id)
+    trial.status = Trial.FINALIZED
+    assert store.select(status=Trial.FINALIZED) == []
+
+
+def test_final_store_columns():
+    store = FinalStore()
+    calls = []
+
+    def metric(trial):
+        calls.append(trial.trial_id)
+        return trial.final_metric
+
+    trials = [_trial(i, budget=i % 2 + 1, final_metric=float(i)) for i in range(5)]
+    store.extend(trials[:3])
+    np.testing.assert_array_equal(store.column("m", metric), [0.0, 1.0, 2.0])
+    np.testing.assert_array_equal(store.column("m", metric, budget=2), [1.0])
+
+    store.extend(trials[3:])
+    np.testing.assert_array_equal(store.column("m", metric, budget=1), [0.0, 2.0, 4.0])
+    # every trial is computed once
+    assert len(calls) == 5
+    with pytest.raises(ValueError):
+        store.column("m", metric)[0] = 1.0
+
+    assert store.select(2) == [trials[1], trials[3]]
+    assert store.select(0) == trials
+    assert store.get(trials[4].trial_id) is trials[4]
+    assert store.get("missing") is None
+    assert list(store) == trials
+
+
+def test_fingerprint():
+    trial = Trial({"x": 1, "c": "a", "budget": 1})
+    # same config on another budget, as float
+    assert trial.fingerprint == Trial({"x": 1.0, "c": "a", "budget": 9}).fingerprint
+    assert trial.fingerprint != Trial({"x": 2, "c": "a", "budget": 1}).fingerprint
+
+    trials = FinalStore([Trial({"x": 0}), trial, Trial({"x": 1, "c": "a"})])
+    assert trials.find(trial.fingerprint) == 1
+    assert trials.find(Trial({"x": 3}).fingerprint) == -1
+
+    store = TrialStore()
+    store[trial.trial_id] = trial
+    assert store.select(fingerprint=Trial({"x": 1, "c": "a"}).fingerprint) == [trial]
+
+
+def test_tolerance_grid():
+    searchspace = Searchspace(x=("DOUBLE", [0, 10]), c=("CATEGORICAL", ["a", "b"]))
+    grid = ToleranceGrid(searchspace, 0.05)
+    trial = Trial({"x": 3.1, "c": "a"})
+    grid.add(trial)
+
+    # neighbouring cells are searched too
+    assert grid.find({"x": 2.65, "c": "a"}) is trial
+    assert grid.find({"x": 3.6, "c": "a"}) is trial
+    assert grid.find({"x": 3.65, "c": "a"}) is None
+    assert grid.find({"x": 3.1, "c": "b"}) is None
+
+    with pytest.raises(ValueError):
+        ToleranceGrid(searchspace, 0)
+
+
+def test_hparams_exist():
+    optimizer = RandomSearch(duplicate_tolerance=0.05)
+    optimizer.searchspace = Searchspace(x=("DOUBLE", [0, 10]))
+    optimizer.final_store = FinalStore([Trial({"x": 1.0})])
+    optimizer.trial_store = TrialStore()
+    busy_trial = Trial({"x": 5.0})
+    optimizer.trial_store[busy_trial.trial_id] = busy_trial
+
+    assert optimizer.hparams_exist(Trial({"x": 1.0, "budget": 3}))
+    assert optimizer.hparams_exist(Trial({"x": 5.0}))
+    assert optimizer.hparams_exist(Trial({"x": 1.2}))
+    assert optimizer.hparams_exist(Trial({"x": 4.8}))
+    assert not optimizer.hparams_exist(Trial({"x": 3.0}))
+
+    optimizer.final_store.append(Trial({"x": 3.2}))
+    assert optimizer.hparams_exist(Trial({"x": 3.0}))
+
+    optimizer.duplicate_tolerance = None
+    assert not optimizer.hparams_exist(Trial({"x": 1.2}))
+
+
+def test_trial_to_json():
+    trial = _trial(0.5)
+    trial.status = Trial.RUNNING
+    trial.add_status_listener(lambda *args: None)
+
+    as_dict = json.loads(trial.to_json())
+    assert as_dict["status"] == Trial.RUNNING
+    assert "_status_listeners" not in as_dict
+    assert as_dict["params"] == {"x": 0.5, "budget": 0}
@@ -15,6 +15,7 @@
 #
 
 import json
+import numbers
 import threading
 import hashlib
 
@@ -44,7 +45,8 @@ class Trial(object):
         :type params: dict
         :param info_dict: dict containing additional information about the trial including
                             - sample_type
-                            - sampling_time
+                            - sampling_compute_time
+                            - sampling_wait_time
                             - run_budget
                             - model_budget (optinally)
                             see `create_trial()` method of base.py for further reference
@@ -66,7 +68,10 @@ class Trial(object):
             }
             self.trial_id = Trial._generate_id(serializable_params)
         self.params = params
-        self.status = Trial.PENDING
+        self._fingerprint = None
+        # called with (trial, old status, new status) on status changes
+        self._status_listeners = []
+        self._status = Trial.PENDING
         self.early_stop = False
         self.final_metric = None
         self.metric_history = []
@@ -80,6 +85,37 @@ class Trial(object):
         else:
             self.info_dict = info_dict
 
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status):
+        old_status, self._status = self._status, status
+        if old_status != status:
+            for listener in list(self._status_listeners):
+                listener(self, old_status, status)
+
+    @property
+    def fingerprint(self):
+        """Hash of the hyperparameters without the budget, equal for trials
+        evaluating the same configuration, possibly on different budgets."""
+        if self._fingerprint is None:
+            if self.trial_type == "optimization":
+                self._fingerprint = Trial._generate_fingerprint(self.params)
+            else:
+                self._fingerprint = self.trial_id
+        return self._fingerprint
+
+    def add_status_listener(self, listener):
+        """Register `listener` to be called with the trial, the old and the
+        new status whenever the status of the trial changes."""
+        self._status_listeners.append(listener)
+
+    def remove_status_listener(self, listener):
+        if listener in self._status_listeners:
+            self._status_listeners.remove(listener)
+
     def get_early_stop(self):
         """Return the early stopping flag of the trial."""
         with self.lock:
@@ -135,15 +171,44 @@ class Trial(object):
 
         raise ValueError("Hyperparameters need to be a dictionary.")
 
+    @classmethod
+    def _generate_fingerprint(cls, params):
+        """
+        Class method to generate a hash of a hyperparameter configuration,
+        ignoring the budget.
+
+        Numbers are hashed as floats, so configurations comparing equal, e.g.
+        with an integer 1 and a float 1.0, get the same fingerprint.
+
+        :param params: Hyperparameters
+        :type params: dictionary
+        :return: Sixteen character truncated md5 hash
+        :rtype: str
+        """
+        # todo when budget becomes attr of Trial object ( and not part of params anymore ), adapt
+        return cls._generate_id(
+            {
+                key: (
+                    float(value)
+                    if isinstance(value, numbers.Real) and not isinstance(value, bool)
+                    else value
+                )
+                for key, value in params.items()
+                if key != "budget"
+            }
+        )
+
     def to_json(self):
         return json.dumps(self.to_dict(), default=util.json_default_numpy)
 
     def to_dict(self):
         obj_dict = {"__class__": self.__class__.__name__}
 
-        temp_dict = self.__dict__.copy()
-        temp_dict.pop("lock")
-        temp_dict.pop("start")
+        temp_dict = {
+            ("status" if key == "_status" else key): value
+            for key, value in self.__dict__.items()
+            if key not in ("lock", "start", "_status_listeners", "_fingerprint")
+        }
 
         obj_dict.update(temp_dict)
 